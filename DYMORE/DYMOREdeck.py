@@ -0,0 +1,466 @@
+"""
+Functions in the DYMOREdeck module read DYMORE input decks (*.dym) and the files
+they pull in with @INCLUDE_COMMAND (e.g. loadDist.dat, *_props.dat, *_mesh.dat,
+curves.dat) back into Python.
+
+A deck is parsed into a tree of DeckNode objects, one for each @KEYWORD. Each
+node keeps the exact text around it (whitespace, '!' comments, line endings),
+so an unmodified deck is written back byte-for-byte. Values are kept as the raw
+text between the braces; numeric values (e.g. @STIFFNESS_MATRIX tables) are
+only converted to NumPy arrays when they are accessed. NumPy itself is only
+imported then, so reading, editing and writing text decks (e.g. in
+caseGenerator) does not load it.
+
+Parsed files are cached by path, and re-parsed only when their modification
+time or size changes. The files a deck includes are looked up in the cache
+each time they are used, so a changed *_mesh.dat or *_props.dat is seen
+through a cached deck too.
+
+Example
+-------
+>>> from DYMORE import DYMOREdeck as dd
+>>> deck = dd.readDeck('full-height_biplane_spar/flapwise_tipload/1e03/biplane_spar.dym')
+>>> prop = deck.findDefinition('BEAM_PROPERTY_NAME', 'propCD')
+>>> (eta, cm_x2, cm_x3, mpus, i1, i2, i3, K) = dd.readBeamProperties(prop)
+>>> deck.find('SCALING_FACTOR').value
+'1.000e+003'
+"""
+
+import os
+import re
+
+
+# the next keyword, closing brace, or whole-line '!' comment in a deck
+_NEXT = re.compile(r'^[ \t]*![^\n]*|@(\w+)|\}', re.M)
+_SPACE = re.compile(r'\s*')
+
+# parsed files, keyed by absolute path: path -> (mtime, size, DeckFile)
+_DECK_CACHE = {}
+
+
+class DeckNode(object):
+    """
+    One @KEYWORD in a DYMORE deck.
+
+    A node has a value (the text in its first pair of braces), a body of child
+    nodes (the keywords in its last pair of braces), or both. For example:
+
+        @MASS_PER_UNIT_SPAN { 3.7276112000e+02}     value only
+        @POINT_DEFINITION { @POINT_NAME ... }       children only
+        @BEAM_PROPERTY_NAME {propCD} { ... }        value and children
+
+    Attributes
+    ----------
+    keyword : <string>
+        The keyword, without the '@' (e.g. 'STIFFNESS_MATRIX').
+    value : <string>
+        The raw text between the value braces, or None.
+    children : <list of DeckNodes>
+        The nodes in the body braces, or None.
+    """
+
+    __slots__ = ('keyword', '_value', 'children', '_array',
+                 '_prefix', '_kwgap', '_valgap', '_tail')
+
+    def __init__(self, keyword, value=None, children=None):
+        self.keyword = keyword
+        self._value = value
+        self.children = children
+        self._array = None
+        self._prefix = '\n'
+        self._kwgap = ' '
+        self._valgap = ' '
+        self._tail = '\n'
+
+    def __repr__(self):
+        return '<DeckNode @%s %r%s>' % (self.keyword, self.text,
+            '' if self.children is None else ' (%d children)' % len(self.children))
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+        self._array = None
+
+    @property
+    def text(self):
+        """
+        The value with surrounding whitespace removed (e.g. 'propCD'), or None.
+        """
+
+        return None if self._value is None else self._value.strip()
+
+    @property
+    def array(self):
+        """
+        The value as a 1-D array of floats. It is parsed the first time it is
+        accessed, and cached until the value is changed.
+        """
+
+        if self._array is None:
+            import numpy as np
+            self._array = np.array(self._value.replace(',', ' ').split(), dtype=float)
+        return self._array
+
+    def matrix6x6(self):
+        """
+        Return a symmetric 6x6 matrix from a value that lists its upper
+        triangle row by row, the way @STIFFNESS_MATRIX and @MASS_MATRIX do.
+        """
+
+        import numpy as np
+        a = self.array
+        if a.shape[0] == 36:
+            return a.reshape(6,6)
+        M = np.zeros((6,6))
+        (rows, cols) = np.triu_indices(6)
+        M[rows,cols] = a
+        M[cols,rows] = a
+        return M
+
+    def iterNodes(self):
+        """
+        Iterate over this node and all of its descendants, depth first.
+        """
+
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            if node.children:
+                stack.extend(reversed(node.children))
+
+    def find(self, keyword, name=None):
+        """
+        Return the first descendant with this keyword (and value, if name is
+        given), or None.
+        """
+
+        for node in self.findAll(keyword, name):
+            return node
+        return None
+
+    def findAll(self, keyword, name=None):
+        """
+        Iterate over all descendants with this keyword (and value, if name is
+        given).
+        """
+
+        for node in self.iterNodes():
+            if node.keyword == keyword and (name is None or node.text == name):
+                yield node
+
+    def _emit(self, out):
+        out.append(self._prefix)
+        out.append('@' + self.keyword)
+        if self._value is not None:
+            out.append(self._kwgap + '{' + self._value + '}')
+        if self.children is not None:
+            out.append((self._kwgap if self._value is None else self._valgap) + '{')
+            for child in self.children:
+                child._emit(out)
+            out.append(self._tail + '}')
+
+
+class DeckFile(object):
+    """
+    One parsed DYMORE input file.
+
+    Attributes
+    ----------
+    path : <string>
+        The path to the file.
+    nodes : <list of DeckNodes>
+        The top-level keywords in the file.
+    """
+
+    def __init__(self, path, nodes, tail):
+        self.path = path
+        self.nodes = nodes
+        self._tail = tail
+        self._includeNames = None
+
+    def __repr__(self):
+        return '<DeckFile %s (%d nodes)>' % (self.path, len(self.nodes))
+
+    def toString(self):
+        """
+        Return the text of the file, including any changes made to its nodes.
+        """
+
+        out = []
+        for node in self.nodes:
+            node._emit(out)
+        out.append(self._tail)
+        return ''.join(out)
+
+    def write(self, path=None):
+        """
+        Write the file back to disk (to its own path, unless another is given).
+        """
+
+        with open(path or self.path, 'w', newline='') as f:
+            f.write(self.toString())
+
+    def includeFileNames(self):
+        """
+        Return the paths of the files pulled in by active @INCLUDE_COMMANDs in
+        this file, relative to the current directory.
+        """
+
+        dirname = os.path.dirname(self.path)
+        paths = []
+        for node in self.iterNodes(includes=False):
+            if node.keyword != 'INCLUDE_COMMAND_NAME' or not node.children:
+                continue
+            active = node.find('ACTIVE_COMMAND')
+            if active is not None and active.text.upper() != 'YES':
+                continue
+            for filelist in node.findAll('LIST_OF_FILE_NAMES'):
+                for name in filelist.text.split(','):
+                    if name.strip():
+                        paths.append(os.path.join(dirname, name.strip()))
+        return paths
+
+    @property
+    def includes(self):
+        """
+        The DeckFiles pulled in by active @INCLUDE_COMMANDs in this file. They
+        come from readDeck each time, so a file that changed is read again.
+        """
+
+        if self._includeNames is None:
+            self._includeNames = self.includeFileNames()
+        return [readDeck(p) for p in self._includeNames]
+
+    def iterFiles(self):
+        """
+        Iterate over this file and every file it includes, recursively.
+        """
+
+        seen = set()
+        stack = [self]
+        while stack:
+            deck = stack.pop()
+            if id(deck) in seen:
+                continue
+            seen.add(id(deck))
+            yield deck
+            stack.extend(reversed(deck.includes))
+
+    def iterNodes(self, includes=True):
+        """
+        Iterate over every node in this file (and in included files, if
+        includes is True), depth first.
+        """
+
+        decks = self.iterFiles() if includes else [self]
+        for deck in decks:
+            for node in deck.nodes:
+                for n in node.iterNodes():
+                    yield n
+
+    def find(self, keyword, name=None, includes=True):
+        """
+        Return the first node with this keyword (and value, if name is given),
+        or None.
+        """
+
+        for node in self.findAll(keyword, name, includes):
+            return node
+        return None
+
+    def findAll(self, keyword, name=None, includes=True):
+        """
+        Iterate over all nodes with this keyword (and value, if name is given).
+        """
+
+        for node in self.iterNodes(includes):
+            if node.keyword == keyword and (name is None or node.text == name):
+                yield node
+
+    def findDefinition(self, keyword, name, includes=True):
+        """
+        Return the node that defines a named object, e.g.
+        findDefinition('BEAM_PROPERTY_NAME', 'propCD'), or None.
+
+        Unlike find, this skips nodes that only refer to the object by name
+        (like the @BEAM_PROPERTY_NAME inside a @BEAM_DEFINITION).
+        """
+
+        for node in self.findAll(keyword, name, includes):
+            if node.children is not None:
+                return node
+        return None
+
+
+def _parseBody(text, pos, path, top=False):
+    """
+    Parse keywords from text[pos:] until the closing brace of the body (or the
+    end of the text, if top is True).
+
+    Returns
+    -------
+    nodes : <list of DeckNodes>
+    tail : <string>
+        The text between the last node and the closing brace.
+    pos : <int>
+        The position just after the closing brace.
+    """
+
+    nodes = []
+    start = pos
+    n = len(text)
+    while True:
+        m = _NEXT.search(text, pos)
+        if m is None:
+            if not top:
+                raise ValueError("missing '}' at the end of " + path)
+            return (nodes, text[start:], n)
+        keyword = m.group(1)
+        if keyword is None:
+            if m.group(0) == '}':
+                if top:
+                    raise ValueError("unexpected '}' at offset %d in %s" % (m.start(), path))
+                return (nodes, text[start:m.start()], m.end())
+            pos = m.end()  # a '!' comment
+            continue
+
+        node = DeckNode(keyword)
+        node._prefix = text[start:m.start()]
+        pos = m.end()
+        q = _SPACE.match(text, pos).end()
+        if q < n and text[q] == '{':
+            node._kwgap = text[pos:q]
+            close = text.find('}', q+1)
+            if close < 0:
+                raise ValueError("missing '}' after @%s in %s" % (keyword, path))
+            inner = text[q+1:close]
+            if '@' in inner or '{' in inner:
+                (node.children, node._tail, pos) = _parseBody(text, q+1, path)
+            else:
+                node._value = inner
+                pos = close + 1
+                r = _SPACE.match(text, pos).end()
+                if r < n and text[r] == '{':
+                    node._valgap = text[pos:r]
+                    (node.children, node._tail, pos) = _parseBody(text, r+1, path)
+        nodes.append(node)
+        start = pos
+
+
+def parseDeck(text, path='<string>'):
+    """
+    Parse the text of a DYMORE input file.
+
+    Parameters
+    ----------
+    text : <string>
+        The contents of the file. Line endings are kept as they are.
+    path : <string>
+        The path of the file, used to resolve @INCLUDE_COMMANDs and in error
+        messages.
+
+    Returns
+    -------
+    deck : <DeckFile>
+        The parsed file.
+    """
+
+    (nodes, tail, pos) = _parseBody(text, 0, path, top=True)
+    return DeckFile(path, nodes, tail)
+
+
+def readDeck(path):
+    """
+    Read and parse a DYMORE input file, or return the cached copy if the file
+    has not changed since it was last parsed.
+
+    The cached DeckFile is shared between callers; use parseDeck on the file
+    contents to get a private copy that is safe to modify.
+
+    Parameters
+    ----------
+    path : <string>
+        The path to the file (e.g. 'monoplane_spar/flapwise_tipload/1e03/monoplane_spar.dym').
+
+    Returns
+    -------
+    deck : <DeckFile>
+        The parsed file. Files pulled in by @INCLUDE_COMMAND are parsed (or
+        re-parsed, if they changed) when deck.includes (or a search through
+        them) is used.
+    """
+
+    key = os.path.abspath(path)
+    st = os.stat(key)
+    cached = _DECK_CACHE.get(key)
+    if cached is not None and cached[0] == st.st_mtime and cached[1] == st.st_size:
+        return cached[2]
+    with open(key, 'r', newline='') as f:
+        deck = parseDeck(f.read(), path)
+    _DECK_CACHE[key] = (st.st_mtime, st.st_size, deck)
+    return deck
+
+
+def clearDeckCache():
+    """
+    Forget every parsed file, so the next readDeck reads from disk.
+    """
+
+    _DECK_CACHE.clear()
+
+
+def forgetDecks(paths):
+    """
+    Forget the parsed copies of some files (e.g. after they were replaced on
+    disk), so the next readDeck of each one reads it again.
+    """
+
+    for path in paths:
+        _DECK_CACHE.pop(os.path.abspath(path), None)
+
+
+def readBeamProperties(propNode):
+    """
+    Pull the cross-sectional properties out of a @BEAM_PROPERTY_NAME node
+    (6X6_MATRICES type), e.g. from a *_props.dat file.
+
+    Parameters
+    ----------
+    propNode : <DeckNode>
+        The @BEAM_PROPERTY_NAME node.
+
+    Returns
+    -------
+    coord : <np.array>
+        The spanwise coordinate of each cross-section, shape (N,).
+    cm_x2, cm_x3 : <np.array>
+        The x2- and x3-coordinates of the center of mass, shape (N,).
+    mpus : <np.array>
+        The mass per unit span, shape (N,).
+    i1, i2, i3 : <np.array>
+        The moments of inertia about the x1-, x2- and x3-axes, shape (N,).
+    K : <np.array>
+        The Timoshenko stiffness matrices, shape (N,6,6).
+    """
+
+    import numpy as np
+    coordType = propNode.find('COORDINATE_TYPE')
+    coordType = 'ETA_COORDINATE' if coordType is None else coordType.text
+    stations = [n for n in propNode.children if n.keyword == coordType and n.children]
+    N = len(stations)
+    coord = np.empty(N)
+    scalars = np.empty((N,6))
+    K = np.empty((N,6,6))
+    for (j, station) in enumerate(stations):
+        coord[j] = station.array[0]
+        K[j] = station.find('STIFFNESS_MATRIX').matrix6x6()
+        scalars[j,2] = station.find('MASS_PER_UNIT_SPAN').array[0]
+        scalars[j,3:6] = station.find('MOMENTS_OF_INERTIA').array
+        scalars[j,0:2] = station.find('CENTRE_OF_MASS_LOCATION').array
+
+    return (coord, scalars[:,0], scalars[:,1], scalars[:,2], scalars[:,3], scalars[:,4], scalars[:,5], K)
@@ -4,6 +4,11 @@ Functions in the DYMOREutilities module can be used to translate the outputs fro
 For example, if VABS was used to calculate the mass and stiffness matrices for a series of cross-sections in a beam, this module can construct the DYMORE input file for a beam with those cross-sectional properties.
 """
 
+from __future__ import print_function
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
 import numpy as np
 
 
@@ -22,8 +27,8 @@ def readFile(filestr):
         A list of strings, each of which represents one line in the file.
     """
 
-    f = open(filestr, 'r')  # read the file
-    fileLines = f.readlines()  # parse all characters in file into one long string
+    with open(filestr, 'r') as f:  # read the file, and close it when done
+        fileLines = f.readlines()  # parse all characters in file into one long string
     return fileLines
 
 
@@ -132,19 +137,178 @@ def pullMKmatrices(MKlines, print_flag=False):
     K = np.vstack((K_row_1,K_row_2,K_row_3,K_row_4,K_row_5,K_row_6))
 
     if print_flag:
-        print "center of mass, x2 = " + str(cm_x2)
-        print "center of mass, x3 = " + str(cm_x3)
-        print "mass per unit span = " + str(mpus)
-        print "moment of inertia about x1 axis = " + str(i1)
-        print "moment of inertia about x2 axis = " + str(i2)
-        print "moment of inertia about x3 axis = " + str(i3)
-        print ""
-        print "Stiffness matrix:"
-        print K
+        print("center of mass, x2 = " + str(cm_x2))
+        print("center of mass, x3 = " + str(cm_x3))
+        print("mass per unit span = " + str(mpus))
+        print("moment of inertia about x1 axis = " + str(i1))
+        print("moment of inertia about x2 axis = " + str(i2))
+        print("moment of inertia about x3 axis = " + str(i3))
+        print("")
+        print("Stiffness matrix:")
+        print(K)
 
     return (cm_x2, cm_x3, mpus, i1, i2, i3, K)
 
 
+# keyword dispatch table for the scalar values in a VABS output file (*.dat.K)
+# maps the label on the left-hand side of '=' to a column in the station array
+MK_KEYWORDS = {
+    'Xm2': 0,
+    'Xm3': 1,
+    'Mass Per Unit Span': 2,
+    'Mass Moments of Intertia about x1 axis': 3,
+    'Mass Moments of Intertia about x2 axis': 4,
+    'Mass Moments of Intertia about x3 axis': 5,
+    }
+K_HEADER = 'Timoshenko Stiffness Matrix'
+
+
+def parseMKfile(vabsMKfilepath, scalars=None, K=None):
+    """
+    Parse one VABS output file (*.dat.K) in a single pass (see parseMKlines).
+
+    Takes the path to the VABS output file, then the same arguments as
+    parseMKlines, and returns the same values.
+    """
+
+    with open(vabsMKfilepath, 'r') as f:
+        MKlines = f.read().splitlines()
+    return parseMKlines(MKlines, scalars, K, vabsMKfilepath)
+
+
+def parseMKlines(MKlines, scalars=None, K=None, name='<lines>'):
+    """
+    Parse the contents of one VABS output file (*.dat.K), e.g. the bytes that
+    MKcache hashed, so they are not read from the file a second time.
+
+    Each line is checked once against a keyword table (MK_KEYWORDS), instead
+    of running one regular expression per keyword on every line.
+
+    Parameters
+    ----------
+    MKlines : <list of strings>
+        The contents of the VABS output file (*.dat.K).
+        Each string is a line from the VABS output file.
+    scalars : <np.array>
+        (optional) An array of shape (6,) to store the scalar values in.
+        A new array is made if this is not provided.
+    K : <np.array>
+        (optional) An array of shape (6,6) to store the Timoshenko stiffness
+        matrix in. A new array is made if this is not provided.
+    name : <string>
+        The name of the file, for error messages.
+
+    Returns
+    -------
+    scalars : <np.array>
+        The scalar values, in the order: cm_x2, cm_x3, mpus, i1, i2, i3.
+    K : <np.array>
+        The Timoshenko stiffness matrix.
+    """
+
+    if scalars is None:
+        scalars = np.empty(6)
+    if K is None:
+        K = np.empty((6,6))
+    scalars.fill(np.nan)
+    K_head_line = None
+
+    for i, line in enumerate(MKlines):
+        (label, sep, value) = line.partition('=')
+        if sep:
+            col = MK_KEYWORDS.get(label.strip())
+            if col is not None:
+                scalars[col] = float(value)
+        elif line.lstrip().startswith(K_HEADER):
+            K_head_line = i
+
+    if K_head_line is None:
+        raise ValueError("no '" + K_HEADER + "' found in " + name)
+    if np.isnan(scalars).any():
+        raise ValueError("mass properties are missing from " + name)
+    K[:,:] = np.array(' '.join(MKlines[K_head_line+3:K_head_line+9]).split(), dtype=float).reshape(6,6)
+
+    return (scalars, K)
+
+
+def findMKfiles(vabsMKpath, pattern='*.dat.K'):
+    """
+    Find all the VABS output files (*.dat.K) for a set of spar stations.
+
+    Parameters
+    ----------
+    vabsMKpath : <string or list of strings>
+        A directory that contains VABS output files, a glob pattern
+        (e.g. 'VABS/M_and_K_matrices/spar_station_*.dat.K'), or a list of
+        paths to VABS output files.
+    pattern : <string>
+        The glob pattern used to find VABS output files, if vabsMKpath is a
+        directory.
+
+    Returns
+    -------
+    vabsMKfilelist : <list of strings>
+        The paths to the VABS output files, sorted by filename.
+    """
+
+    import glob
+    import os
+    if isinstance(vabsMKpath, (list, tuple)):
+        return list(vabsMKpath)
+    if os.path.isdir(vabsMKpath):
+        vabsMKpath = os.path.join(vabsMKpath, pattern)
+    return sorted(glob.glob(vabsMKpath))
+
+
+def readMKfiles(vabsMKpath, pattern='*.dat.K', cache=None):
+    """
+    Read the mass and stiffness matrices for a whole set of spar stations
+    into arrays.
+
+    Parameters
+    ----------
+    vabsMKpath : <string or list of strings>
+        A directory that contains VABS output files, a glob pattern
+        (e.g. 'VABS/M_and_K_matrices/spar_station_*.dat.K'), or a list of
+        paths to VABS output files.
+    pattern : <string>
+        The glob pattern used to find VABS output files, if vabsMKpath is a
+        directory.
+    cache : <MKcache.MKcache>
+        (optional) A cache of parsed VABS output files. Files that have not
+        changed since they were cached are not parsed again.
+
+    Returns
+    -------
+    vabsMKfilelist : <list of strings>
+        The paths to the VABS output files, one for each station.
+    cm_x2 : <np.array>
+        The x2-coordinate of the center of mass, shape (N,).
+    cm_x3 : <np.array>
+        The x3-coordinate of the center of mass, shape (N,).
+    mpus : <np.array>
+        The mass per unit span, shape (N,).
+    i1 : <np.array>
+        The moment of inertia about the x1-axis, shape (N,).
+    i2 : <np.array>
+        The moment of inertia about the x2-axis, shape (N,).
+    i3 : <np.array>
+        The moment of inertia about the x3-axis, shape (N,).
+    K : <np.array>
+        The Timoshenko stiffness matrices, shape (N,6,6).
+    """
+
+    vabsMKfilelist = findMKfiles(vabsMKpath, pattern)
+    N = len(vabsMKfilelist)
+    scalars = np.empty((N,6))
+    K = np.empty((N,6,6))
+    parse = parseMKfile if cache is None else cache.parseMKfile
+    for n in range(N):
+        parse(vabsMKfilelist[n], scalars[n], K[n])
+
+    return (vabsMKfilelist, scalars[:,0], scalars[:,1], scalars[:,2], scalars[:,3], scalars[:,4], scalars[:,5], K)
+
+
 def makeFile(dymoreFileName):
     """
     Make a temporary file on the hard disk to store DYMORE-formatted data.
@@ -216,33 +380,275 @@ def writeDymoreMK(f, CoordType, coord, cm_x2, cm_x3, mpus, i1, i2, i3, K):
     }
     """
 
+    K_upper = np.asarray(K, dtype=float)[K_UPPER].tolist()
+    f.write(stationTemplate(CoordType) % tuple([coord] + K_upper + [mpus, i1, i2, i3, cm_x2, cm_x3]))
+
+    return
+
+
+# the spanwise coordinate types DYMORE accepts, and the station_data key for each
+COORD_KEYS = {
+    'ETA_COORDINATE': 'eta',
+    'CURVILINEAR_COORDINATE': 's',
+    'AXIAL_COORDINATE': 'x1',
+    }
+
+
+# the upper triangle of a 6x6 matrix, row by row, as DYMORE expects it
+K_UPPER = np.triu_indices(6)
+
+# one format string per CoordType, made by stationTemplate
+STATION_TEMPLATES = {}
+
+
+def checkCoordType(CoordType):
+    """
+    Raise a ValueError if CoordType is not one of the types DYMORE accepts.
+    """
+
+    if CoordType not in COORD_KEYS:
+        raise ValueError("CoordType must be one of " + ", ".join(sorted(COORD_KEYS)) + ", not " + repr(CoordType))
+
+
+def stationTemplate(CoordType):
+    """
+    Make the format string for one cross-section in a DYMORE beam property
+    definition.
+
+    The template has 28 fields, in the order: coord, the 21 upper-triangle
+    entries of K (row by row), mpus, i1, i2, i3, cm_x2, cm_x3.
+    The layout is the one shown in the docstring of writeDymoreMK.
+
+    Parameters
+    ----------
+    CoordType : <string>
+        Acceptable values are: 'ETA_COORDINATE',
+                               'CURVILINEAR_COORDINATE', or
+                               'AXIAL_COORDINATE'
+
+    Returns
+    -------
+    template : <string>
+        The format string for one cross-section.
+    """
+
+    if CoordType in STATION_TEMPLATES:
+        return STATION_TEMPLATES[CoordType]
+    checkCoordType(CoordType)
     tab = '  '
-    if CoordType == 'ETA_COORDINATE':
-        f.write(tab*2 + '@ETA_COORDINATE {' + ('%11.5e' % coord) + '} {\n')
-    elif CoordType == 'CURVILINEAR_COORDINATE':
-        # f.write(tab*2 + '@CURVILINEAR_COORDINATE {' + ('%11.5e' % coord) + '} {\n')
-        print "***WARNING*** CURVILINEAR_COORDINATE feature is not yet supported."
-    elif CoordType == 'AXIAL_COORDINATE':
-        f.write(tab*2 + '@AXIAL_COORDINATE {' + ('%11.5e' % coord) + '} {\n')
-    f.write(tab*3 +   '@STIFFNESS_MATRIX {' + ('%17.10e' % K[0,0]) + ',' + ('%20.10e' % K[0,1]) + ',' + ('%20.10e' % K[0,2]) + ',' + ('%20.10e' % K[0,3]) + ',' + ('%20.10e' % K[0,4]) + ',' + ('%20.10e' % K[0,5]) + ',' + '\n')
-    f.write(tab*3 + ' '*37 +                                               ('%20.10e' % K[1,1]) + ',' + ('%20.10e' % K[1,2]) + ',' + ('%20.10e' % K[1,3]) + ',' + ('%20.10e' % K[1,4]) + ',' + ('%20.10e' % K[1,5]) + ',' + '\n')
-    f.write(tab*3 + ' '*(37+21*1) +                                                                     ('%20.10e' % K[2,2]) + ',' + ('%20.10e' % K[2,3]) + ',' + ('%20.10e' % K[2,4]) + ',' + ('%20.10e' % K[2,5]) + ',' + '\n')
-    f.write(tab*3 + ' '*(37+21*2) +                                                                                                  ('%20.10e' % K[3,3]) + ',' + ('%20.10e' % K[3,4]) + ',' + ('%20.10e' % K[3,5]) + ',' + '\n')
-    f.write(tab*3 + ' '*(37+21*3) +                                                                                                                               ('%20.10e' % K[4,4]) + ',' + ('%20.10e' % K[4,5]) + ',' + '\n')
-    f.write(tab*3 + ' '*(37+21*4) +                                                                                                                                                            ('%20.10e' % K[5,5]) + '}' + '\n')
-    f.write(tab*3 +   '@MASS_PER_UNIT_SPAN {' + ('%17.10e' % mpus) + '}\n')
-    f.write(tab*3 +   '@MOMENTS_OF_INERTIA {' + ('%17.10e' % i1) + ',\n')
-    f.write(tab*3 + ' '*21 +                    ('%17.10e' % i2) + ',\n')
-    f.write(tab*3 + ' '*21 +                    ('%17.10e' % i3) + '}\n')
-    f.write(tab*3 +   '@CENTRE_OF_MASS_LOCATION {' + ('%17.10e' % cm_x2) + ',\n')
-    f.write(tab*3 + ' '*26 +                         ('%17.10e' % cm_x3) + '}\n')
-    f.write(tab*2 + '}\n')
-    f.write(tab*2 + '\n')
+    lines = [tab*2 + '@' + CoordType + ' {%11.5e} {']
+    lines.append(tab*3 + '@STIFFNESS_MATRIX {%17.10e,' + '%20.10e,'*5)
+    for row in range(1,5):
+        lines.append(tab*3 + ' '*(37+21*(row-1)) + '%20.10e,'*(6-row))
+    lines.append(tab*3 + ' '*(37+21*4) + '%20.10e}')
+    lines.append(tab*3 + '@MASS_PER_UNIT_SPAN {%17.10e}')
+    lines.append(tab*3 + '@MOMENTS_OF_INERTIA {%17.10e,')
+    lines.append(tab*3 + ' '*21 + '%17.10e,')
+    lines.append(tab*3 + ' '*21 + '%17.10e}')
+    lines.append(tab*3 + '@CENTRE_OF_MASS_LOCATION {%17.10e,')
+    lines.append(tab*3 + ' '*26 + '%17.10e}')
+    lines.append(tab*2 + '}')
+    lines.append(tab*2)
+    STATION_TEMPLATES[CoordType] = '\n'.join(lines) + '\n'
+    return STATION_TEMPLATES[CoordType]
+
+
+def formatDymoreMK(CoordType, coord, cm_x2, cm_x3, mpus, i1, i2, i3, K):
+    """
+    Format the mass and stiffness matrices for one or more cross-sections as
+    DYMORE input, with one string formatting operation for all of them.
+
+    Parameters
+    ----------
+    CoordType : <string>
+        Acceptable values are: 'ETA_COORDINATE',
+                               'CURVILINEAR_COORDINATE', or
+                               'AXIAL_COORDINATE'
+    coord : <float or np.array>
+        The spanwise coordinate of each cross-section, shape (N,).
+        This coordinate should match the CoordType specified above.
+    cm_x2, cm_x3 : <float or np.array>
+        The x2- and x3-coordinates of the center of mass, shape (N,).
+    mpus : <float or np.array>
+        The mass per unit span, shape (N,).
+    i1, i2, i3 : <float or np.array>
+        The moments of inertia about the x1-, x2- and x3-axes, shape (N,).
+    K : <np.array>
+        The Timoshenko stiffness matrices, shape (6,6) or (N,6,6).
+
+    Returns
+    -------
+    text : <string>
+        The DYMORE-formatted cross-sections, in the same order as coord.
+    """
+
+    template = stationTemplate(CoordType)
+    coord = np.atleast_1d(np.asarray(coord, dtype=float))
+    N = coord.shape[0]
+    K = np.asarray(K, dtype=float).reshape(N,6,6)
+    data = np.empty((N,28))
+    data[:,0] = coord
+    data[:,1:22] = K[:,K_UPPER[0],K_UPPER[1]]
+    data[:,22] = mpus
+    data[:,23] = i1
+    data[:,24] = i2
+    data[:,25] = i3
+    data[:,26] = cm_x2
+    data[:,27] = cm_x3
+
+    return (template*N) % tuple(data.ravel().tolist())
+
+
+def writeBeamPropertyDefinition(f, propName, CoordType, coord, cm_x2, cm_x3, mpus, i1, i2, i3, K, comments=None):
+    """
+    Write a complete DYMORE @BEAM_PROPERTY_DEFINITION block for N cross-sections
+    in one write.
+
+    Parameters
+    ----------
+    f : <file object>
+        The file handle that data will be written to.
+    propName : <string>
+        The name of the beam property, e.g. 'propCD'.
+    CoordType : <string>
+        Acceptable values are: 'ETA_COORDINATE',
+                               'CURVILINEAR_COORDINATE', or
+                               'AXIAL_COORDINATE'
+    coord : <np.array>
+        The spanwise coordinate of each cross-section, shape (N,).
+        This coordinate should match the CoordType specified above.
+    cm_x2, cm_x3, mpus, i1, i2, i3, K : <np.array>
+        The cross-sectional properties of each cross-section (see
+        formatDymoreMK), e.g. as returned by readMKfiles.
+    comments : <string>
+        (optional) The comment for this beam property.
+
+    Returns
+    -------
+    <none>
+
+    Example
+    -------
+    >>> (files, cm_x2, cm_x3, mpus, i1, i2, i3, K) = readMKfiles('VABS/M_and_K_matrices/spar_station_*.dat.K')
+    >>> f = makeFile('CD_straightBiplane_upper_props.dat')
+    >>> writeBeamPropertyDefinition(f, 'propCD', 'ETA_COORDINATE', eta, cm_x2, cm_x3, mpus, i1, i2, i3, K,
+    ...                             comments='beam properties for spar stations 1-13')
+    >>> f.close()
+    """
+
+    f.write(propertyHeader(propName, CoordType) +
+            formatDymoreMK(CoordType, coord, cm_x2, cm_x3, mpus, i1, i2, i3, K) +
+            propertyFooter(comments))
+
+    return
+
+
+def propertyHeader(propName, CoordType):
+    """
+    Return the text of a @BEAM_PROPERTY_DEFINITION block before its first
+    cross-section.
+    """
+
+    tab = '  '
+    return ''.join(['@BEAM_PROPERTY_DEFINITION {\n',
+                    tab + '@BEAM_PROPERTY_NAME {' + propName + '} {\n',
+                    tab*2 + '@PROPERTY_DEFINITION_TYPE {6X6_MATRICES}\n',
+                    tab*2 + '@COORDINATE_TYPE {' + CoordType + '}\n',
+                    tab*2 + '\n'])
+
+
+def propertyFooter(comments=None):
+    """
+    Return the text of a @BEAM_PROPERTY_DEFINITION block after its last
+    cross-section.
+    """
+
+    tab = '  '
+    text = []
+    if comments is not None:
+        text.append(tab*2 + '@COMMENTS {' + formatComments(comments) + '}\n')
+    text.append(tab + '}\n')
+    text.append('}\n')
+    return ''.join(text)
+
+
+def streamBeamPropertyDefinition(f, propName, CoordType, vabsMKfiles, coord, comments=None, workers=8, prefetch=None):
+    """
+    Write a complete DYMORE @BEAM_PROPERTY_DEFINITION block straight from the
+    VABS output files of its cross-sections, reading and parsing the files in
+    a pool of threads while the stations before them are written.
+
+    The stations are written in order of their coordinates, one at a time, as
+    soon as each one (and every station before it) is parsed. At most prefetch
+    stations are read ahead of the writer, so the memory used does not grow
+    with the number of stations. The text is the same as
+    writeBeamPropertyDefinition writes for the same stations.
+
+    Parameters
+    ----------
+    f : <file object>
+        The file handle that data will be written to.
+    propName : <string>
+        The name of the beam property, e.g. 'propCD'.
+    CoordType : <string>
+        Acceptable values are: 'ETA_COORDINATE',
+                               'CURVILINEAR_COORDINATE', or
+                               'AXIAL_COORDINATE'
+    vabsMKfiles : <list of strings>
+        The VABS output files (*.dat.K), one for each cross-section.
+    coord : <list of floats>
+        The spanwise coordinate of each cross-section, in the same order as
+        vabsMKfiles. This coordinate should match the CoordType specified above.
+    comments : <string>
+        (optional) The comment for this beam property.
+    workers : <int>
+        The number of threads reading and parsing files.
+    prefetch : <int>
+        The most stations read ahead of the writer (default: 4*workers).
+
+    Returns
+    -------
+    <none>
+
+    Example
+    -------
+    >>> files = findMKfiles('VABS/M_and_K_matrices/spar_station_*.dat.K')
+    >>> with open('CD_straightBiplane_upper_props.dat', 'w') as f:
+    ...     streamBeamPropertyDefinition(f, 'propCD', 'ETA_COORDINATE', files, eta)
+    """
+
+    checkCoordType(CoordType)
+    vabsMKfiles = list(vabsMKfiles)
+    coord = [float(c) for c in coord]
+    if len(coord) != len(vabsMKfiles):
+        raise ValueError("%d coordinates for %d VABS files" % (len(coord), len(vabsMKfiles)))
+    if prefetch is None:
+        prefetch = 4*workers
+    stations = iter(sorted(range(len(coord)), key=lambda n: coord[n]))
+
+    f.write(propertyHeader(propName, CoordType))
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        try:
+            for n in islice(stations, max(1, prefetch)):
+                pending.append((n, pool.submit(parseMKfile, vabsMKfiles[n])))
+            while pending:
+                (n, future) = pending.popleft()
+                (scalars, K) = future.result()
+                for m in islice(stations, 1):
+                    pending.append((m, pool.submit(parseMKfile, vabsMKfiles[m])))
+                (cm_x2, cm_x3, mpus, i1, i2, i3) = scalars
+                writeDymoreMK(f, CoordType, coord[n], cm_x2, cm_x3, mpus, i1, i2, i3, K)
+        finally:
+            # after an error, do not start the stations that are still queued
+            for (n, future) in pending:
+                future.cancel()
+    f.write(propertyFooter(comments))
 
     return
 
 
-def writeMKmatrices(DYMOREfileHandle, vabsMKfilepath, station_data, CoordType='ETA_COORDINATE', debug_flag=False):
+def writeMKmatrices(DYMOREfileHandle, vabsMKfilepath, station_data, CoordType='ETA_COORDINATE', debug_flag=False, cache=None):
     """
     Write the mass and stiffness matrices for one cross-section to a file.
 
@@ -262,32 +668,27 @@ def writeMKmatrices(DYMOREfileHandle, vabsMKfilepath, station_data, CoordType='E
                                'AXIAL_COORDINATE'
     debug_flag : <logical>
         Set to True to print out extra debugging information to the screen.
+    cache : <MKcache.MKcache>
+        (optional) A cache of parsed VABS output files. If the VABS file has
+        not changed since it was cached, it is not parsed again.
 
     Returns
     -------
     <none>
     """
 
+    checkCoordType(CoordType)
+    coord = station_data[COORD_KEYS[CoordType]]
     if debug_flag:
-        print "CoordType = " + CoordType
-        if CoordType == 'ETA_COORDINATE':
-            print "eta =", station_data['eta']
-        elif CoordType == 'CURVILINEAR_COORDINATE':
-            # print "s =", station_data['s']
-            print "***WARNING*** CURVILINEAR_COORDINATE feature is not yet supported."
-        elif CoordType == 'AXIAL_COORDINATE':
-            # print "x1 =", station_data['x1']
-            print "***WARNING*** AXIAL_COORDINATE feature is not yet supported."
-    MKlines = readFile(vabsMKfilepath)
-    (cm_x2, cm_x3, mpus, i1, i2, i3, K) = pullMKmatrices(MKlines, print_flag=debug_flag)
-    if CoordType == 'ETA_COORDINATE':
-        writeDymoreMK(DYMOREfileHandle, CoordType, station_data['eta'], cm_x2, cm_x3, mpus, i1, i2, i3, K)
-    elif CoordType == 'CURVILINEAR_COORDINATE':
-        # writeDymoreMK(DYMOREfileHandle, CoordType, station_data['s'], cm_x2, cm_x3, mpus, i1, i2, i3, K)
-        print "***WARNING*** CURVILINEAR_COORDINATE feature is not yet supported."
-    elif CoordType == 'AXIAL_COORDINATE':
-        # writeDymoreMK(DYMOREfileHandle, CoordType, station_data['x1'], cm_x2, cm_x3, mpus, i1, i2, i3, K)
-        print "***WARNING*** AXIAL_COORDINATE feature is not yet supported."
+        print("CoordType = " + CoordType)
+        print(COORD_KEYS[CoordType] + " =", coord)
+    if cache is None:
+        MKlines = readFile(vabsMKfilepath)
+        (cm_x2, cm_x3, mpus, i1, i2, i3, K) = pullMKmatrices(MKlines, print_flag=debug_flag)
+    else:
+        (scalars, K) = cache.parseMKfile(vabsMKfilepath)
+        (cm_x2, cm_x3, mpus, i1, i2, i3) = scalars
+    writeDymoreMK(DYMOREfileHandle, CoordType, coord, cm_x2, cm_x3, mpus, i1, i2, i3, K)
 
     return
 
@@ -331,7 +732,7 @@ def formatComments(comments):
             line5 = comments[480:]
             comments = line1 + '/' + line2 + '/' + line3 + '/' + line4 + '/' + line5
         else:
-            print "***WARNING*** the comment was too long and was truncated to 600 characters!"
+            print("***WARNING*** the comment was too long and was truncated to 600 characters!")
             line1 = comments[0:120]
             line2 = comments[120:240]
             line3 = comments[240:360]
@@ -343,5 +744,5 @@ def formatComments(comments):
 
 
 if __name__ == '__main__':  #run this code if DYMOREutilities is called directly from the command line (good for debugging)
-    print "hello world"
+    print("hello world")
     
@@ -0,0 +1,242 @@
+"""
+A persistent, on-disk cache for the mass and stiffness matrices parsed from VABS
+output files (*.dat.K).
+
+Parsed stations are stored as rows of one fixed-size, memory-mapped .npy array.
+Each row is keyed by the SHA-1 hash of the VABS file contents, so identical
+cross-sections share one row. An index of (path, mtime, size) -> hash lets
+unchanged files skip both reading and hashing; lookups for those files become a
+read from the memory-mapped array. The least recently used rows are evicted
+once the array is full, along with the index entries of the files that had
+them, so the index stays as small as the store.
+
+Example
+-------
+>>> from DYMORE import DYMOREutilities as du
+>>> from DYMORE.MKcache import MKcache
+>>> with MKcache('.MKcache') as cache:
+...     stations = du.readMKfiles('VABS/M_and_K_matrices', cache=cache)
+...     print(cache.stats())
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from . import DYMOREutilities as du
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.spardesign', 'MKcache')
+INDEX_FILENAME = 'index.json'
+STORE_FILENAME = 'stations.npy'
+ROW_LENGTH = 6 + 36  # cm_x2, cm_x3, mpus, i1, i2, i3, then the 6x6 stiffness matrix
+ROW_BYTES = ROW_LENGTH * 8
+
+
+class MKcache(object):
+    """
+    A content-hashed cache of parsed VABS output files.
+
+    Parameters
+    ----------
+    cache_dir : <string>
+        The directory where the cache is stored. It is created if it does not
+        exist.
+    max_bytes : <int>
+        The maximum size of the station store, in bytes. The least recently
+        used stations are evicted when the store is full.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=16*1024**2):
+        self.cache_dir = cache_dir
+        self.capacity = max(1, int(max_bytes) // ROW_BYTES)
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        self._index_path = os.path.join(cache_dir, INDEX_FILENAME)
+        self._store_path = os.path.join(cache_dir, STORE_FILENAME)
+        self._open()
+        self.resetStats()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+    def _open(self):
+        """
+        Memory-map the station store and read the index, or start a new cache
+        if either one is missing, corrupt, or the wrong size.
+        """
+
+        self._files = {}                # path -> [mtime, size, digest]
+        self._entries = OrderedDict()   # digest -> row, the least recently used first
+        try:
+            with open(self._index_path, 'r') as f:
+                index = json.load(f)
+            data = np.lib.format.open_memmap(self._store_path, mode='r+')
+            if data.shape != (self.capacity, ROW_LENGTH):
+                raise ValueError("cache store has the wrong size")
+            self._files = index['files']
+            self._entries = OrderedDict((digest, row) for (digest, row) in index['lru'])
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            self._files = {}
+            self._entries = OrderedDict()
+            data = np.lib.format.open_memmap(self._store_path, mode='w+', dtype=np.float64,
+                                             shape=(self.capacity, ROW_LENGTH))
+        self._data = data
+        used = set(self._entries.values())
+        self._free = [row for row in range(self.capacity-1, -1, -1) if row not in used]
+        # digest -> the paths of the files that have it, to prune the index
+        # when a station is evicted
+        self._paths = {}
+        for (path, known) in list(self._files.items()):
+            if known[2] in self._entries:
+                self._paths.setdefault(known[2], set()).add(path)
+            else:
+                del self._files[path]
+
+    def flush(self):
+        """
+        Write the station store and the index to the cache directory.
+        """
+
+        self._data.flush()
+        tmp = self._index_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'files': self._files, 'lru': list(self._entries.items())}, f)
+        os.replace(tmp, self._index_path)
+
+    def resetStats(self):
+        """
+        Reset the hit/miss counters and the list of reparsed files.
+        """
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.reparsed = []
+
+    def stats(self):
+        """
+        Return the cache statistics.
+
+        Returns
+        -------
+        stats : <dictionary>
+            'hits', 'misses' and 'evictions' since the last reset, 'reparsed'
+            (the list of files that had to be parsed), 'entries' and 'bytes'
+            (the current size of the cache).
+        """
+
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'reparsed': list(self.reparsed),
+                'entries': len(self._entries),
+                'bytes': len(self._entries) * ROW_BYTES}
+
+    def _lookup(self, digest, scalars, K):
+        """
+        Copy a cached station into scalars and K. Returns False if the station
+        is not in the cache.
+        """
+
+        if digest not in self._entries:
+            return False
+        self._entries.move_to_end(digest)
+        row = self._data[self._entries[digest]]
+        scalars[:] = row[:6]
+        K[:,:] = row[6:].reshape(6,6)
+        return True
+
+    def _insert(self, digest, scalars, K):
+        """
+        Save a parsed station to the cache, evicting the least recently used
+        station if the store is full.
+        """
+
+        if not self._free:
+            (lru, row) = self._entries.popitem(last=False)
+            self._free.append(row)
+            for path in self._paths.pop(lru, ()):
+                del self._files[path]
+            self.evictions += 1
+        row = self._free.pop()
+        self._data[row,:6] = scalars
+        self._data[row,6:] = K.ravel()
+        self._entries[digest] = row
+
+    def _remember(self, path, st, digest):
+        """
+        Record the (mtime, size) and hash of a file in the index.
+        """
+
+        known = self._files.get(path)
+        if known is not None and known[2] != digest:
+            paths = self._paths.get(known[2])
+            if paths is not None:
+                paths.discard(path)
+                if not paths:
+                    del self._paths[known[2]]
+        self._files[path] = [st.st_mtime, st.st_size, digest]
+        self._paths.setdefault(digest, set()).add(path)
+
+    def parseMKfile(self, vabsMKfilepath, scalars=None, K=None):
+        """
+        Parse one VABS output file (*.dat.K), using the cache if possible.
+
+        Takes the same arguments and returns the same values as
+        DYMOREutilities.parseMKfile.
+        """
+
+        if scalars is None:
+            scalars = np.empty(6)
+        if K is None:
+            K = np.empty((6,6))
+
+        key = os.path.abspath(vabsMKfilepath)
+        st = os.stat(key)
+        known = self._files.get(key)
+        if known is not None and known[0] == st.st_mtime and known[1] == st.st_size:
+            if self._lookup(known[2], scalars, K):
+                self.hits += 1
+                return (scalars, K)
+
+        # the file is new or has changed: hash its contents, and parse the
+        # same bytes on a miss (the file may be rewritten meanwhile)
+        with open(key, 'rb') as f:
+            data = f.read()
+            after = os.fstat(f.fileno())
+        digest = hashlib.sha1(data).hexdigest()
+        # only a file that did not change while it was read is indexed; one
+        # that did is hashed again the next time
+        unchanged = (after.st_mtime == st.st_mtime and after.st_size == st.st_size == len(data))
+        if self._lookup(digest, scalars, K):
+            if unchanged:
+                self._remember(key, st, digest)
+            self.hits += 1
+            return (scalars, K)
+
+        self.misses += 1
+        self.reparsed.append(vabsMKfilepath)
+        du.parseMKlines(data.decode().splitlines(), scalars, K, vabsMKfilepath)
+        self._insert(digest, scalars, K)
+        if unchanged:
+            self._remember(key, st, digest)
+        return (scalars, K)
+
+    def clear(self):
+        """
+        Remove every station from the cache, and reset the statistics.
+        """
+
+        self._files = {}
+        self._entries = OrderedDict()
+        self._paths = {}
+        self._free = list(range(self.capacity-1, -1, -1))
+        self.resetStats()
+        self.flush()
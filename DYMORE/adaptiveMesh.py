@@ -0,0 +1,258 @@
+"""
+Functions in the adaptiveMesh module place the beam elements of a DYMORE deck
+where they are needed, instead of one element between each pair of spar
+stations, and write the new @CURVE_MESH_PARAMETERS definitions back into the
+deck's mesh files.
+
+The element density along each beam is set by three limits (whichever needs
+the most elements wins):
+  - the reference line may turn by at most max_turn radians in one element
+    (the curvature of get_curvatures_tangents_normals.m, times the arc length),
+  - no diagonal term of the 6x6 stiffness matrix may change by more than a
+    factor exp(max_stiffness_change) in one element,
+  - no element may be longer than max_length (if given).
+The elements are then spread so that each one takes an equal share of the
+density. Straight beams with smoothly varying properties (e.g. CD and EF) get
+a few long elements; curved beams (the joint transitions DE and HE) keep (or
+gain) elements where they bend.
+
+Example
+-------
+>>> from DYMORE import adaptiveMesh as am
+>>> meshes = am.adaptDeck('full-height_biplane_spar/flapwise_tipload/1e03/biplane_spar.dym', write=False)
+>>> dict((name, len(eta) - 1) for (name, eta) in sorted(meshes.items()))
+{'meshCD': 3, 'meshDE': 5, 'meshEF': 8, 'meshGH': 3, 'meshHE': 5}
+"""
+
+import os
+import re
+
+import numpy as np
+
+from . import DYMOREdeck as dd
+from . import beamAssembly as ba
+from . import beamSolver as bs
+from . import nurbs
+
+
+MAX_TURN = np.radians(15.0)      # [rad] per element
+MAX_STIFFNESS_CHANGE = 0.75      # change of ln(S_ii) per element
+SAMPLES = 2001                   # eta samples used to integrate the density
+
+
+def stiffnessGradient(prop_eta, S, eta):
+    """
+    Return the largest rate of change of ln(S_ii) over the diagonal terms of
+    the 6x6 stiffness matrices, per unit eta, at each eta (the properties vary
+    linearly between cross-sections, as in beamSolver.interpolateProperties).
+    """
+
+    prop_eta = np.asarray(prop_eta, dtype=float)
+    eta = np.asarray(eta, dtype=float)
+    if len(prop_eta) < 2:
+        return np.zeros(len(eta))
+    diag = np.diagonal(np.asarray(S, dtype=float), axis1=1, axis2=2)
+    logS = np.log(np.where(diag > 0.0, diag, 1.0))
+    d_eta = np.diff(prop_eta)
+    rate = np.divide(np.abs(np.diff(logS, axis=0)), d_eta[:,None],
+                     out=np.zeros((len(d_eta), 6)), where=d_eta[:,None] > 0.0).max(axis=1)
+    j = np.clip(np.searchsorted(prop_eta, eta, side='right') - 1, 0, len(prop_eta) - 2)
+    inside = (eta >= prop_eta[0]) & (eta <= prop_eta[-1])
+    return np.where(inside, rate[j], 0.0)
+
+
+def meshDensity(curve, prop_eta, S, eta, max_turn=MAX_TURN, max_stiffness_change=MAX_STIFFNESS_CHANGE, max_length=None):
+    """
+    Return the number of elements needed per unit eta, at each eta.
+
+    Parameters
+    ----------
+    curve : <tuple>
+        The reference line, (ctrl, weights, degree, knots).
+    prop_eta : <np.array>
+        The eta-coordinates of the cross-sections, shape (N,).
+    S : <np.array>
+        The 6x6 stiffness matrices of the cross-sections, shape (N,6,6).
+    eta : <np.array>
+        Where to evaluate the density.
+    max_turn, max_stiffness_change, max_length :
+        The limits (see the module docstring).
+
+    Returns
+    -------
+    density : <np.array>
+        The same shape as eta.
+    """
+
+    (C, dC, d2C) = nurbs.curveDerivatives(*curve, eta, 2)
+    ds_deta = np.linalg.norm(dC, axis=1)
+    turn = np.linalg.norm(np.cross(dC, d2C), axis=1)/ds_deta**2    # d(angle)/deta
+    density = np.maximum(turn/max_turn, stiffnessGradient(prop_eta, S, eta)/max_stiffness_change)
+    if max_length is not None:
+        density = np.maximum(density, ds_deta/max_length)
+    return density
+
+
+def adaptiveEtas(curve, prop_eta, S, max_turn=MAX_TURN, max_stiffness_change=MAX_STIFFNESS_CHANGE,
+                 max_length=None, min_elements=1, decimals=4):
+    """
+    Place the elements of one beam.
+
+    Parameters
+    ----------
+    curve, prop_eta, S, max_turn, max_stiffness_change, max_length :
+        See meshDensity.
+    min_elements : <int>
+        The fewest elements to use.
+    decimals : <int>
+        Round the eta-coordinates to this many decimals (as they are written
+        to the mesh file).
+
+    Returns
+    -------
+    elem_eta : <np.array>
+        The eta-coordinates of the element ends, from 0 to 1.
+    """
+
+    eta = np.linspace(0.0, 1.0, SAMPLES)
+    density = meshDensity(curve, prop_eta, S, eta, max_turn, max_stiffness_change, max_length)
+    cumulative = np.concatenate([[0.0], np.cumsum(0.5*(density[1:] + density[:-1])*np.diff(eta))])
+    nelem = max(int(min_elements), int(np.ceil(cumulative[-1] - 1.0e-9)))
+    if cumulative[-1] > 0.0:
+        # equal shares of the density (the density is never negative, so the
+        # cumulative sum only has flat spots where no elements are needed)
+        elem_eta = np.interp(np.linspace(0.0, cumulative[-1], nelem + 1), cumulative, eta)
+    else:
+        elem_eta = np.linspace(0.0, 1.0, nelem + 1)
+    elem_eta = np.round(elem_eta, decimals)
+    elem_eta[0] = 0.0
+    elem_eta[-1] = 1.0
+    if np.any(np.diff(elem_eta) <= 0.0):
+        raise ValueError("elements are too short to write with %d decimals" % decimals)
+    return elem_eta
+
+
+def beamMeshNames(deck):
+    """
+    Return the @CURVE_MESH_PARAMETERS_NAME of each beam in a deck, as a
+    dictionary of beam name -> mesh name.
+    """
+
+    names = {}
+    for beamNode in deck.findAll('BEAM_NAME'):
+        if beamNode.children is None:
+            continue
+        edge = bs._definition(deck, 'EDGE_NAME', beamNode.find('EDGE_NAME').text)
+        curve = bs._definition(deck, 'CURVE_NAME', edge.find('CURVE_NAME').text)
+        names[beamNode.text] = curve.find('CURVE_MESH_PARAMETERS_NAME').text
+    return names
+
+
+def adaptDeck(deck, write=True, **criteria):
+    """
+    Place the elements of every beam in a deck (see adaptiveEtas for the
+    criteria), and optionally write the new meshes (see writeMeshes).
+
+    Parameters
+    ----------
+    deck : <DeckFile or string>
+        The deck, or the path to its *.dym file.
+    write : <bool>
+        If True, write the new meshes into the deck's files.
+
+    Returns
+    -------
+    meshes : <dictionary>
+        mesh name -> eta-coordinates of the element ends.
+    """
+
+    if not isinstance(deck, dd.DeckFile):
+        deck = dd.readDeck(deck)
+    graph = ba.readBeamGraph(deck)
+    names = beamMeshNames(deck)
+    meshes = {}
+    for beam in graph.beams:
+        meshes[names[beam.name]] = adaptiveEtas(beam.curve, beam.prop_eta, beam.prop_S, **criteria)
+    if write:
+        writeMeshes(deck, meshes)
+    return meshes
+
+
+def _formatLike(old, value):
+    # write a number in the style of the value it replaces
+    width = len(old)
+    old = old.strip()
+    if 'e' in old.lower():
+        digits = len(old.lower().split('e')[0].split('.')[-1]) if '.' in old else 0
+        return '%*.*e' % (width, digits, value)
+    digits = len(old.split('.')[-1]) if '.' in old else 0
+    return '%*.*f' % (width, digits, value)
+
+
+def setMesh(meshNode, elem_eta):
+    """
+    Replace the @ETA_COORDINATEs and @NUMBER_OF_ELEMENTS of a
+    @CURVE_MESH_PARAMETERS_NAME node, keeping the layout of the file (and the
+    element count in its @COMMENTS).
+    """
+
+    old = [n for n in meshNode.children if n.keyword == 'ETA_COORDINATE']
+    nelem = len(elem_eta) - 1
+    count = meshNode.find('NUMBER_OF_ELEMENTS')
+    count.value = '%*d' % (len(count.value), nelem)
+    comments = meshNode.find('COMMENTS')
+    if comments is not None:
+        comments.value = re.sub(r'with\s*\d+ ', 'with %2d ' % nelem, comments.value)
+    # new eta-coordinates are laid out like the old ones (or, for a mesh
+    # that had none, like @ORDER_OF_ELEMENTS, and written after it)
+    template = old[0] if old else meshNode.find('ORDER_OF_ELEMENTS')
+    value = old[0].value if old else '0.0000'
+    new = []
+    for eta in elem_eta:
+        node = dd.DeckNode('ETA_COORDINATE', _formatLike(value, eta))
+        (node._prefix, node._kwgap) = (template._prefix, template._kwgap)
+        new.append(node)
+    others = [n for n in meshNode.children if n.keyword != 'ETA_COORDINATE']
+    i = meshNode.children.index(template) + (0 if old else 1)
+    meshNode.children = others[:i] + new + others[i:]
+
+
+def writeMeshes(deck, meshes):
+    """
+    Write new meshes into the files of a deck that define them.
+
+    Each file is re-parsed privately (the cached deck is not modified) and
+    replaced, not rewritten in place, so a copy of the file that is hard-linked
+    into other case directories (see caseGenerator) keeps its old meshes. The
+    replaced files are dropped from the deck cache, so the next readDeck (of
+    them, or of a deck that includes them) sees the new meshes.
+
+    Parameters
+    ----------
+    deck : <DeckFile>
+        The deck.
+    meshes : <dictionary>
+        mesh name -> eta-coordinates of the element ends.
+
+    Returns
+    -------
+    written : <list of strings>
+        The paths of the files that were written.
+    """
+
+    written = []
+    for f in deck.iterFiles():
+        names = [n.text for n in f.findAll('CURVE_MESH_PARAMETERS_NAME', includes=False)
+                 if n.children is not None and n.text in meshes]
+        if not names:
+            continue
+        with open(f.path, 'r', newline='') as fh:
+            private = dd.parseDeck(fh.read(), f.path)
+        for name in names:
+            setMesh(private.findDefinition('CURVE_MESH_PARAMETERS_NAME', name, includes=False), meshes[name])
+        tmp = f.path + '.tmp'
+        private.write(tmp)
+        os.replace(tmp, f.path)
+        written.append(f.path)
+    dd.forgetDecks(written)
+    return written
@@ -0,0 +1,684 @@
+"""
+Functions in the beamAssembly module solve the linear static problem for any
+number of beams joined at vertices, e.g. the biplane spar (CD, DE, EF, GH and
+HE, joined at vertices C-H), with a sparse stiffness matrix.
+
+Each beam follows its NURBS reference line (@CURVE_DEFINITION; straight or
+curved, with the point coordinates taken from the design parameter file) and
+is meshed like DYMORE meshes it (see beamSolver). Beams that share a vertex
+share that node, so they are rigidly connected there. The global stiffness
+matrix is assembled in sparse (CSC) format and factored once with a sparse
+direct solver; the solve time grows close to linearly with the number of
+elements.
+
+Results are written in the same layout as the DYMORE surveys (see beamSolver),
+so the plot scripts read the svy_disp_CD.mdt ... svy_force_HE.mdt files
+unchanged. Forces, moments and strains are given in the inertial frame when
+the survey asks for @FRAME_NAME {INERTIAL}, and in the cross-section frame
+otherwise.
+
+Example
+-------
+>>> from DYMORE import beamAssembly as ba
+>>> import glob
+>>> cases = sorted(glob.glob('full-height_biplane_spar/*_tipload/*'))
+>>> written = ba.solveCases(cases)   # one factorization for all 8 load cases
+"""
+
+import glob
+import hashlib
+import os
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import splu
+
+from . import DYMOREdeck as dd
+from . import beamSolver as bs
+from . import nurbs
+
+
+# the number of elements whose stiffness matrices are computed at once
+ELEMENT_CHUNK = 4096
+
+
+def skew(v):
+    """
+    Return the skew-symmetric matrices of vectors v, shape (..., 3, 3), so
+    that skew(a) b = a x b.
+    """
+
+    S = np.zeros(v.shape[:-1] + (3,3))
+    S[...,0,1] = -v[...,2]
+    S[...,0,2] = v[...,1]
+    S[...,1,0] = v[...,2]
+    S[...,1,2] = -v[...,0]
+    S[...,2,0] = -v[...,1]
+    S[...,2,1] = v[...,0]
+    return S
+
+
+def sectionMassMatrices(mpus, i1, i2, i3, cm_x2, cm_x3):
+    """
+    Return the 6x6 sectional mass matrices of cross-sections, about the
+    reference line and in the cross-section frame, from their mass per unit
+    span, moments of inertia (about the x1-, x2- and x3-axes through the
+    centre of mass; the x2- and x3-axes are taken to be principal) and centre
+    of mass location (see DYMOREdeck.readBeamProperties).
+
+    Returns
+    -------
+    M : <np.array>
+        Shape (N,6,6): the rows and columns are the velocities (u1', u2',
+        u3') and angular velocities of the cross-sections.
+    """
+
+    mpus = np.asarray(mpus, dtype=float)
+    r = np.zeros(mpus.shape + (3,))
+    r[...,1] = cm_x2
+    r[...,2] = cm_x3
+    mr = mpus[...,None,None]*skew(r)
+    M = np.zeros(mpus.shape + (6,6))
+    M[...,0:3,0:3] = mpus[...,None,None]*np.eye(3)
+    M[...,0:3,3:6] = -mr
+    M[...,3:6,0:3] = mr
+    # the moments of inertia about the reference line (parallel axes)
+    M[...,3,3] = i1
+    M[...,4,4] = i2
+    M[...,5,5] = i3
+    M[...,3:6,3:6] += mpus[...,None,None]*(np.sum(r*r, axis=-1)[...,None,None]*np.eye(3) - r[...,:,None]*r[...,None,:])
+    return M
+
+
+def sectionTriads(tangent):
+    """
+    Return the cross-section frames of an untwisted beam: e1 along the unit
+    tangent, e2 along the inertial x2-axis (made normal to e1), and e3 = e1 x e2.
+    A beam along the x1-axis gets the inertial frame.
+
+    Returns
+    -------
+    R : <np.array>
+        Shape tangent.shape[:-1] + (3,3); the columns are e1, e2, e3.
+    """
+
+    e1 = tangent
+    ref = np.zeros_like(e1)
+    ref[...,1] = 1.0
+    parallel = np.abs(e1[...,1]) > 0.99
+    ref[parallel] = [0.0, 0.0, 1.0]
+    e2 = ref - np.sum(ref*e1, axis=-1)[...,None]*e1
+    e2 /= np.linalg.norm(e2, axis=-1)[...,None]
+    e3 = np.cross(e1, e2)
+    return np.stack([e1, e2, e3], axis=-1)
+
+
+class CurvedBeam(object):
+    """
+    The finite element mesh of a beam along a NURBS reference line.
+
+    The degrees of freedom are the displacements and (small) rotations of the
+    nodes, in the inertial frame.
+
+    Parameters
+    ----------
+    ctrl, weights, degree, knots :
+        The reference line (see nurbs.curveDerivatives).
+    elem_eta : <np.array>
+        The eta-coordinates (curve parameters) of the element ends, shape
+        (nelem+1,).
+    order : <int>
+        The order of the elements (1 = linear, 3 = cubic, ...).
+    prop_eta : <np.array>
+        The eta-coordinates of the cross-sections, shape (N,).
+    S : <np.array>
+        The 6x6 stiffness matrices of the cross-sections, shape (N,6,6).
+    name : <string>
+        (optional) The name of the beam.
+    M : <np.array>
+        (optional) The 6x6 mass matrices of the cross-sections, shape
+        (N,6,6) (see sectionMassMatrices); needed for elementMass.
+    """
+
+    def __init__(self, ctrl, weights, degree, knots, elem_eta, order, prop_eta, S, name=None, M=None):
+        self.name = name
+        self.curve = (ctrl, weights, degree, knots)
+        self.elem_eta = np.asarray(elem_eta, dtype=float)
+        self.order = int(order)
+        self.nelem = len(self.elem_eta) - 1
+        self.nnodes = self.nelem*self.order + 1
+        self.ndof = 6*self.nnodes
+        self.prop_eta = np.asarray(prop_eta, dtype=float)
+        self.prop_S = np.asarray(S, dtype=float)
+        self.prop_M = None if M is None else np.asarray(M, dtype=float)
+
+        self._xi_nodes = xi_nodes = np.linspace(-1.0, 1.0, self.order + 1)
+        (xi_gauss, self._w_gauss) = np.polynomial.legendre.leggauss(self.order)
+        (self._N, self._dN) = bs.lagrangeBasis(xi_nodes, xi_gauss)
+
+        a = self.elem_eta[:-1, None]
+        b = self.elem_eta[1:, None]
+        self.node_eta = np.append(((a + b)/2 + (b - a)/2*xi_nodes[None,:])[:,:-1].ravel(), self.elem_eta[-1])
+        self.gauss_eta = (a + b)/2 + (b - a)/2*xi_gauss[None,:]  # (nelem, ng)
+
+        self.node_xyz = nurbs.curveDerivatives(ctrl, weights, degree, knots, self.node_eta, 0)[0]
+        C = nurbs.curveDerivatives(ctrl, weights, degree, knots, self.gauss_eta.ravel(), 1)
+        speed = np.linalg.norm(C[1], axis=1)                    # ds/deta
+        self.tangent = (C[1]/speed[:,None]).reshape(self.nelem, self.order, 3)
+        self.ds_deta = speed.reshape(self.nelem, self.order)
+        self.R = sectionTriads(self.tangent)                     # (nelem, ng, 3, 3)
+        self.length = np.sum(self._w_gauss[None,:]*self.ds_deta*(b - a)/2)
+
+        nodes = np.arange(self.nelem)[:,None]*self.order + np.arange(self.order+1)[None,:]
+        self.elem_dofs = (6*nodes[:,:,None] + np.arange(6)).reshape(self.nelem, -1)
+
+    def _strainMatrices(self, elems):
+        """
+        Return the integration weights (shape (ne, ng)) and strain-displacement
+        matrices (shape (ne, ng, 6, 6n)) at the Gauss points of some elements.
+        """
+
+        ds_dxi = self.ds_deta[elems]*((self.elem_eta[1:] - self.elem_eta[:-1])[elems]/2)[:,None]
+        weights = self._w_gauss[None,:]*ds_dxi
+        Rt = np.swapaxes(self.R[elems], -1, -2)
+        RtT = np.matmul(Rt, skew(self.tangent[elems]))
+        ne = len(ds_dxi)
+        n = self.order + 1
+        dNds = self._dN[None,:,:]/ds_dxi[:,:,None]
+        # strains in the cross-section frame: R^T (u' + t x r) and R^T r'
+        B = np.zeros((ne, self.order, 6, n, 6))
+        B[:,:,0:3,:,0:3] = dNds[:,:,None,:,None]*Rt[:,:,:,None,:]
+        B[:,:,0:3,:,3:6] = self._N[None,:,None,:,None]*RtT[:,:,:,None,:]
+        B[:,:,3:6,:,3:6] = dNds[:,:,None,:,None]*Rt[:,:,:,None,:]
+        return (weights, B.reshape(ne, self.order, 6, 6*n))
+
+    def elementStiffness(self, elems=slice(None)):
+        """
+        Return the stiffness matrices of some (by default all) elements, shape
+        (ne, 6n, 6n).
+        """
+
+        (weights, B) = self._strainMatrices(elems)
+        S = bs.interpolateProperties(self.prop_eta, self.prop_S, self.gauss_eta[elems])
+        return np.einsum('eg,egki,egkl,eglj->eij', weights, B, S, B, optimize=True)
+
+    def elementMass(self, elems=slice(None)):
+        """
+        Return the consistent mass matrices of some (by default all) elements,
+        shape (ne, 6n, 6n), in the inertial frame. They are integrated with
+        order+1 Gauss points, one more than the stiffness matrices, so that
+        the mass matrix is positive definite.
+        """
+
+        if self.prop_M is None:
+            raise ValueError("beam %s has no mass properties" % self.name)
+        (xi, w) = np.polynomial.legendre.leggauss(self.order + 1)
+        N = bs.lagrangeBasis(self._xi_nodes, xi)[0]                      # (ng, n)
+        a = self.elem_eta[:-1][elems, None]
+        b = self.elem_eta[1:][elems, None]
+        eta = (a + b)/2 + (b - a)/2*xi[None,:]                             # (ne, ng)
+        (ctrl, weights, degree, knots) = self.curve
+        C = nurbs.curveDerivatives(ctrl, weights, degree, knots, eta.ravel(), 1)
+        speed = np.linalg.norm(C[1], axis=1)
+        R = sectionTriads(C[1]/speed[:,None]).reshape(eta.shape + (3,3))
+        Rb = np.zeros(eta.shape + (6,6))
+        Rb[...,0:3,0:3] = R
+        Rb[...,3:6,3:6] = R
+        M = np.matmul(np.matmul(Rb, bs.interpolateProperties(self.prop_eta, self.prop_M, eta)),
+                      np.swapaxes(Rb, -1, -2))
+        dm = w[None,:]*speed.reshape(eta.shape)*(b - a)/2
+        n = self.order + 1
+        Me = np.einsum('eg,gi,gj,egkl->eikjl', dm, N, N, M, optimize=True)
+        return Me.reshape(len(eta), 6*n, 6*n)
+
+    def strains(self, U):
+        """
+        Return the strains at the Gauss points, in the cross-section frames,
+        for nodal displacement vectors U (shape (ncases, nnodes, 6)). Returns
+        shape (ncases, nelem, ng, 6).
+        """
+
+        (weights, B) = self._strainMatrices(slice(None))
+        Ue = np.asarray(U).reshape(-1, self.ndof)[:,self.elem_dofs]
+        return np.einsum('egkj,cej->cegk', B, Ue, optimize=True)
+
+    def forces(self, strains):
+        """
+        Return the sectional forces and moments at the Gauss points, in the
+        cross-section frames, from the strains there (see strains).
+        """
+
+        S = bs.interpolateProperties(self.prop_eta, self.prop_S, self.gauss_eta)
+        return np.einsum('egkl,cegl->cegk', S, strains, optimize=True)
+
+    def toInertial(self, values):
+        """
+        Rotate pairs of 3-vectors at the Gauss points (e.g. forces and
+        moments, shape (ncases, nelem, ng, 6)) from the cross-section frames to
+        the inertial frame.
+        """
+
+        out = np.empty_like(values)
+        out[...,0:3] = np.einsum('egij,cegj->cegi', self.R, values[...,0:3])
+        out[...,3:6] = np.einsum('egij,cegj->cegi', self.R, values[...,3:6])
+        return out
+
+
+class BeamGraph(object):
+    """
+    Beams joined at vertices. Each beam's first and last nodes are the
+    vertices at its ends; every beam connected to a vertex shares its node
+    there, which joins the beams rigidly.
+
+    Parameters
+    ----------
+    beams : <list of CurvedBeam>
+        The beams.
+    ends : <list of tuples>
+        The names of the vertices at the start and end of each beam.
+    """
+
+    def __init__(self, beams, ends):
+        self.beams = list(beams)
+        self.ends = list(ends)
+        self.vertices = {}
+        count = 0
+        for (v0, v1) in self.ends:
+            for v in (v0, v1):
+                if v not in self.vertices:
+                    self.vertices[v] = count
+                    count += 1
+        # global node numbers: the vertices first, then the interior nodes of
+        # each beam in turn
+        self.node_maps = []
+        for (beam, (v0, v1)) in zip(self.beams, self.ends):
+            interior = np.arange(count, count + beam.nnodes - 2)
+            count += beam.nnodes - 2
+            self.node_maps.append(np.concatenate([[self.vertices[v0]], interior, [self.vertices[v1]]]))
+        self.nnodes = count
+        self.ndof = 6*count
+        self.fixed = np.zeros((self.nnodes, 6), dtype=bool)
+
+    @property
+    def nelem(self):
+        return sum(beam.nelem for beam in self.beams)
+
+    def assemble(self):
+        """
+        Return the global stiffness matrix, a scipy.sparse CSC matrix of shape
+        (ndof, ndof).
+        """
+
+        return self._assemble(lambda beam, elems: beam.elementStiffness(elems))
+
+    def assembleMass(self):
+        """
+        Return the global (consistent) mass matrix, a scipy.sparse CSC matrix
+        of shape (ndof, ndof). Every beam needs mass properties.
+        """
+
+        return self._assemble(lambda beam, elems: beam.elementMass(elems))
+
+    def _assemble(self, elementMatrices):
+        # fill preallocated (row, column, value) triplets, one chunk of
+        # elements at a time, so only one copy of them is ever in memory
+        total = sum(beam.nelem*(6*(beam.order+1))**2 for beam in self.beams)
+        rows = np.empty(total, dtype=np.int32)
+        cols = np.empty(total, dtype=np.int32)
+        vals = np.empty(total)
+        pos = 0
+        for (beam, node_map) in zip(self.beams, self.node_maps):
+            dof_map = (6*node_map[:,None] + np.arange(6)).ravel().astype(np.int32)
+            for start in range(0, beam.nelem, ELEMENT_CHUNK):
+                elems = slice(start, min(start + ELEMENT_CHUNK, beam.nelem))
+                Ke = elementMatrices(beam, elems)
+                dofs = dof_map[beam.elem_dofs[elems]]
+                n = dofs.shape[1]
+                end = pos + Ke.size
+                rows[pos:end] = np.repeat(dofs, n, axis=1).ravel()
+                cols[pos:end] = np.tile(dofs, (1, n)).ravel()
+                vals[pos:end] = Ke.ravel()
+                pos = end
+        K = sp.coo_matrix((vals, (rows, cols)), shape=(self.ndof, self.ndof))
+        return K.tocsc()
+
+    def beamDisplacements(self, U):
+        """
+        Split global displacement vectors (shape (ncases, nnodes, 6)) into the
+        nodal displacements of each beam.
+        """
+
+        return [U[:,node_map,:] for node_map in self.node_maps]
+
+
+class SparseStaticSolver(object):
+    """
+    The sparse factored stiffness matrix of a beam graph, for solving any
+    number of load cases.
+
+    Parameters
+    ----------
+    graph : <BeamGraph>
+        The beams.
+    fixed : <np.array of bool>
+        (optional) Which degrees of freedom are held at zero, shape (ndof,) or
+        (nnodes, 6). Defaults to graph.fixed.
+    K : <scipy.sparse matrix>
+        (optional) The global stiffness matrix, if it is already assembled.
+    """
+
+    def __init__(self, graph, fixed=None, K=None):
+        self.graph = graph
+        self.fixed = np.asarray(graph.fixed if fixed is None else fixed, dtype=bool).ravel()
+        if not self.fixed.any():
+            raise ValueError("the beams have no boundary conditions")
+        self.free = np.flatnonzero(~self.fixed)
+        if K is None:
+            K = graph.assemble()
+        Kff = K[self.free,:][:,self.free]
+        self.factor = splu(Kff.tocsc(), permc_spec='MMD_AT_PLUS_A')
+
+    def solve(self, loads):
+        """
+        Solve for the displacements under one or more load cases.
+
+        Parameters
+        ----------
+        loads : <np.array>
+            The nodal forces and moments in the inertial frame, shape
+            (ncases, nnodes, 6) or (ncases, ndof).
+
+        Returns
+        -------
+        U : <np.array>
+            The nodal displacements and rotations, shape (ncases, nnodes, 6).
+        """
+
+        P = np.asarray(loads, dtype=float).reshape(-1, self.graph.ndof)
+        U = np.zeros_like(P)
+        U[:,self.free] = self.factor.solve(np.ascontiguousarray(P[:,self.free].T)).T
+        return U.reshape(-1, self.graph.nnodes, 6)
+
+    def surveys(self, U, inertial=True):
+        """
+        Arrange the results of each beam in the DYMORE survey layout (see
+        graphSurveys).
+        """
+
+        return graphSurveys(self.graph, U, inertial)
+
+
+def graphSurveys(graph, U, inertial=True):
+    """
+    Arrange the results of each beam of a beam graph in the DYMORE survey
+    layout.
+
+    Parameters
+    ----------
+    graph : <BeamGraph>
+        The beams.
+    U : <np.array>
+        The nodal displacements, shape (ncases, nnodes, 6).
+    inertial : <logical>
+        Set to True to give forces, moments and strains in the inertial
+        frame, or False for the cross-section frames.
+
+    Returns
+    -------
+    surveys : <list of dictionaries>
+        For each beam, 'DISPLACEMENTS', 'FORCES' and 'STRAINS' -> array of
+        shape (ncases, nrows, 7), with eta in column 0.
+    """
+
+    out = []
+    ncases = len(U)
+    for (beam, Ub) in zip(graph.beams, graph.beamDisplacements(U)):
+        strains = beam.strains(Ub)
+        forces = beam.forces(strains)
+        if inertial:
+            strains = beam.toInertial(strains)
+            forces = beam.toInertial(forces)
+        ng = beam.nelem*beam.order
+        gauss_eta = np.broadcast_to(beam.gauss_eta.ravel(), (ncases, ng))[:,:,None]
+        node_eta = np.broadcast_to(beam.node_eta, (ncases, beam.nnodes))[:,:,None]
+        out.append({'DISPLACEMENTS': np.concatenate([node_eta, Ub], axis=2),
+                    'FORCES': np.concatenate([gauss_eta, forces.reshape(ncases, ng, 6)], axis=2),
+                    'STRAINS': np.concatenate([gauss_eta, strains.reshape(ncases, ng, 6)], axis=2)})
+    return out
+
+
+def readDesignParameters(deck):
+    """
+    Read the design parameters (e.g. #pointC_xyz) from the file named by
+    @DESIGN_PARAMETERS_FILE_NAME, if the deck has one.
+
+    Returns
+    -------
+    params : <dictionary>
+        parameter name -> value (a 1-D array of floats).
+    """
+
+    params = {}
+    node = deck.find('DESIGN_PARAMETERS_FILE_NAME')
+    if node is None:
+        return params
+    dgp = dd.readDeck(os.path.join(os.path.dirname(os.path.abspath(deck.path)), node.text))
+    name = None
+    for n in dgp.iterNodes():
+        if n.keyword == 'DESIGN_PARAMETER_NAME':
+            name = n.text
+        elif name is not None and n.keyword.endswith('_VALUE'):
+            params[name] = n.array
+            name = None
+    return params
+
+
+def pointCoordinates(deck, pointName, params):
+    """
+    Return the coordinates of a @POINT_NAME, substituting design parameters.
+    """
+
+    coords = bs._definition(deck, 'POINT_NAME', pointName).find('COORDINATES')
+    if coords.text.startswith('#'):
+        if coords.text not in params:
+            raise ValueError("%s has no design parameter %s" % (deck.path, coords.text))
+        return params[coords.text]
+    return coords.array
+
+
+def readCurve(deck, curveNode, params):
+    """
+    Read the reference line of a @CURVE_NAME definition.
+
+    Returns
+    -------
+    ctrl : <np.array>
+        The control points, shape (numCtrl, 3).
+    weights : <np.array>
+        The weights, shape (numCtrl,).
+    degree : <int>
+        The degree of the curve.
+    knots : <np.array>
+        The knot sequence.
+    """
+
+    pointDef = curveNode.find('POINT_DEFINITION')
+    ctrl = []
+    weights = []
+    for n in pointDef.children:
+        if n.keyword in ('END_POINT_0', 'END_POINT_1'):
+            ctrl.append(pointCoordinates(deck, n.text, params))
+            weights.append(1.0)
+        elif n.keyword == 'COORDINATES':
+            a = n.array
+            ctrl.append(a[:3])
+            weights.append(a[3] if len(a) > 3 else 1.0)
+        elif n.keyword == 'WEIGHT_DEFINITION':
+            weights[-1] = n.array[0]
+    ctrl = np.array(ctrl)
+    weights = np.array(weights)
+    degree = int(pointDef.find('DEGREE_OF_CURVE').array[0])
+    knots = curveNode.find('KNOT_SEQUENCE')
+    knots = nurbs.clampedKnots(len(ctrl), degree) if knots is None else knots.array
+    return (ctrl, weights, degree, knots)
+
+
+def readBeamGraph(deck, beamNames=None):
+    """
+    Build the meshes of all the beams in a DYMORE deck, joined at their
+    vertices.
+
+    Parameters
+    ----------
+    deck : <DeckFile>
+        The deck (see DYMOREdeck.readDeck).
+    beamNames : <list of strings>
+        (optional) The @BEAM_NAMEs to include. Defaults to every beam.
+
+    Returns
+    -------
+    graph : <BeamGraph>
+        The beams, with fixed set from the @BOUNDARY_CONDITION_DEFINITIONs on
+        their vertices.
+    """
+
+    params = readDesignParameters(deck)
+    beams = []
+    ends = []
+    for beamNode in deck.findAll('BEAM_NAME'):
+        if beamNode.children is None or (beamNames is not None and beamNode.text not in beamNames):
+            continue
+        edge = bs._definition(deck, 'EDGE_NAME', beamNode.find('EDGE_NAME').text)
+        curve = bs._definition(deck, 'CURVE_NAME', edge.find('CURVE_NAME').text)
+        (v0, v1) = [v.strip() for v in edge.find('CONNECTED_TO_VERTICES').text.split(',')]
+        (ctrl, weights, degree, knots) = readCurve(deck, curve, params)
+
+        mesh = bs._definition(deck, 'CURVE_MESH_PARAMETERS_NAME', curve.find('CURVE_MESH_PARAMETERS_NAME').text)
+        nelem = int(mesh.find('NUMBER_OF_ELEMENTS').array[0])
+        order = int(mesh.find('ORDER_OF_ELEMENTS').array[0])
+        elem_eta = np.array([n.array[0] for n in mesh.children if n.keyword == 'ETA_COORDINATE'])
+        if len(elem_eta) == 0:
+            elem_eta = np.linspace(0.0, 1.0, nelem + 1)
+        if len(elem_eta) != nelem + 1:
+            raise ValueError("mesh %s has %d elements but %d eta-coordinates" % (mesh.text, nelem, len(elem_eta)))
+
+        prop = bs._definition(deck, 'BEAM_PROPERTY_NAME', beamNode.find('BEAM_PROPERTY_NAME').text)
+        coordType = prop.find('COORDINATE_TYPE')
+        coordType = 'ETA_COORDINATE' if coordType is None else coordType.text
+        (coord, cm_x2, cm_x3, mpus, i1, i2, i3, S) = dd.readBeamProperties(prop)
+        beam = CurvedBeam(ctrl, weights, degree, knots, elem_eta, order, coord, S, name=beamNode.text,
+                          M=sectionMassMatrices(mpus, i1, i2, i3, cm_x2, cm_x3))
+        if coordType != 'ETA_COORDINATE':
+            # convert curvilinear (or axial) coordinates to eta, using the
+            # arc length at the nodes
+            seg = np.linalg.norm(np.diff(beam.node_xyz, axis=0), axis=1)
+            s = np.concatenate([[0.0], np.cumsum(seg)])
+            beam.prop_eta = np.interp(coord - coord[0], s, beam.node_eta)
+        beams.append(beam)
+        ends.append((v0, v1))
+    if not beams:
+        raise ValueError("%s has no beams" % deck.path)
+
+    graph = BeamGraph(beams, ends)
+    for bc in deck.findAll('BOUNDARY_CONDITION_NAME'):
+        if bc.children is None or bc.find('ENTITY_NAME').text not in graph.vertices:
+            continue
+        node = graph.vertices[bc.find('ENTITY_NAME').text]
+        for (keyword, dofs) in (('DISPLACEMENT_BOUNDARY_CONDITIONS', slice(0,3)), ('ROTATION_BOUNDARY_CONDITIONS', slice(3,6))):
+            flags = bc.find(keyword)
+            if flags is not None:
+                graph.fixed[node, dofs] |= flags.array.astype(bool)
+    return graph
+
+
+def readDeadLoads(deck, graph):
+    """
+    Build the nodal load vector of one case from the @DEAD_LOAD_DEFINITIONs
+    on the vertices of a beam graph (see beamSolver.readDeadLoads).
+
+    Returns
+    -------
+    loads : <np.array>
+        The nodal forces and moments, shape (nnodes, 6).
+    """
+
+    loads = np.zeros((graph.nnodes, 6))
+    for load in deck.findAll('DEAD_LOAD_NAME'):
+        if load.children is None:
+            continue
+        vertex = load.find('CONNECTED_TO_VERTEX')
+        if vertex is None or vertex.text not in graph.vertices:
+            continue
+        scale = load.find('SCALING_FACTOR')
+        scale = 1.0 if scale is None else scale.array[0]
+        node = graph.vertices[vertex.text]
+        for (keyword, dofs) in (('APPLIED_FORCES', slice(0,3)), ('APPLIED_MOMENTS', slice(3,6))):
+            values = load.find(keyword)
+            if values is not None:
+                loads[node, dofs] += scale*values.array
+    return loads
+
+
+def modelKey(graph):
+    """
+    Return a hash of everything that goes into a beam graph's stiffness
+    matrix, so cases that differ only in their loads can share one
+    factorization.
+    """
+
+    h = hashlib.sha1(repr(graph.ends).encode('utf-8'))
+    for beam in graph.beams:
+        for a in (np.array([beam.order]), beam.elem_eta, beam.node_xyz, beam.prop_eta, beam.prop_S):
+            h.update(np.ascontiguousarray(a).tobytes())
+    h.update(graph.fixed.tobytes())
+    return h.hexdigest()
+
+
+def solveCases(case_dirs, beamNames=None):
+    """
+    Solve the tip-load cases in many case directories, and write the survey
+    files of every beam (e.g. FIGURES/svy_disp_CD.mdt ... svy_force_HE.mdt).
+
+    Cases with the same beams are solved together: the sparse stiffness matrix
+    is assembled and factored once, and all of their load cases are solved as
+    one multi-right-hand-side solve.
+
+    Parameters
+    ----------
+    case_dirs : <list of strings>
+        The case directories, each with one *.dym deck.
+    beamNames : <list of strings>
+        (optional) The @BEAM_NAMEs to include. Defaults to every beam.
+
+    Returns
+    -------
+    written : <list of strings>
+        The paths of the survey files that were written.
+    """
+
+    groups = {}
+    for case_dir in case_dirs:
+        decks = glob.glob(os.path.join(case_dir, '*.dym'))
+        if len(decks) != 1:
+            raise ValueError("expected one *.dym file in %s, found %d" % (case_dir, len(decks)))
+        deck = dd.readDeck(decks[0])
+        graph = readBeamGraph(deck, beamNames)
+        group = groups.setdefault(modelKey(graph), (graph, []))
+        group[1].append((deck, readDeadLoads(deck, graph)))
+
+    written = []
+    for (graph, cases) in groups.values():
+        solver = SparseStaticSolver(graph)
+        U = solver.solve(np.array([loads for (deck, loads) in cases]))
+        surveys = {}
+        for (c, (deck, loads)) in enumerate(cases):
+            for (b, beam) in enumerate(graph.beams):
+                for (surveyType, path) in bs.surveyPaths(deck, beam):
+                    survey = deck.findDefinition('SURVEY_NAME', os.path.basename(path)[:-4])
+                    frame = survey.find('FRAME_NAME')
+                    inertial = frame is None or frame.text == 'INERTIAL'
+                    if inertial not in surveys:
+                        surveys[inertial] = solver.surveys(U, inertial)
+                    bs.writeSurvey(path, surveys[inertial][b][surveyType][c])
+                    written.append(path)
+    return written
@@ -0,0 +1,457 @@
+"""
+Functions in the beamSolver module solve the linear static problem for a
+straight, clamped beam with 6x6 cross-sectional stiffness matrices (the
+@STIFFNESS_MATRIX distributions written by DYMOREutilities), without Dymore.exe.
+
+The beam is meshed the same way DYMORE meshes it (@CURVE_MESH_PARAMETERS:
+Lagrange elements of the given order, between the given eta-coordinates), with
+Timoshenko strain measures (extension, 2 shears, twist, 2 bending curvatures)
+and reduced Gauss integration. The stiffness matrix is assembled and factored
+once; any number of load cases are then solved together, as one solve with many
+right-hand sides.
+
+Results are written in the same layout as the DYMORE surveys, so the plot
+scripts read them unchanged:
+    svy_disp_*.mdt   : eta, u1, u2, u3, r1, r2, r3  (at the nodes)
+    svy_force_*.mdt  : eta, F1, F2, F3, M1, M2, M3  (at the Gauss points)
+    svy_strain_*.mdt : eta, e11, 2e12, 2e13, k1, k2, k3  (at the Gauss points)
+Since the problem is linear, the rotations r1-r3 are small rotation angles.
+
+Example
+-------
+>>> from DYMORE import beamSolver as bs
+>>> import glob
+>>> cases = sorted(glob.glob('monoplane_spar/*_tipload/*'))
+>>> written = bs.solveCases(cases)   # one factorization for all 8 load cases
+"""
+
+import glob
+import hashlib
+import os
+
+import numpy as np
+from scipy.linalg import cho_factor, cho_solve
+
+from . import DYMOREdeck as dd
+
+
+# the strain measures that depend on the rotations, not only on derivatives:
+# e12 = u2' - r3, e13 = u3' + r2
+ROTATION_COUPLING = np.zeros((6,6))
+ROTATION_COUPLING[1,5] = -1.0
+ROTATION_COUPLING[2,4] = 1.0
+
+SURVEY_TYPES = ('DISPLACEMENTS', 'FORCES', 'STRAINS')
+SURVEY_FORMAT = '%14.6e'
+
+
+def lagrangeBasis(xi_nodes, xi):
+    """
+    Evaluate the Lagrange shape functions through xi_nodes, and their
+    derivatives, at the points xi.
+
+    Returns
+    -------
+    N, dN : <np.array>
+        Shape (len(xi), len(xi_nodes)).
+    """
+
+    xi = np.asarray(xi, dtype=float)
+    n = len(xi_nodes)
+    N = np.ones((len(xi), n))
+    dN = np.zeros((len(xi), n))
+    for i in range(n):
+        others = [xi_nodes[m] for m in range(n) if m != i]
+        denom = np.prod([xi_nodes[i] - xm for xm in others])
+        factors = np.array([xi - xm for xm in others])  # shape (n-1, len(xi))
+        N[:,i] = np.prod(factors, axis=0) / denom
+        for m in range(n-1):
+            dN[:,i] += np.prod(np.delete(factors, m, axis=0), axis=0) / denom
+    return (N, dN)
+
+
+def interpolateProperties(prop_eta, S, eta):
+    """
+    Linearly interpolate 6x6 stiffness matrices to new eta-coordinates
+    (constant beyond the first and last stations).
+
+    Parameters
+    ----------
+    prop_eta : <np.array>
+        The eta-coordinates of the cross-sections, shape (N,), increasing.
+    S : <np.array>
+        The stiffness matrices, shape (N,6,6).
+    eta : <np.array>
+        The eta-coordinates to interpolate to, any shape.
+
+    Returns
+    -------
+    S_eta : <np.array>
+        Shape eta.shape + (6,6).
+    """
+
+    eta = np.asarray(eta, dtype=float)
+    flat = np.clip(eta.ravel(), prop_eta[0], prop_eta[-1])
+    j = np.clip(np.searchsorted(prop_eta, flat, side='right') - 1, 0, len(prop_eta) - 2)
+    t = (flat - prop_eta[j]) / (prop_eta[j+1] - prop_eta[j])
+    S_eta = (1.0 - t)[:,None,None]*S[j] + t[:,None,None]*S[j+1]
+    return S_eta.reshape(eta.shape + (6,6))
+
+
+class StraightBeam(object):
+    """
+    The finite element mesh of a straight beam along the x1-axis.
+
+    Parameters
+    ----------
+    length : <float>
+        The length of the beam.
+    elem_eta : <np.array>
+        The eta-coordinates of the element ends, shape (nelem+1,).
+    order : <int>
+        The order of the elements (1 = linear, 3 = cubic, ...).
+    prop_eta : <np.array>
+        The eta-coordinates of the cross-sections, shape (N,).
+    S : <np.array>
+        The 6x6 stiffness matrices of the cross-sections, shape (N,6,6).
+    name : <string>
+        (optional) The name of the beam.
+    """
+
+    def __init__(self, length, elem_eta, order, prop_eta, S, name=None):
+        self.name = name
+        self.length = float(length)
+        self.elem_eta = np.asarray(elem_eta, dtype=float)
+        self.order = int(order)
+        self.nelem = len(self.elem_eta) - 1
+        self.nnodes = self.nelem*self.order + 1
+        self.ndof = 6*self.nnodes
+
+        xi_nodes = np.linspace(-1.0, 1.0, self.order + 1)
+        (xi_gauss, w_gauss) = np.polynomial.legendre.leggauss(self.order)
+        (N, dN) = lagrangeBasis(xi_nodes, xi_gauss)
+
+        a = self.elem_eta[:-1, None]
+        b = self.elem_eta[1:, None]
+        self.node_eta = np.append(((a + b)/2 + (b - a)/2*xi_nodes[None,:])[:,:-1].ravel(), self.elem_eta[-1])
+        self.gauss_eta = (a + b)/2 + (b - a)/2*xi_gauss[None,:]      # (nelem, ng)
+        jac = (self.elem_eta[1:] - self.elem_eta[:-1])*self.length/2  # dx/dxi
+        self.weights = w_gauss[None,:]*jac[:,None]                    # (nelem, ng)
+
+        # strain-displacement matrices, B[e,g] = dN/dx (x) I + N (x) A
+        eye = np.eye(6)
+        B = (dN[None,:,:,None,None]/jac[:,None,None,None,None]*eye
+             + N[None,:,:,None,None]*ROTATION_COUPLING)               # (nelem, ng, n, 6, 6)
+        self.B = B.transpose(0,1,3,2,4).reshape(self.nelem, self.order, 6, 6*(self.order+1))
+        self.S = interpolateProperties(np.asarray(prop_eta, dtype=float), np.asarray(S, dtype=float), self.gauss_eta)
+
+        nodes = np.arange(self.nelem)[:,None]*self.order + np.arange(self.order+1)[None,:]
+        self.elem_dofs = (6*nodes[:,:,None] + np.arange(6)).reshape(self.nelem, -1)
+
+    def elementStiffness(self):
+        """
+        Return the element stiffness matrices, shape (nelem, 6n, 6n).
+        """
+
+        return np.einsum('eg,egki,egkl,eglj->eij', self.weights, self.B, self.S, self.B, optimize=True)
+
+    def assemble(self):
+        """
+        Return the global stiffness matrix, shape (ndof, ndof).
+        """
+
+        Ke = self.elementStiffness()
+        rows = np.repeat(self.elem_dofs, self.elem_dofs.shape[1], axis=1)
+        cols = np.tile(self.elem_dofs, (1, self.elem_dofs.shape[1]))
+        K = np.zeros((self.ndof, self.ndof))
+        np.add.at(K, (rows.ravel(), cols.ravel()), Ke.ravel())
+        return K
+
+    def nearestNode(self, eta):
+        """
+        Return the index of the node closest to an eta-coordinate.
+        """
+
+        return int(np.argmin(np.abs(self.node_eta - eta)))
+
+    def strains(self, U):
+        """
+        Return the strains at the Gauss points for displacement vectors U,
+        shape (ncases, nelem, ng, 6).
+        """
+
+        Ue = np.asarray(U).reshape(-1, self.ndof)[:,self.elem_dofs]  # (ncases, nelem, 6n)
+        return np.einsum('egkj,cej->cegk', self.B, Ue, optimize=True)
+
+    def forces(self, U):
+        """
+        Return the sectional forces and moments at the Gauss points for
+        displacement vectors U, shape (ncases, nelem, ng, 6).
+        """
+
+        return np.einsum('egkl,cegl->cegk', self.S, self.strains(U), optimize=True)
+
+
+class StaticSolver(object):
+    """
+    The factored stiffness matrix of a beam, for solving any number of load
+    cases.
+
+    Parameters
+    ----------
+    beam : <StraightBeam>
+        The beam.
+    fixed : <np.array of bool>
+        Which degrees of freedom are held at zero, shape (ndof,) or
+        (nnodes, 6).
+    """
+
+    def __init__(self, beam, fixed):
+        self.beam = beam
+        self.fixed = np.asarray(fixed, dtype=bool).ravel()
+        if not self.fixed.any():
+            raise ValueError("the beam %s has no boundary conditions" % beam.name)
+        self.free = np.flatnonzero(~self.fixed)
+        K = beam.assemble()
+        self.factor = cho_factor(K[np.ix_(self.free, self.free)])
+
+    def solve(self, loads):
+        """
+        Solve for the displacements under one or more load cases.
+
+        Parameters
+        ----------
+        loads : <np.array>
+            The nodal forces and moments, shape (ncases, nnodes, 6) or
+            (ncases, ndof).
+
+        Returns
+        -------
+        U : <np.array>
+            The nodal displacements and rotations, shape (ncases, nnodes, 6).
+        """
+
+        P = np.asarray(loads, dtype=float).reshape(-1, self.beam.ndof)
+        U = np.zeros_like(P)
+        U[:,self.free] = cho_solve(self.factor, P[:,self.free].T).T
+        return U.reshape(-1, self.beam.nnodes, 6)
+
+    def surveys(self, U):
+        """
+        Arrange the results in the DYMORE survey layout.
+
+        Returns
+        -------
+        surveys : <dictionary>
+            'DISPLACEMENTS', 'FORCES' and 'STRAINS' -> array of shape
+            (ncases, nrows, 7), with eta in column 0.
+        """
+
+        beam = self.beam
+        ncases = len(U)
+        ng = beam.nelem*beam.order
+        gauss_eta = np.broadcast_to(beam.gauss_eta.ravel(), (ncases, ng))[:,:,None]
+        node_eta = np.broadcast_to(beam.node_eta, (ncases, beam.nnodes))[:,:,None]
+        return {'DISPLACEMENTS': np.concatenate([node_eta, U], axis=2),
+                'FORCES': np.concatenate([gauss_eta, beam.forces(U).reshape(ncases, ng, 6)], axis=2),
+                'STRAINS': np.concatenate([gauss_eta, beam.strains(U).reshape(ncases, ng, 6)], axis=2)}
+
+
+def _definition(deck, keyword, name):
+    node = deck.findDefinition(keyword, name)
+    if node is None:
+        raise ValueError("%s has no definition of @%s {%s}" % (deck.path, keyword, name))
+    return node
+
+
+def _vertexCoordinates(deck, vertexName):
+    point = _definition(deck, 'VERTEX_NAME', vertexName).find('AT_POINT').text
+    return _definition(deck, 'POINT_NAME', point).find('COORDINATES').array
+
+
+def readBeam(deck, beamName=None):
+    """
+    Build the mesh of a straight beam from a DYMORE deck.
+
+    Parameters
+    ----------
+    deck : <DeckFile>
+        The deck (see DYMOREdeck.readDeck).
+    beamName : <string>
+        (optional) The @BEAM_NAME of the beam. Defaults to the first beam in
+        the deck.
+
+    Returns
+    -------
+    beam : <StraightBeam>
+        The beam, with two extra attributes: vertices, a dictionary of
+        vertex name -> eta-coordinate for the beam's two vertices, and fixed,
+        the array (nnodes, 6) of degrees of freedom held by
+        @BOUNDARY_CONDITION_DEFINITIONs on those vertices.
+    """
+
+    beamNode = None
+    for node in deck.findAll('BEAM_NAME', beamName):
+        if node.children is not None:
+            beamNode = node
+            break
+    if beamNode is None:
+        raise ValueError("%s has no beam %s" % (deck.path, beamName or ''))
+    edge = _definition(deck, 'EDGE_NAME', beamNode.find('EDGE_NAME').text)
+    curve = _definition(deck, 'CURVE_NAME', edge.find('CURVE_NAME').text)
+    vertexNames = [v.strip() for v in edge.find('CONNECTED_TO_VERTICES').text.split(',')]
+
+    (p0, p1) = [_vertexCoordinates(deck, v) for v in vertexNames]
+    length = np.linalg.norm(p1 - p0)
+    if abs(p1[1] - p0[1]) > 1.0e-9*length or abs(p1[2] - p0[2]) > 1.0e-9*length or p1[0] <= p0[0]:
+        raise ValueError("beam %s is not straight along the x1-axis" % beamNode.text)
+    degree = curve.find('DEGREE_OF_CURVE')
+    points = curve.find('NUMBER_OF_CONTROL_POINTS')
+    if degree is not None and (degree.array[0] != 1 or points.array[0] != 2):
+        raise ValueError("beam %s is not straight" % beamNode.text)
+
+    mesh = _definition(deck, 'CURVE_MESH_PARAMETERS_NAME', curve.find('CURVE_MESH_PARAMETERS_NAME').text)
+    nelem = int(mesh.find('NUMBER_OF_ELEMENTS').array[0])
+    order = int(mesh.find('ORDER_OF_ELEMENTS').array[0])
+    elem_eta = np.array([n.array[0] for n in mesh.children if n.keyword == 'ETA_COORDINATE'])
+    if len(elem_eta) == 0:
+        elem_eta = np.linspace(0.0, 1.0, nelem + 1)
+    if len(elem_eta) != nelem + 1:
+        raise ValueError("mesh %s has %d elements but %d eta-coordinates" % (mesh.text, nelem, len(elem_eta)))
+
+    prop = _definition(deck, 'BEAM_PROPERTY_NAME', beamNode.find('BEAM_PROPERTY_NAME').text)
+    coordType = prop.find('COORDINATE_TYPE')
+    coordType = 'ETA_COORDINATE' if coordType is None else coordType.text
+    (coord, cm_x2, cm_x3, mpus, i1, i2, i3, S) = dd.readBeamProperties(prop)
+    prop_eta = coord if coordType == 'ETA_COORDINATE' else (coord - coord[0])/length
+
+    beam = StraightBeam(length, elem_eta, order, prop_eta, S, name=beamNode.text)
+    beam.vertices = {vertexNames[0]: 0.0, vertexNames[1]: 1.0}
+    beam.fixed = np.zeros((beam.nnodes, 6), dtype=bool)
+    for bc in deck.findAll('BOUNDARY_CONDITION_NAME'):
+        if bc.children is None or bc.find('ENTITY_NAME').text not in beam.vertices:
+            continue
+        node = beam.nearestNode(beam.vertices[bc.find('ENTITY_NAME').text])
+        for (keyword, dofs) in (('DISPLACEMENT_BOUNDARY_CONDITIONS', slice(0,3)), ('ROTATION_BOUNDARY_CONDITIONS', slice(3,6))):
+            flags = bc.find(keyword)
+            if flags is not None:
+                beam.fixed[node, dofs] |= flags.array.astype(bool)
+    return beam
+
+
+def readDeadLoads(deck, beam):
+    """
+    Build the nodal load vector of one case from the @DEAD_LOAD_DEFINITIONs
+    in a deck (e.g. the tip load in loadDist.dat). Time functions are taken to
+    be 1, as they are in the tip-load decks.
+
+    Returns
+    -------
+    loads : <np.array>
+        The nodal forces and moments, shape (nnodes, 6).
+    """
+
+    loads = np.zeros((beam.nnodes, 6))
+    for load in deck.findAll('DEAD_LOAD_NAME'):
+        if load.children is None:
+            continue
+        vertex = load.find('CONNECTED_TO_VERTEX')
+        if vertex is None or vertex.text not in beam.vertices:
+            continue
+        scale = load.find('SCALING_FACTOR')
+        scale = 1.0 if scale is None else scale.array[0]
+        node = beam.nearestNode(beam.vertices[vertex.text])
+        for (keyword, dofs) in (('APPLIED_FORCES', slice(0,3)), ('APPLIED_MOMENTS', slice(3,6))):
+            values = load.find(keyword)
+            if values is not None:
+                loads[node, dofs] += scale*values.array
+    return loads
+
+
+def surveyPaths(deck, beam):
+    """
+    Return the survey files the deck asks for on this beam.
+
+    Returns
+    -------
+    paths : <list of tuples>
+        (survey type, path of the .mdt file), in the order of the deck.
+    """
+
+    figures = deck.find('FIGURES_PATH')
+    figures = './FIGURES/' if figures is None else figures.text.replace('\\', '/')
+    figures_dir = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(deck.path)), figures))
+    paths = []
+    for survey in deck.findAll('SURVEY_NAME'):
+        if survey.children is None or survey.find('OBJECT_NAME').text != beam.name:
+            continue
+        surveyType = survey.find('SURVEY_TYPE').text
+        if surveyType in SURVEY_TYPES:
+            paths.append((surveyType, os.path.join(figures_dir, survey.text + '.mdt')))
+    return paths
+
+
+def writeSurvey(path, data):
+    """
+    Write one survey array, shape (nrows, 7), to a .mdt file.
+    """
+
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    np.savetxt(path, data, fmt=SURVEY_FORMAT)
+
+
+def modelKey(beam):
+    """
+    Return a hash of everything that goes into a beam's stiffness matrix, so
+    cases that differ only in their loads can share one factorization.
+    """
+
+    h = hashlib.sha1()
+    for a in (np.array([beam.length, beam.order]), beam.elem_eta, beam.S, beam.fixed):
+        h.update(np.ascontiguousarray(a).tobytes())
+    return h.hexdigest()
+
+
+def solveCases(case_dirs, beamName=None):
+    """
+    Solve the tip-load cases in many case directories, and write their survey
+    files (e.g. FIGURES/svy_disp_spar.mdt and FIGURES/svy_force_spar.mdt).
+
+    Cases with the same beam (mesh, properties and boundary conditions) are
+    solved together: the stiffness matrix is assembled and factored once, and
+    all of their load cases are solved as one multi-right-hand-side solve.
+
+    Parameters
+    ----------
+    case_dirs : <list of strings>
+        The case directories, each with one *.dym deck.
+    beamName : <string>
+        (optional) The @BEAM_NAME to solve. Defaults to the first beam.
+
+    Returns
+    -------
+    written : <list of strings>
+        The paths of the survey files that were written.
+    """
+
+    groups = {}
+    for case_dir in case_dirs:
+        decks = glob.glob(os.path.join(case_dir, '*.dym'))
+        if len(decks) != 1:
+            raise ValueError("expected one *.dym file in %s, found %d" % (case_dir, len(decks)))
+        deck = dd.readDeck(decks[0])
+        beam = readBeam(deck, beamName)
+        group = groups.setdefault(modelKey(beam), (beam, []))
+        group[1].append((deck, readDeadLoads(deck, beam)))
+
+    written = []
+    for (beam, cases) in groups.values():
+        solver = StaticSolver(beam, beam.fixed)
+        U = solver.solve(np.array([loads for (deck, loads) in cases]))
+        surveys = solver.surveys(U)
+        for (c, (deck, loads)) in enumerate(cases):
+            for (surveyType, path) in surveyPaths(deck, beam):
+                writeSurvey(path, surveys[surveyType][c])
+                written.append(path)
+    return written
@@ -0,0 +1,399 @@
+"""
+Functions in the biplaneGeometry module build the reference lines of the biplane
+spar as NURBS curves and write the DYMORE geometry files for them: the design
+parameters (biplane_spar_params.dgp), the curved regions (*_curve.dat), the
+curve meshes (*_mesh.dat) and the cross-section shapes (shapes.dat).
+
+This is biplaneNURBS.m (with global_constants.m, derived_parameters.m and
+x1_to_eta.m) without MATLAB: the curves are evaluated with the nurbs module,
+and every spar station of a region is mapped to its eta-coordinate in one
+batched call. The files match the ones the MATLAB script writes, byte for byte.
+
+Example
+-------
+>>> from DYMORE import biplaneGeometry as bg
+>>> paths = bg.writeBiplaneGeometry('input_files', g__to__c=1.25, jt_end_station=15)
+>>> bg.stationEtas(bg.biplaneCurves(bg.biplanePoints(1.25, 15))['DE'], 13, 15)
+array([0.        , 0.50408936, 1.        ])
+"""
+
+import os
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+from . import nurbs
+from . import resample as rs
+
+
+R = 91.9        # span, [m]
+C_MAX = 7.628   # maximum chord of Sandia (monoplane) blade, [m]
+
+# spanwise locations of the 24 spar stations (station i is X1_STATIONS[i-1])
+X1_STATIONS = rs.X1_STATIONS
+
+# total cross-section heights of each spar station in the monoplane spar
+# (the first 6 stations include the top and bottom root buildup heights, in
+# addition to the shear web heights)
+CS_HEIGHTS = np.array([5.392, 5.375, 5.089, 4.791, 4.455, 4.101, 3.680, 3.480, 3.285, 3.089, 2.882, 2.696, 2.498, 2.077, 1.672, 1.360, 1.138, 0.954, 0.910, 0.832, 0.796, 0.707, 0.651, 0.508])
+
+# cross-section widths in shapes.dat, for biplane and monoplane stations
+BIPLANE_WIDTH = 1.586
+MONOPLANE_WIDTH = 1.672
+
+LAST_STATION = len(X1_STATIONS)
+
+
+def scaleHeight(height, scale):
+    # scale a tabulated height, rounding half up to the 3 decimals of the
+    # table (so 4.101/2 is written as 2.051, as in the half-height spar files)
+    if scale == 1.0:
+        return height
+    value = Decimal(repr(float(height)))*Decimal(repr(float(scale)))
+    return float(value.quantize(Decimal('0.001'), rounding=ROUND_HALF_UP))
+
+
+def biplanePoints(g__to__c=1.25, jt_end_station=17, root_joint_flag=0, rt_beg_station=2):
+    """
+    Compute the end points of each region of the biplane spar (as in
+    derived_parameters.m).
+
+    Parameters
+    ----------
+    g__to__c : <float>
+        The gap-to-chord ratio.
+    jt_end_station : <int>
+        The spar station at the end of the joint transition (the joint
+        transition begins 2 stations inboard).
+    root_joint_flag : <int>
+        If 1, model the root with a monoplane (points A and B); if 0, model the
+        root with a biplane.
+    rt_beg_station : <int>
+        The spar station at the beginning of the root transition (the root
+        transition ends 2 stations outboard). Only used if root_joint_flag is 1.
+
+    Returns
+    -------
+    points : <dict>
+        Maps 'A' ... 'H' to (x1, x2, x3) coordinates, [m].
+    """
+
+    x1 = X1_STATIONS
+    jt_beg = x1[jt_end_station - 3]
+    jt_end = x1[jt_end_station - 1]
+    g = g__to__c*C_MAX
+    if root_joint_flag:
+        (rt_beg, rt_end) = (x1[rt_beg_station - 1], x1[rt_beg_station + 1])
+        points = {
+            'A': (0.0, 0.0, 0.0),
+            'B': (rt_beg, 0.0, 0.0),
+            'C': (rt_end, 0.0, g/2.0),
+            'G': (rt_end, 0.0, -g/2.0),
+            }
+    else:
+        points = {
+            'C': (0.0, 0.0, g/2.0),
+            'G': (0.0, 0.0, -g/2.0),
+            }
+    points.update({
+        'D': (jt_beg, 0.0, g/2.0),
+        'E': (jt_end, 0.0, 0.0),
+        'F': (R, 0.0, 0.0),
+        'H': (jt_beg, 0.0, -g/2.0),
+        })
+    return dict((k, np.array(v)) for (k, v) in points.items())
+
+
+def transitionCurve(P0, P1, mid, x3_mid):
+    # a cubic from P0 to P1; both interior control points sit at the same
+    # fraction mid of the way along x1, the first at x3_mid and the second at
+    # x3 = 0 (where the two spars meet)
+    x = (P1[0] - P0[0])*mid + P0[0]
+    ctrl = np.array([P0, (x, 0.0, x3_mid), (x, 0.0, 0.0), P1])
+    return (ctrl, np.ones(4), 3, nurbs.clampedKnots(4, 3))
+
+
+def lineCurve(P0, P1):
+    return (np.array([P0, P1]), np.ones(2), 1, nurbs.clampedKnots(2, 1))
+
+
+def biplaneCurves(points, jt_mid=0.5, rt_mid=0.5):
+    """
+    Build the reference line of each region as a NURBS curve (as in
+    biplaneNURBS.m).
+
+    Parameters
+    ----------
+    points : <dict>
+        The end points of the regions, from biplanePoints.
+    jt_mid : <float>
+        The midpoint of the interior control points of the joint transition.
+    rt_mid : <float>
+        The midpoint of the interior control points of the root transition.
+
+    Returns
+    -------
+    curves : <dict>
+        Maps a region name ('CD', 'GH', 'DE', 'HE', 'EF', and 'AB', 'BC', 'BG'
+        with a root joint) to (ctrl, weights, degree, knots), as taken by the
+        functions in the nurbs module.
+    """
+
+    P = points
+    g = P['C'][2] - P['G'][2]
+    curves = {
+        'CD': lineCurve(P['C'], P['D']),
+        'GH': lineCurve(P['G'], P['H']),
+        'DE': transitionCurve(P['D'], P['E'], jt_mid, g/2.0),
+        'HE': transitionCurve(P['H'], P['E'], jt_mid, -g/2.0),
+        'EF': lineCurve(P['E'], P['F']),
+        }
+    if 'A' in P:
+        curves.update({
+            'AB': lineCurve(P['A'], P['B']),
+            'BC': transitionCurve(P['B'], P['C'], rt_mid, g/2.0),
+            'BG': transitionCurve(P['B'], P['G'], rt_mid, -g/2.0),
+            })
+    return curves
+
+
+def stationEtas(curve, start_station, end_station):
+    """
+    Return the eta-coordinates of spar stations start_station ... end_station
+    (inclusive, numbered from 1) on a curve, as x1_to_eta.m finds them.
+    """
+
+    return nurbs.x1ToEta(*curve, X1_STATIONS[start_station - 1:end_station])
+
+
+def stationCurvatures(curve, start_station, end_station):
+    """
+    Return the curvature of a curve at spar stations start_station ...
+    end_station (the k2 column that biplaneNURBS.m prints).
+    """
+
+    return nurbs.curvature(*curve, stationEtas(curve, start_station, end_station))
+
+
+def biplaneRegions(jt_end_station=17, root_joint_flag=0, rt_beg_station=2):
+    """
+    List the regions of the biplane spar, from root to tip.
+
+    Returns
+    -------
+    regions : <list of dicts>
+        Each region has: 'name' (e.g. 'jointTrans'), 'stations' (the first and
+        last spar station), 'curves' (the upper curve, and the lower one if the
+        region is split), 'files' (the mesh files, or none), 'label' (for the
+        mesh comments), 'biplane' (True if its cross-sections are biplane
+        cross-sections) and 'flat' (True for the regions that biplaneNURBS.m
+        writes with one-space indentation).
+    """
+
+    jt_beg_station = jt_end_station - 2
+    regions = []
+    if root_joint_flag:
+        rt_end_station = rt_beg_station + 2
+        regions += [
+            {'name': 'root', 'stations': (1, rt_beg_station), 'curves': ('AB',),
+             'files': (), 'label': 'root', 'biplane': False, 'flat': True},
+            {'name': 'rootTrans', 'stations': (rt_beg_station, rt_end_station), 'curves': ('BC', 'BG'),
+             'files': ('BC_rootTrans_upper_mesh.dat', 'BG_rootTrans_lower_mesh.dat'),
+             'label': 'root transition', 'biplane': True, 'flat': True},
+            ]
+        start_station = rt_end_station
+    else:
+        start_station = 1
+    regions += [
+        {'name': 'straightBiplane', 'stations': (start_station, jt_beg_station), 'curves': ('CD', 'GH'),
+         'files': ('CD_straightBiplane_upper_mesh.dat', 'GH_straightBiplane_lower_mesh.dat'),
+         'label': 'straight biplane', 'biplane': True, 'flat': False},
+        {'name': 'jointTrans', 'stations': (jt_beg_station, jt_end_station), 'curves': ('DE', 'HE'),
+         'files': ('DE_jointTrans_upper_mesh.dat', 'HE_jointTrans_lower_mesh.dat'),
+         'label': 'joint transition', 'biplane': True, 'flat': False},
+        {'name': 'monoOutboard', 'stations': (jt_end_station, LAST_STATION), 'curves': ('EF',),
+         'files': ('EF_monoOutboard_mesh.dat',), 'label': 'monoplane outboard', 'biplane': False, 'flat': False},
+        ]
+    return regions
+
+
+def formatLines(lines, flat=False):
+    # lines are (depth, text); nested files indent 2 spaces per level, flat
+    # ones indent every line but the outermost by 1 space
+    if flat:
+        return ''.join((' ' if depth else '') + text + '\n' for (depth, text) in lines)
+    return ''.join('  '*depth + text + '\n' for (depth, text) in lines)
+
+
+def formatDesignParameters(points):
+    """
+    Format the end points of the regions as a DYMORE design parameters file.
+    """
+
+    text = '@DESIGN_PARAMETERS_DEFINITION {\n'
+    for k in sorted(points):
+        text += '  @DESIGN_PARAMETER_NAME {#point%s_xyz}  @VECTOR_VALUE {%6.3f, %6.3f, %6.3f}\n' % ((k,) + tuple(points[k]))
+    return text + '}\n'
+
+
+# the end points and comments of the curved regions
+CURVE_FILES = {
+    'BC': ('BC_rootTrans_upper_curve.dat', 'pointB', 'pointC', 'the inboard joint (pointB) to the end of the upper root transition (pointC)'),
+    'BG': ('BG_rootTrans_lower_curve.dat', 'pointB', 'pointG', 'the inboard joint (pointB) to the end of the lower root transition (pointG)'),
+    'DE': ('DE_jointTrans_upper_curve.dat', 'pointD', 'pointE', 'the upper joint transition (pointD) to the outboard joint (pointE)'),
+    'HE': ('HE_jointTrans_lower_curve.dat', 'pointH', 'pointE', 'the lower joint transition (pointH) to the outboard joint (pointE)'),
+    }
+
+
+def formatCurve(name, curve, flat=False):
+    """
+    Format a curved region (one of CURVE_FILES) as a DYMORE curve definition.
+    """
+
+    (ctrl, weights, degree, knots) = curve
+    (filename, point0, point1, comment) = CURVE_FILES[name]
+    lines = [
+        (0, '@CURVE_DEFINITION {'),
+        (1, '@CURVE_NAME {curve%s} {' % name),
+        (2, '@IS_DEFINED_IN_FRAME {INERTIAL}'),
+        (2, '@POINT_DEFINITION {'),
+        (3, '@NUMBER_OF_CONTROL_POINTS {%d}' % len(ctrl)),
+        (3, '@DEGREE_OF_CURVE {%d}' % degree),
+        (3, '@RATIONAL_CURVE_FLAG {YES}'),
+        (3, '@END_POINT_0 {%s}' % point0),
+        (3, '@WEIGHT_DEFINITION {%.1f}' % weights[0]),
+        ]
+    for i in range(1, len(ctrl) - 1):
+        lines.append((3, '@COORDINATES {%6.3f, %6.3f, %6.3f, %6.3f}' % (tuple(weights[i]*ctrl[i]) + (weights[i],))))
+    lines += [
+        (3, '@END_POINT_1 {%s}' % point1),
+        (3, '@WEIGHT_DEFINITION {%.1f}' % weights[-1]),
+        (3, '@SPLINE {NO}'),
+        (2, '}'),
+        (2, '@TRIAD_DEFINITION {'),
+        (3, '@ORIENTATION_DISTRIBUTION_NAME {OriDist}'),
+        (3, '@INITIAL_COORDINATE {0}'),
+        (2, '}'),
+        (2, '@CURVE_MESH_PARAMETERS_NAME {mesh%s}' % name),
+        (2, '@COMMENTS {a cubic spline from %s}' % comment),
+        (1, '}'),
+        (0, '}'),
+        ]
+    return formatLines(lines, flat)
+
+
+def formatMesh(name, etas, comment, flat=False):
+    """
+    Format the eta-coordinates of the nodes of a curve as DYMORE curve mesh
+    parameters (one cubic element between each pair of nodes).
+    """
+
+    lines = [
+        (0, '@CURVE_MESH_PARAMETERS_DEFINITION {'),
+        (1, '@CURVE_MESH_PARAMETERS_NAME {mesh%s} {' % name),
+        (2, '@NUMBER_OF_ELEMENTS {%2d}' % (len(etas) - 1)),
+        (2, '@ORDER_OF_ELEMENTS {3}'),
+        ]
+    lines += [(2, '@ETA_COORDINATE {%6.4f}' % eta) for eta in etas]
+    lines += [
+        (2, '@COMMENTS {models the %s region with %2d cubic beam elements}' % (comment, len(etas) - 1)),
+        (1, '}'),
+        (0, '}'),
+        ]
+    return formatLines(lines, flat)
+
+
+def formatShape(name, etas, widths, heights, flat=False):
+    """
+    Format the cross-section scaling factors of one region as a DYMORE shape
+    (without the enclosing @SHAPE_DEFINITION).
+    """
+
+    lines = [
+        (1, '@SHAPE_NAME {shape_%s} {' % name),
+        (2, '@SHAPE_TYPE {CURVE}'),
+        (2, '@COORDINATE_TYPE {ETA_COORDINATE}'),
+        ]
+    for (eta, width, height) in zip(etas, widths, heights):
+        lines += [
+            (2, '@ETA_COORDINATE {%6.4f} {' % eta),
+            (3, '@CURVE_NAME {CurveSquare}'),
+            (3, '@SCALING_FACTOR {0.0, %.3f, %5.3f}' % (width, height)),
+            (3, '@ORIGIN {0.0, 0.0, 0.0}'),
+            (2, '}'),
+            ]
+    lines.append((1, '}'))
+    return formatLines(lines, flat) + '\n'
+
+
+def biplaneGeometry(g__to__c=1.25, jt_end_station=17, root_joint_flag=0, jt_mid=0.5,
+                    rt_beg_station=2, rt_mid=0.5, biplane_height_scale=1.0):
+    """
+    Generate the DYMORE geometry files of a biplane spar.
+
+    Parameters
+    ----------
+    g__to__c, jt_end_station, root_joint_flag, rt_beg_station :
+        See biplanePoints.
+    jt_mid, rt_mid :
+        See biplaneCurves.
+    biplane_height_scale : <float>
+        Scale the heights of the biplane cross-sections (1.0 for the
+        full-height biplane spar, 0.5 for the half-height one). Scaled heights
+        are rounded half up to 3 decimals.
+
+    Returns
+    -------
+    files : <dict>
+        Maps each file name to its text (with '\\n' line endings).
+    """
+
+    points = biplanePoints(g__to__c, jt_end_station, root_joint_flag, rt_beg_station)
+    curves = biplaneCurves(points, jt_mid, rt_mid)
+    files = {'biplane_spar_params.dgp': formatDesignParameters(points)}
+    for name in sorted(CURVE_FILES):
+        if name in curves:
+            files[CURVE_FILES[name][0]] = formatCurve(name, curves[name], flat=name[0] == 'B')
+
+    shapes = '@SHAPE_DEFINITION {\n'
+    for region in biplaneRegions(jt_end_station, root_joint_flag, rt_beg_station):
+        (start, end) = region['stations']
+        etas = [stationEtas(curves[c], start, end) for c in region['curves']]
+        for (i, filename) in enumerate(region['files']):
+            side = ('upper ', 'lower ')[i] if len(region['files']) == 2 else ''
+            files[filename] = formatMesh(region['curves'][i], etas[i], side + region['label'], region['flat'])
+
+        heights = CS_HEIGHTS[start - 1:end].copy()
+        widths = np.full(len(heights), MONOPLANE_WIDTH)
+        if region['biplane']:
+            # the last station of the joint transition is on the monoplane
+            last = -1 if region['name'] == 'jointTrans' else len(heights)
+            heights[:last] = [scaleHeight(h, biplane_height_scale) for h in heights[:last]]
+            widths[:last] = BIPLANE_WIDTH
+        elif region['name'] == 'root':
+            widths[:] = BIPLANE_WIDTH
+        shapes += formatShape(region['name'], etas[0], widths, heights, region['flat'])
+    files['shapes.dat'] = shapes + '}\n'
+    return files
+
+
+def writeBiplaneGeometry(out_dir, newline='\r\n', **params):
+    """
+    Write the DYMORE geometry files of a biplane spar (see biplaneGeometry for
+    the parameters) into out_dir.
+
+    Returns
+    -------
+    paths : <list of str>
+        The files written.
+    """
+
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+    paths = []
+    for (filename, text) in sorted(biplaneGeometry(**params).items()):
+        path = os.path.join(out_dir, filename)
+        with open(path, 'w', newline=newline) as f:
+            f.write(text)
+        paths.append(path)
+    return paths
@@ -0,0 +1,502 @@
+"""
+The buildGraph module rebuilds the spar analysis chain incrementally:
+
+    VABS input (*.dat) -> VABS output (*.dat.K) -> DYMORE props (*_props.dat)
+        -> solver results (FIGURES/*.mdt) -> figures
+
+Each step is a Task with input files, output files and an action. A task
+depends on the tasks that produce its inputs; a file hard-linked into several
+case directories (see caseGenerator) counts as the same file. A task is run
+again only if the contents of its inputs or its parameters changed since it last
+ran, or one of its outputs is missing or was changed by hand. Contents are
+compared by SHA-1 hash, so a task whose upstream was rebuilt into identical
+files is not run again.
+
+Tasks whose dependencies are finished run in parallel threads, so independent
+branches (e.g. the props of different beams, or different cases) build at the
+same time. The time spent in each stage is reported at the end.
+
+The hashes of the last successful build are kept in a JSON state file.
+
+Example
+-------
+>>> from DYMORE import buildGraph as bg
+>>> from DYMORE import jobScheduler as js
+>>> graph = bg.BuildGraph('build_state.json')
+>>> graph.add(bg.propsTask('CD_props.dat', 'propCD', vabs_files, eta))
+>>> for case_dir in ['full-height_biplane_spar/flapwise_tipload/1e03']:
+...     graph.add(bg.solverTask(case_dir, command=js.STUB_COMMAND))
+>>> report = graph.run(workers=4)
+>>> print(bg.formatReport(report))
+"""
+
+from __future__ import print_function
+import hashlib
+import json
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from . import DYMOREdeck as dd
+from . import DYMOREutilities as du
+from . import caseGenerator as cg
+from . import jobScheduler as js
+from . import profiling
+
+
+STATE_FILENAME = 'build_state.json'
+
+# the stages of the chain, in order (tasks may also use other stage names)
+STAGES = ('vabs', 'props', 'solver', 'figures')
+
+
+class Task(object):
+    """
+    One step of a build.
+
+    Parameters
+    ----------
+    name : <string>
+        A unique name, e.g. 'solver:monoplane_spar/flapwise_tipload/1e03'.
+    stage : <string>
+        The stage the task belongs to, for timing (e.g. 'props').
+    inputs : <list of strings>
+        The files the task reads.
+    outputs : <list of strings>
+        The files the task writes.
+    action : <callable>
+        Called with no arguments to run the task. It should raise an exception
+        if the task fails.
+    params : <dictionary>
+        (optional) Anything else the outputs depend on (a command line, a
+        property name, ...). It must be JSON-serializable.
+    """
+
+    def __init__(self, name, stage, inputs, outputs, action, params=None):
+        self.name = name
+        self.stage = stage
+        self.inputs = [os.path.abspath(p) for p in inputs]
+        self.outputs = [os.path.abspath(p) for p in outputs]
+        self.action = action
+        self.params = params or {}
+
+
+class BuildGraph(object):
+    """
+    A set of tasks, linked by the files they read and write.
+    """
+
+    def __init__(self, state=STATE_FILENAME):
+        self.state_path = state
+        self.tasks = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self.state = {'tasks': {}, 'files': {}}
+        if state is not None and os.path.exists(state):
+            with open(state, 'r') as f:
+                self.state = json.load(f)
+
+    def add(self, task):
+        if task.name in self.tasks:
+            raise ValueError("task %r is already in the graph" % task.name)
+        self.tasks[task.name] = task
+        return task
+
+    def dependencies(self):
+        """
+        Return the names of the tasks each task depends on.
+
+        Returns
+        -------
+        deps : <dictionary>
+            task name -> set of task names.
+        """
+
+        producers = {}
+        for task in self.tasks.values():
+            for path in task.outputs:
+                for key in _fileKeys(path):
+                    if key in producers and producers[key] != task.name:
+                        raise ValueError("%s is written by both %r and %r" % (path, producers[key], task.name))
+                    producers[key] = task.name
+        deps = {}
+        for task in self.tasks.values():
+            deps[task.name] = set(producers[key] for path in task.inputs for key in _fileKeys(path)
+                                  if key in producers and producers[key] != task.name)
+        return deps
+
+    def order(self):
+        """
+        Return the task names in an order where every task comes after the
+        tasks it depends on.
+        """
+
+        deps = self.dependencies()
+        (done, order, visiting) = (set(), [], set())
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError("the tasks depend on each other in a cycle through %r" % name)
+            visiting.add(name)
+            for dep in sorted(deps[name]):
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in sorted(self.tasks):
+            visit(name)
+        return order
+
+    def fileHash(self, path):
+        """
+        Return the SHA-1 hash of a file's contents (None if it does not exist).
+        Hashes are remembered by (size, mtime), so unchanged files are not read
+        again.
+        """
+
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            known = self.state['files'].get(path)
+        if known is not None and known[0] == st.st_size and known[1] == st.st_mtime_ns:
+            return known[2]
+        h = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        digest = h.hexdigest()
+        with self._lock:
+            self.state['files'][path] = [st.st_size, st.st_mtime_ns, digest]
+        return digest
+
+    def signature(self, task):
+        """
+        Return a hash of a task's parameters and the contents of its inputs.
+        """
+
+        h = hashlib.sha1()
+        h.update(json.dumps({'stage': task.stage, 'params': task.params}, sort_keys=True).encode('utf-8'))
+        for path in sorted(task.inputs):
+            h.update(('%s %s\n' % (path, self.fileHash(path))).encode('utf-8'))
+        return h.hexdigest()
+
+    def isStale(self, task, signature):
+        last = self.state['tasks'].get(task.name)
+        if last is None or last['signature'] != signature:
+            return True
+        return any(self.fileHash(p) is None or self.fileHash(p) != last['outputs'].get(p) for p in task.outputs)
+
+    def save(self):
+        if self.state_path is None:
+            return
+        with self._save_lock:
+            with self._lock:
+                text = json.dumps(self.state, indent=1, sort_keys=True)
+            tmp = self.state_path + '.tmp'
+            with open(tmp, 'w') as f:
+                f.write(text)
+            os.replace(tmp, self.state_path)
+
+    def run(self, workers=4, force=False, verbose=False):
+        """
+        Run every task that is stale, in dependency order, with independent
+        tasks in parallel.
+
+        Parameters
+        ----------
+        workers : <int>
+            The maximum number of tasks running at once.
+        force : <logical>
+            Set to True to run every task.
+        verbose : <logical>
+            Set to True to print one line for each task as it finishes.
+
+        Returns
+        -------
+        report : <dictionary>
+            'tasks': task name -> {'stage', 'status' ('built', 'skipped',
+            'failed' or 'blocked'), 'seconds', 'error'};
+            'stages': stage -> {'seconds', 'built', 'skipped', 'failed',
+            'blocked'}; 'seconds': the wall-clock time of the whole build.
+        """
+
+        t_start = time.time()
+        deps = self.dependencies()
+        self.order()  # check for cycles before starting anything
+        waiting = dict((name, set(d)) for (name, d) in deps.items())
+        report = {}
+
+        def execute(task):
+            t0 = time.time()
+            signature = self.signature(task)
+            if not force and not self.isStale(task, signature):
+                return (task.name, 'skipped', time.time() - t0, None)
+            try:
+                for path in task.outputs:
+                    if not os.path.isdir(os.path.dirname(path)):
+                        os.makedirs(os.path.dirname(path))
+                with profiling.span(task.name, 'build'):
+                    task.action()
+                missing = [p for p in task.outputs if not os.path.exists(p)]
+                if missing:
+                    raise RuntimeError("outputs were not written: %s" % ', '.join(missing))
+            except Exception as e:
+                return (task.name, 'failed', time.time() - t0, '%s: %s' % (type(e).__name__, e))
+            outputs = dict((p, self.fileHash(p)) for p in task.outputs)
+            with self._lock:
+                self.state['tasks'][task.name] = {'signature': signature, 'outputs': outputs}
+            self.save()
+            return (task.name, 'built', time.time() - t0, None)
+
+        def finish(name, status, seconds, error):
+            report[name] = {'stage': self.tasks[name].stage, 'status': status, 'seconds': seconds, 'error': error}
+            if verbose:
+                print("%-8s %-60s %8.2f s%s" % (status, name, seconds, '  ' + error if error else ''))
+
+        running = {}
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            while waiting or running:
+                for name in sorted(n for (n, d) in waiting.items() if not d):
+                    del waiting[name]
+                    running[pool.submit(execute, self.tasks[name])] = name
+                if not running:
+                    break
+                (finished, _) = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    del running[future]
+                    (name, status, seconds, error) = future.result()
+                    finish(name, status, seconds, error)
+                    blocked = [name] if status == 'failed' else []
+                    for n in waiting:
+                        waiting[n].discard(name)
+                    # everything downstream of a failed task is blocked
+                    while blocked:
+                        failed = blocked.pop()
+                        for n in [n for (n, d) in deps.items() if failed in d and n in waiting]:
+                            del waiting[n]
+                            finish(n, 'blocked', 0.0, None)
+                            blocked.append(n)
+        self.save()
+
+        stages = {}
+        for entry in report.values():
+            stage = stages.setdefault(entry['stage'], {'seconds': 0.0, 'built': 0, 'skipped': 0,
+                                                       'failed': 0, 'blocked': 0})
+            stage['seconds'] += entry['seconds']
+            stage[entry['status']] += 1
+        return {'tasks': report, 'stages': stages, 'seconds': time.time() - t_start}
+
+
+def _fileKeys(path):
+    # a file is known by its absolute path and, if it exists, by its inode, so
+    # hard links to one file are treated as the same file
+    keys = [os.path.abspath(path)]
+    try:
+        st = os.stat(path)
+        keys.append((st.st_dev, st.st_ino))
+    except OSError:
+        pass
+    return keys
+
+
+def formatReport(report):
+    """
+    Format a build report as a table of the time spent in each stage.
+    """
+
+    lines = ['%-10s %6s %8s %7s %8s %10s' % ('stage', 'built', 'skipped', 'failed', 'blocked', 'seconds')]
+    names = [s for s in STAGES if s in report['stages']] + sorted(s for s in report['stages'] if s not in STAGES)
+    for name in names:
+        s = report['stages'][name]
+        lines.append('%-10s %6d %8d %7d %8d %10.2f' % (name, s['built'], s['skipped'], s['failed'],
+                                                       s['blocked'], s['seconds']))
+    lines.append('%-10s %42.2f' % ('wall clock', report['seconds']))
+    for (name, t) in sorted(report['tasks'].items()):
+        if t['error']:
+            lines.append('%s: %s' % (name, t['error']))
+    return '\n'.join(lines)
+
+
+def vabsTask(vabs_input, command):
+    """
+    A task that runs VABS on one cross-section input file (*.dat), which writes
+    <input>.K next to it.
+
+    Parameters
+    ----------
+    vabs_input : <string>
+        The VABS input file.
+    command : <list of strings>
+        The VABS command; '{input}' is replaced with the input file name, e.g.
+        ['VABS', '{input}'] (or [sys.executable, 'DYMORE/stubSolver.py',
+        '{input}'] to test without VABS).
+    """
+
+    vabs_input = os.path.abspath(vabs_input)
+
+    def action():
+        args = [a.format(input=os.path.basename(vabs_input)) for a in command]
+        subprocess.check_call(args, cwd=os.path.dirname(vabs_input), stdout=subprocess.DEVNULL)
+
+    return Task('vabs:' + vabs_input, 'vabs', [vabs_input], [vabs_input + '.K'], action,
+                params={'command': list(command)})
+
+
+def propsTask(props_path, propName, vabs_files, coord, CoordType='ETA_COORDINATE', comments=None, cache=None,
+              links=(), store_dir=None, link='hard'):
+    """
+    A task that writes a DYMORE @BEAM_PROPERTY_DEFINITION file (*_props.dat)
+    from the VABS output files (*.dat.K) of its cross-sections.
+
+    Parameters
+    ----------
+    props_path : <string>
+        The props file to write.
+    propName : <string>
+        The beam property name, e.g. 'propCD'.
+    vabs_files : <list of strings>
+        The VABS output files, one for each cross-section.
+    coord : <list of floats>
+        The spanwise coordinate of each cross-section (see CoordType).
+    CoordType, comments :
+        See DYMOREutilities.writeBeamPropertyDefinition.
+    cache : <MKcache.MKcache>
+        (optional) A cache of parsed VABS output files.
+    links : <list of strings>
+        (optional) Copies of the props file in case directories (e.g.
+        <case>/CD_props.dat) that are to get the new file. The new file is
+        added to the content-addressed store and linked there, the way
+        caseGenerator builds cases; files linked to the old stored copy are
+        left alone.
+    store_dir : <string>
+        The content-addressed store, needed with links (e.g.
+        <root>/.case_store).
+    link : <string>
+        How the links are made (see caseGenerator.linkFile).
+
+    The props file is replaced, not written in place, so hard links to the
+    old file (e.g. other cases' copies, through the store) keep the old
+    contents, and an interrupted write leaves the old file.
+    """
+
+    vabs_files = list(vabs_files)
+    links = list(links)
+    if links and store_dir is None:
+        raise ValueError("links to the props file need a store_dir")
+    coord = [float(c) for c in coord]
+    if len(coord) != len(vabs_files):
+        raise ValueError("%d coordinates for %d VABS files" % (len(coord), len(vabs_files)))
+
+    def action():
+        tmp = props_path + '.tmp'
+        f = du.makeFile(tmp)
+        if cache is None:
+            # read the stations ahead of the writer, in parallel threads
+            du.streamBeamPropertyDefinition(f, propName, CoordType, vabs_files, coord, comments=comments)
+        else:
+            (files, cm_x2, cm_x3, mpus, i1, i2, i3, K) = du.readMKfiles(vabs_files, cache=cache)
+            du.writeBeamPropertyDefinition(f, propName, CoordType, coord, cm_x2, cm_x3, mpus, i1, i2, i3, K,
+                                           comments=comments)
+        f.close()
+        os.replace(tmp, props_path)
+        if links:
+            obj_path = cg.storeFile(props_path, store_dir)
+            for dest in links:
+                cg.linkFile(obj_path, dest, link)
+
+    return Task('props:' + os.path.abspath(props_path), 'props', vabs_files, [props_path] + links, action,
+                params={'propName': propName, 'coord': coord, 'CoordType': CoordType, 'comments': comments,
+                        'links': [os.path.abspath(p) for p in links]})
+
+
+def surveyOutputs(case_dir):
+    """
+    Return the survey files (FIGURES/*.mdt) the deck of a case directory asks
+    the solver to write.
+    """
+
+    deck = dd.readDeck(os.path.join(case_dir, js.findDeck(case_dir)))
+    figures = deck.find('FIGURES_PATH')
+    figures = './' + js.OUTPUT_DIR + '/' if figures is None else figures.text.replace('\\', '/')
+    figures_dir = os.path.normpath(os.path.join(case_dir, figures))
+    return [os.path.join(figures_dir, survey.text + '.mdt') for survey in deck.findAll('SURVEY_NAME')
+            if survey.children is not None]
+
+
+def solverTask(case_dir, command=js.DEFAULT_COMMAND, timeout=None):
+    """
+    A task that runs the solver in one case directory (see jobScheduler.runCase).
+    Its inputs are all the input files in the case directory, and its outputs
+    the survey files of the deck.
+    """
+
+    def action():
+        (returncode, seconds) = js.runCase(case_dir, command, timeout)
+        if returncode != 0:
+            raise RuntimeError("the solver returned %d (see %s)" % (returncode, os.path.join(case_dir, 'solver.log')))
+
+    return Task('solver:' + os.path.abspath(case_dir), 'solver', js.inputFiles(case_dir), surveyOutputs(case_dir),
+                action, params={'command': list(command)})
+
+
+def figuresTask(group, out_dir, families=None):
+    """
+    A task that draws the figure families for one group of cases (see
+    figureRenderer.caseGroups).
+    """
+
+    from . import figureRenderer as fr
+
+    inputs = []
+    outputs = []
+    for job in fr.figureJobs([group], out_dir, families):
+        for (spar, case_dir) in sorted(job['cases'].items()):
+            inputs.extend(p for p in fr.surveyFiles(spar, case_dir, job['panel']['quantity']) if p not in inputs)
+        outputs.extend(os.path.join(job['out_dir'], '%s.%s' % (job['panel']['name'], fmt)) for fmt in job['formats'])
+
+    def action():
+        fr.renderFigures([group], out_dir, families, workers=1, force=True)
+
+    return Task('figures:' + group['name'], 'figures', inputs, outputs, action,
+                params={'families': sorted(families or fr.FAMILIES), 'version': fr.RENDERER_VERSION})
+
+
+def caseTreeGraph(root, command=js.DEFAULT_COMMAND, out_dir='figures', props=(), state=None, timeout=None):
+    """
+    Build the graph for a whole case tree: the solver in every case, the
+    figures for every load type x magnitude, and any props files given.
+
+    Parameters
+    ----------
+    root : <string>
+        The top of the case tree (<spar type>/<load type>/<magnitude label>).
+    command : <list of strings>
+        The solver command (see jobScheduler.runCase).
+    out_dir : <string>
+        The directory the figures are drawn in.
+    props : <list of Tasks>
+        (optional) Tasks that write props files, e.g. from propsTask. Cases
+        whose props files are outputs of those tasks (the props file itself,
+        or one of its links) are run again when the props change.
+    state : <string>
+        The state file (default: <root>/build_state.json).
+    """
+
+    from . import figureRenderer as fr
+
+    graph = BuildGraph(os.path.join(root, STATE_FILENAME) if state is None else state)
+    for task in props:
+        graph.add(task)
+    groups = fr.caseGroups(root)
+    for group in groups:
+        for case_dir in sorted(group['cases'].values()):
+            graph.add(solverTask(case_dir, command, timeout))
+        graph.add(figuresTask(group, out_dir))
+    return graph
@@ -0,0 +1,257 @@
+"""
+Functions in the caseGenerator module build DYMORE case directories from a
+declarative matrix of spar type x load type x load magnitude.
+
+Every case of one spar type shares the same props, mesh, curves, shapes and
+graphics files; only loadDist.dat changes. Shared files are stored once in a
+content-addressed store (one file per SHA-1 hash) and hard-linked into each case
+directory, so a new sweep takes seconds and almost no extra disk.
+
+Example
+-------
+>>> from DYMORE import caseGenerator as cg
+>>> cases = cg.generateCases(cg.CASE_MATRIX, root='sweep', store_dir='sweep/.store')
+>>> cases[0]
+('full-height_biplane_spar', 'flapwise_tipload', 1000.0, 'sweep/full-height_biplane_spar/flapwise_tipload/1e03')
+"""
+
+import fnmatch
+import hashlib
+import os
+import shutil
+
+from . import DYMOREdeck as dd
+
+
+# the applied forces and moments (unit vectors, scaled by the load magnitude)
+# for each load type, written the same way as in the existing loadDist files
+LOAD_TYPES = {
+    'flapwise_tipload': {'APPLIED_FORCES': '0,0,-1', 'APPLIED_MOMENTS': '0,0,0'},
+    'torsional_tipload': {'APPLIED_FORCES': '0,0, 0', 'APPLIED_MOMENTS': '1,0,0'},
+    }
+
+# the case matrix for the tip-load studies: every spar type is run with every
+# load type at every load magnitude
+# each spar type is built from a template case directory, which supplies all
+# the shared input files and a loadDist.dat to modify
+CASE_MATRIX = {
+    'spars': {
+        'monoplane_spar': 'monoplane_spar/flapwise_tipload/1e03',
+        'full-height_biplane_spar': 'full-height_biplane_spar/flapwise_tipload/1e03',
+        'half-height_biplane_spar': 'half-height_biplane_spar/flapwise_tipload/1e03',
+        },
+    'loads': ['flapwise_tipload', 'torsional_tipload'],
+    'magnitudes': [1.0e3, 1.0e4, 1.0e5, 2.0e5],
+    }
+
+LOAD_FILENAME = 'loadDist.dat'
+
+# files in a template directory that are never copied into a new case
+# (the solver outputs that clean.bat erases)
+IGNORE_PATTERNS = ['*.ats', '*.grf', '*.html', '*.out', '*.plt', '*.ps', '*.rcv',
+                   '*.eig', '*~', 'PlotSensors.m', 'PlotObjects.m', '*.mdt', '*.mdt.npy', '*.png', '*.eps']
+
+
+def magnitudeLabel(magnitude):
+    """
+    Return the directory name for a load magnitude, e.g. 2.0e5 -> '2e05'.
+    """
+
+    (mantissa, exponent) = ('%e' % magnitude).split('e')
+    mantissa = ('%g' % float(mantissa)).replace('.', 'p')
+    return '%se%02d' % (mantissa, int(exponent))
+
+
+def magnitudeFromLabel(label):
+    """
+    Return the load magnitude of a directory name, e.g. '2e05' -> 2.0e5 (the
+    inverse of magnitudeLabel).
+    """
+
+    return float(label.replace('p', '.'))
+
+
+def formatScalingFactor(magnitude):
+    """
+    Format a load magnitude the way the loadDist files do, e.g. 2.0e5 -> '2.000e+005'.
+    """
+
+    (mantissa, exponent) = ('%.3e' % magnitude).split('e')
+    return '%se%+04d' % (mantissa, int(exponent))
+
+
+def makeLoadDist(templateText, loadType, magnitude):
+    """
+    Make the text of a loadDist.dat file for one load case.
+
+    Parameters
+    ----------
+    templateText : <string>
+        The text of an existing loadDist.dat file with a @DEAD_LOAD_DEFINITION.
+        Everything except the scaling factor and the applied forces and moments
+        (e.g. the vertex the load is applied to) is kept as it is.
+    loadType : <string>
+        A key of LOAD_TYPES, e.g. 'flapwise_tipload'.
+    magnitude : <float>
+        The load magnitude, in N or N*m.
+
+    Returns
+    -------
+    text : <string>
+        The text of the new loadDist.dat file.
+    """
+
+    if loadType not in LOAD_TYPES:
+        raise ValueError("loadType must be one of " + ", ".join(sorted(LOAD_TYPES)) + ", not " + repr(loadType))
+    deck = dd.parseDeck(templateText, LOAD_FILENAME)
+    settings = dict(LOAD_TYPES[loadType])
+    settings['SCALING_FACTOR'] = formatScalingFactor(magnitude)
+    for (keyword, value) in settings.items():
+        node = deck.find(keyword)
+        if node is None:
+            raise ValueError("the loadDist template has no @" + keyword)
+        node.value = value
+    return deck.toString()
+
+
+def storeBytes(data, store_dir):
+    """
+    Add some bytes to the content-addressed store, if they are not already
+    there.
+
+    Returns
+    -------
+    obj_path : <string>
+        The path of the stored copy, <store_dir>/<hash[:2]>/<hash>.
+    """
+
+    digest = hashlib.sha1(data).hexdigest()
+    obj_dir = os.path.join(store_dir, digest[:2])
+    obj_path = os.path.join(obj_dir, digest)
+    if not os.path.exists(obj_path):
+        if not os.path.isdir(obj_dir):
+            os.makedirs(obj_dir)
+        tmp = obj_path + '.tmp%d' % os.getpid()
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, obj_path)
+    return obj_path
+
+
+def storeFile(path, store_dir):
+    """
+    Add a file to the content-addressed store. Returns the path of the stored
+    copy.
+    """
+
+    with open(path, 'rb') as f:
+        return storeBytes(f.read(), store_dir)
+
+
+def linkFile(obj_path, dest, link='hard'):
+    """
+    Put a stored file into a case directory.
+
+    Parameters
+    ----------
+    obj_path : <string>
+        The path of the stored file.
+    dest : <string>
+        The path of the file in the case directory. An existing file is replaced.
+    link : <string>
+        'hard' (hard link), 'symbolic' (symbolic link) or 'copy'. Links that the
+        file system does not support fall back to the next option in that list.
+    """
+
+    if os.path.lexists(dest):
+        os.remove(dest)
+    if link == 'hard':
+        try:
+            os.link(obj_path, dest)
+            return
+        except (OSError, AttributeError):
+            link = 'symbolic'
+    if link == 'symbolic':
+        try:
+            os.symlink(os.path.relpath(obj_path, os.path.dirname(dest)), dest)
+            return
+        except (OSError, AttributeError, NotImplementedError):
+            pass
+    shutil.copyfile(obj_path, dest)
+
+
+def storeTemplate(template_dir, store_dir):
+    """
+    Add every input file in a template case directory (except loadDist.dat and
+    solver outputs) to the store.
+
+    Returns
+    -------
+    manifest : <list of tuples>
+        (relative path, stored path) for each file.
+    """
+
+    manifest = []
+    for (dirpath, dirnames, filenames) in os.walk(template_dir):
+        dirnames.sort()
+        for name in sorted(filenames):
+            rel = os.path.relpath(os.path.join(dirpath, name), template_dir)
+            if rel == LOAD_FILENAME or any(fnmatch.fnmatch(name, p) for p in IGNORE_PATTERNS):
+                continue
+            manifest.append((rel, storeFile(os.path.join(dirpath, name), store_dir)))
+    return manifest
+
+
+def generateCase(case_dir, manifest, loadText, store_dir, link='hard'):
+    """
+    Build one case directory from a stored template and a loadDist.dat text.
+    """
+
+    for (rel, obj_path) in manifest:
+        dest = os.path.join(case_dir, rel)
+        if not os.path.isdir(os.path.dirname(dest)):
+            os.makedirs(os.path.dirname(dest))
+        linkFile(obj_path, dest, link)
+    linkFile(storeBytes(loadText.encode('latin-1'), store_dir), os.path.join(case_dir, LOAD_FILENAME), link)
+
+
+def generateCases(matrix=CASE_MATRIX, root='.', store_dir=None, link='hard'):
+    """
+    Build a case directory for every spar type x load type x magnitude in a
+    case matrix.
+
+    Parameters
+    ----------
+    matrix : <dictionary>
+        The case matrix, laid out like CASE_MATRIX: 'spars' maps each spar type
+        to its template case directory, 'loads' lists keys of LOAD_TYPES, and
+        'magnitudes' lists the load magnitudes.
+    root : <string>
+        The directory the cases are built in. Each case goes in
+        <root>/<spar type>/<load type>/<magnitude label>.
+    store_dir : <string>
+        The content-addressed store (default: <root>/.case_store).
+    link : <string>
+        How files are put into case directories: 'hard', 'symbolic' or 'copy'.
+
+    Returns
+    -------
+    cases : <list of tuples>
+        (spar type, load type, magnitude, case directory) for each case.
+    """
+
+    if store_dir is None:
+        store_dir = os.path.join(root, '.case_store')
+    cases = []
+    for spar in sorted(matrix['spars']):
+        template_dir = matrix['spars'][spar]
+        manifest = storeTemplate(template_dir, store_dir)
+        with open(os.path.join(template_dir, LOAD_FILENAME), 'r', newline='') as f:
+            templateLoad = f.read()
+        for loadType in matrix['loads']:
+            for magnitude in matrix['magnitudes']:
+                case_dir = os.path.join(root, spar, loadType, magnitudeLabel(magnitude))
+                loadText = makeLoadDist(templateLoad, loadType, magnitude)
+                generateCase(case_dir, manifest, loadText, store_dir, link)
+                cases.append((spar, loadType, float(magnitude), case_dir))
+    return cases
@@ -0,0 +1,247 @@
+"""
+The spardesign command-line tool: one command with a subcommand for each step
+of the analysis chain.
+
+    spardesign convert   VABS output files (*.dat.K) -> a DYMORE @BEAM_PROPERTY_DEFINITION
+    spardesign mkblock   one spar station's VABS output -> a DYMORE mass/stiffness block
+    spardesign generate  build the case tree (spar type x load type x magnitude)
+    spardesign run       run the solver in case directories
+    spardesign modes     natural frequencies and mode shapes, with the native beam model
+    spardesign ingest    collect the survey results of a case tree into a results database
+    spardesign check     compare the survey results of a case tree with a baseline
+    spardesign plot      draw the paper figures for a case tree
+
+With --profile TRACE (before the subcommand), the subcommand is profiled (see
+profiling): a Chrome trace is written to TRACE and a summary per stage is
+printed to standard error.
+
+Only the standard library is imported when the tool starts. Each subcommand
+imports the modules it needs (and, through them, NumPy, SciPy or matplotlib)
+when it runs, so subcommands that only handle text files (generate, run, and
+--help for everything) start in about the time it takes to start Python. See
+benchmarks/bench_cli_startup.py.
+
+Install it from the spardesign directory with
+> pip install -e .
+or run it without installing:
+> python -m DYMORE.cli generate sweep
+
+Example
+-------
+> spardesign generate sweep --magnitudes 1e3 1e4
+> spardesign run sweep/*_spar/*_tipload/* --stub --workers 4
+> spardesign ingest sweep --db sweep/results_db
+> spardesign check sweep --baseline sweep_baseline
+> spardesign plot sweep --out sweep/figures
+"""
+
+from __future__ import print_function
+import argparse
+import os
+import sys
+
+
+def _floats(text):
+    return [float(v) for v in text.replace(',', ' ').split()]
+
+
+def convert(args):
+    from . import DYMOREutilities as du
+
+    files = du.findMKfiles(args.vabs, pattern=args.pattern)
+    if not files:
+        raise SystemExit("spardesign convert: no VABS output files in " + args.vabs)
+    coords = _floats(args.coords)
+    if len(coords) != len(files):
+        raise SystemExit("spardesign convert: %d coordinates for %d VABS output files" % (len(coords), len(files)))
+    f = sys.stdout if args.output == '-' else du.makeFile(args.output)
+    try:
+        du.streamBeamPropertyDefinition(f, args.prop_name, args.coord_type, files, coords,
+                                        comments=args.comments, workers=args.workers)
+    finally:
+        if f is not sys.stdout:
+            f.close()
+    return 0
+
+
+def mkblock(args):
+    from . import makeSingleMKblock as mk
+
+    try:
+        mk.makeSingleMKblock(args.station, args.vabs, args.layup, args.output, CoordType=args.coord_type,
+                             debug_flag=args.verbose, spardesign_dir=args.spardesign_dir)
+    except IOError as e:
+        raise SystemExit("spardesign mkblock: %s" % e)
+    return 0
+
+
+def generate(args):
+    from . import caseGenerator as cg
+
+    spars = args.spars or sorted(cg.CASE_MATRIX['spars'])
+    matrix = dict(cg.CASE_MATRIX)
+    matrix['spars'] = dict((s, os.path.join(args.templates, cg.CASE_MATRIX['spars'][s])) for s in spars)
+    if args.loads:
+        matrix['loads'] = args.loads
+    if args.magnitudes:
+        matrix['magnitudes'] = args.magnitudes
+    cases = cg.generateCases(matrix, root=args.root, store_dir=args.store, link=args.link)
+    for (spar, load, magnitude, case_dir) in cases:
+        print(case_dir)
+    return 0
+
+
+def run(args):
+    from . import jobScheduler as js
+
+    command = js.STUB_COMMAND if args.stub else js.DEFAULT_COMMAND
+    results = js.runCases(args.cases, command=command, workers=args.workers, journal=args.journal,
+                          force=args.force, timeout=args.timeout)
+    return 1 if any(r['status'] == 'failed' for r in results) else 0
+
+
+def modes(args):
+    from . import modalAnalysis as ma
+
+    ma.analyzeCases(args.cases, nmodes=args.modes)
+    for case_dir in args.cases:
+        freqs = ma.readFrequencies(case_dir)[1]
+        print("%s: %s Hz" % (case_dir, ' '.join('%.4g' % f for f in freqs)))
+    return 0
+
+
+def ingest(args):
+    from . import resultsDatabase as rdb
+
+    counts = rdb.ResultsDatabase(args.db).ingest(args.root)
+    print(", ".join("%d %s" % (counts[k], k) for k in ('added', 'updated', 'unchanged', 'removed')))
+    return 0
+
+
+def check(args):
+    from . import regressionCheck as rc
+
+    if args.save:
+        counts = rc.saveBaseline(args.root, args.baseline)
+        print("baseline %s: " % args.baseline + ", ".join("%d %s" % (counts[k], k)
+                                                        for k in ('added', 'updated', 'unchanged', 'removed')))
+        return 0
+    tolerances = {}
+    for (column, atol, rtol) in args.tolerance or []:
+        tolerances[column] = (float(atol), float(rtol))
+    try:
+        report = rc.checkTree(args.root, args.baseline, work=args.work, tolerances=tolerances)
+    except (IOError, KeyError) as e:
+        raise SystemExit("spardesign check: %s" % (e.args[0] if e.args else e))
+    sys.stdout.write(rc.formatReport(report))
+    return 0 if report['passed'] else 1
+
+
+def plot(args):
+    from . import figureRenderer as fr
+
+    done = fr.renderFigures(fr.caseGroups(args.root), args.out, families=args.families,
+                            workers=args.workers, force=args.force)
+    for (name, status) in done:
+        print("%-8s %s" % (status, name))
+    return 0
+
+
+def makeParser():
+    """
+    Return the argument parser of the spardesign command, with one subparser
+    for each subcommand.
+    """
+
+    # the choices below are copied from the modules (which are not imported
+    # until a subcommand runs)
+    coord_types = ['ETA_COORDINATE', 'CURVILINEAR_COORDINATE', 'AXIAL_COORDINATE']
+
+    parser = argparse.ArgumentParser(prog='spardesign', description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--profile', metavar='TRACE', default=None,
+                        help="profile the subcommand, and write a Chrome trace file")
+    sub = parser.add_subparsers(dest='command', metavar='command')
+    sub.required = True
+
+    p = sub.add_parser('convert', help="VABS output files -> a DYMORE beam property definition")
+    p.add_argument('vabs', help="a directory of VABS output files, or a glob pattern")
+    p.add_argument('--pattern', default='*.dat.K', help="the VABS output files in a directory")
+    p.add_argument('--prop-name', required=True, help="the beam property name, e.g. propCD")
+    p.add_argument('--coords', required=True, help="the spanwise coordinate of each file, in order (comma-separated)")
+    p.add_argument('--coord-type', default='ETA_COORDINATE', choices=coord_types)
+    p.add_argument('--comments', default=None)
+    p.add_argument('--workers', type=int, default=8, help="threads reading the VABS output files")
+    p.add_argument('-o', '--output', default='-', help="the file to write (default: standard output)")
+    p.set_defaults(func=convert)
+
+    p = sub.add_parser('mkblock', help="one spar station's VABS output -> a DYMORE mass/stiffness block")
+    p.add_argument('vabs', help="the VABS output file (*.dat.K)")
+    p.add_argument('layup', help="the truegrid layup file")
+    p.add_argument('--station', type=int, required=True, help="the spar station number")
+    p.add_argument('--spardesign-dir', default=None,
+                   help="the spardesign directory, with the truegrid package (default: the current directory)")
+    p.add_argument('--coord-type', default='ETA_COORDINATE', choices=coord_types)
+    p.add_argument('-o', '--output', required=True)
+    p.add_argument('-v', '--verbose', action='store_true')
+    p.set_defaults(func=mkblock)
+
+    p = sub.add_parser('generate', help="build the case tree")
+    p.add_argument('root', help="the directory the cases are built in")
+    p.add_argument('--spars', nargs='+', help="spar types (default: all of them)")
+    p.add_argument('--templates', default='.', help="the spardesign directory, with the template cases")
+    p.add_argument('--loads', nargs='+', help="load types (default: all of them)")
+    p.add_argument('--magnitudes', nargs='+', type=float, help="load magnitudes [N or N*m]")
+    p.add_argument('--store', default=None, help="the shared file store (default: <root>/.case_store)")
+    p.add_argument('--link', default='hard', choices=['hard', 'symbolic', 'copy'])
+    p.set_defaults(func=generate)
+
+    p = sub.add_parser('run', help="run the solver in case directories")
+    p.add_argument('cases', nargs='+', help="the case directories")
+    p.add_argument('--stub', action='store_true', help="run stubSolver.py instead of Dymore.exe")
+    p.add_argument('--workers', type=int, default=4)
+    p.add_argument('--journal', default='sweep_journal.jsonl')
+    p.add_argument('--timeout', type=float, default=None, help="seconds each solver run may take")
+    p.add_argument('--force', action='store_true', help="run cases whose outputs are up to date, too")
+    p.set_defaults(func=run)
+
+    p = sub.add_parser('modes', help="natural frequencies and mode shapes, without Dymore.exe")
+    p.add_argument('cases', nargs='+', help="the case directories")
+    p.add_argument('--modes', type=int, default=None, help="the number of modes (default: @NUMBER_OF_EIGENVALUES)")
+    p.set_defaults(func=modes)
+
+    p = sub.add_parser('ingest', help="collect survey results into a results database")
+    p.add_argument('root', help="the top of the case tree")
+    p.add_argument('--db', default='results_db', help="the results database directory")
+    p.set_defaults(func=ingest)
+
+    p = sub.add_parser('check', help="compare survey results with a baseline")
+    p.add_argument('root', help="the top of the case tree")
+    p.add_argument('--baseline', required=True, help="the baseline results database directory")
+    p.add_argument('--save', action='store_true', help="save the tree's results as the baseline instead")
+    p.add_argument('--work', default=None, help="the working results database (default: <root>/.regression_db)")
+    p.add_argument('--tolerance', nargs=3, action='append', metavar=('COLUMN', 'ATOL', 'RTOL'),
+                   help="the tolerances of one column, e.g. M2 1e-3 1e-5 (repeat for more columns)")
+    p.set_defaults(func=check)
+
+    p = sub.add_parser('plot', help="draw the paper figures")
+    p.add_argument('root', help="the top of the case tree")
+    p.add_argument('--out', default='figures', help="the directory the figures are saved in")
+    p.add_argument('--families', nargs='+', help="figure families (default: all of them)")
+    p.add_argument('--workers', type=int, default=None)
+    p.add_argument('--force', action='store_true', help="draw figures that are up to date, too")
+    p.set_defaults(func=plot)
+
+    return parser
+
+
+def main(argv=None):
+    args = makeParser().parse_args(argv)
+    if args.profile is None:
+        return args.func(args)
+    from . import profiling
+    with profiling.profile(args.profile, summary=sys.stderr):
+        return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
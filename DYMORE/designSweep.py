@@ -0,0 +1,486 @@
+"""
+Functions in the designSweep module explore the biplane spar design space: the
+joint location (rj/R, set by the spar station at the end of the joint
+transition), the gap-to-chord ratio (g/c) and the shear-web height (full or
+half). The case we ship, 24-bispar-rj452-g125, is one point of it.
+
+Each variant is built in memory, without MATLAB or Dymore.exe: the reference
+lines come from biplaneGeometry, and the cross-section properties of each spar
+station come from a StationLibrary of the sections that VABS has already
+analyzed (the biplane sections of the shipped biplane spars and the monoplane
+sections of the monoplane spar). Biplane sections that have not been analyzed
+(outboard of the shipped joint transition) are estimated from the monoplane
+section at the same station, scaled like the outermost analyzed biplane
+section; the table counts them for each variant.
+
+Every variant is first solved on a cheap mesh (one element per beam). If that
+estimate already breaks a tip-deflection limit by more than prune_margin, the
+variant is pruned; otherwise it is solved on the full mesh. Variants are
+evaluated in a pool of worker processes, and each result is appended to a CSV
+table as soon as it is ready.
+
+Over the 56 variants of designGrid() (the 'stations' mesh), the ratio of the
+estimate to the full solve was measured to be 0.945 to 1.044 for tip_u3 and
+0.921 to 0.990 for tip_r1 (see ESTIMATE_RATIOS). A pruned variant can only
+be within a limit if its estimate is more than 1 + prune_margin times too
+large, so the default prune_margin of 0.05 covers the measured 1.044, with
+little to spare. To check that, runSweep also solves a sample of the pruned
+variants on the full mesh (every check_every-th variant, if it is pruned), and
+warns if any estimate falls outside ESTIMATE_RATIOS or a variant was pruned
+wrongly.
+
+Example
+-------
+>>> from DYMORE import designSweep as ds
+>>> library = ds.StationLibrary()
+>>> designs = ds.designGrid(joint_stations=range(14, 21), gaps=[0.75, 1.0, 1.25, 1.5])
+>>> rows = ds.runSweep(designs, library, table='design_sweep.csv', limits={'tip_u3': 0.05}, workers=4)
+"""
+
+import csv
+import hashlib
+import os
+import pickle
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from . import DYMOREdeck as dd
+from . import adaptiveMesh as am
+from . import beamAssembly as ba
+from . import biplaneGeometry as bg
+from . import nurbs
+
+
+# the template decks for each shear-web height, and the monoplane spar
+SPAR_DECKS = {
+    'full': 'full-height_biplane_spar/flapwise_tipload/1e03/biplane_spar.dym',
+    'half': 'half-height_biplane_spar/flapwise_tipload/1e03/biplane_spar.dym',
+    }
+MONOPLANE_DECK = 'monoplane_spar/flapwise_tipload/1e03/monoplane_spar.dym'
+HEIGHT_SCALES = {'full': 1.0, 'half': 0.5}
+
+# the tip loads of the tip-load studies (1e3 N flapwise, 1e3 N-m torsional),
+# solved together for every variant
+TIP_VERTEX = 'vertexF'
+TIP_LOADS = np.array([[0.0, 0.0, -1.0e3, 0.0, 0.0, 0.0],
+                      [0.0, 0.0, 0.0, 1.0e3, 0.0, 0.0]])
+
+# the results that limits may be set on: the flapwise tip deflection under
+# the flapwise load and the tip twist under the torsional load
+LIMIT_NAMES = ('tip_u3', 'tip_r1')
+
+# the smallest and largest ratio of the cheap estimate to the full solve,
+# measured over the 56 variants of designGrid() (rounded outward)
+ESTIMATE_RATIOS = {'tip_u3': (0.944, 1.045), 'tip_r1': (0.920, 0.991)}
+
+TABLE_COLUMNS = ['label', 'rj__to__R', 'g__to__c', 'height', 'jt_end_station', 'status',
+                 'estimate_tip_u3', 'estimate_tip_r1', 'tip_u3', 'tip_r1', 'mass',
+                 'elements', 'estimated_sections', 'seconds']
+
+# the beams of the biplane spar: region curve, and whether the last section
+# is the monoplane section at the joint
+BEAMS = {
+    'CD_straightBiplane_upper': ('CD', False),
+    'GH_straightBiplane_lower': ('GH', False),
+    'DE_jointTrans_upper': ('DE', True),
+    'HE_jointTrans_lower': ('HE', True),
+    'EF_monoOutboard': ('EF', None),
+    }
+
+
+class StationLibrary(object):
+    """
+    The cross-section properties of each of the 24 spar stations, for the
+    biplane sections of each shear-web height and for the monoplane sections.
+
+    Parameters
+    ----------
+    spar_decks : <dictionary>
+        height ('full', 'half') -> the template biplane deck.
+    monoplane_deck : <string>
+        The monoplane deck.
+
+    Attributes
+    ----------
+    monoplane : <dictionary>
+        'S' (24,6,6) stiffness matrices and 'mass' (24,6) mass properties
+        (cm_x2, cm_x3, mass per unit span, i1, i2, i3) of each station.
+    biplane : <dictionary>
+        height -> the same, plus 'analyzed', a boolean (24,) array that is
+        False for the estimated sections.
+    beam_names, ends, fixed :
+        The beams, their end vertices and the boundary conditions (vertex
+        name -> fixed degrees of freedom) of the template decks.
+    """
+
+    def __init__(self, spar_decks=SPAR_DECKS, monoplane_deck=MONOPLANE_DECK):
+        nstn = len(bg.X1_STATIONS)
+        mono = ba.readBeamGraph(dd.readDeck(monoplane_deck)).beams[0]
+        self.monoplane = self._stations(dd.readDeck(monoplane_deck), [mono], nstn)
+
+        self.biplane = {}
+        for (height, path) in spar_decks.items():
+            deck = dd.readDeck(path)
+            graph = ba.readBeamGraph(deck)
+            # the straight biplane and joint transition sections of the upper
+            # spar (the lower spar has the same ones), without the monoplane
+            # section at the joint
+            beams = [b for b in graph.beams if BEAMS[b.name][0] in ('CD', 'DE')]
+            sections = self._stations(deck, beams, nstn, skip_last=[BEAMS[b.name][1] for b in beams])
+            sections['analyzed'] = ~np.isnan(sections['S'][:,0,0])
+            self._estimate(sections)
+            self.biplane[height] = sections
+            self.beam_names = [b.name for b in graph.beams]
+            self.ends = graph.ends
+            self.fixed = dict((v, graph.fixed[node].copy()) for (v, node) in graph.vertices.items())
+
+    def _stations(self, deck, beams, nstn, skip_last=None):
+        S = np.full((nstn, 6, 6), np.nan)
+        mass = np.full((nstn, 6), np.nan)
+        for (k, beam) in enumerate(beams):
+            prop = deck.findDefinition('BEAM_PROPERTY_NAME', self._propName(deck, beam.name))
+            (coord, cm_x2, cm_x3, mpus, i1, i2, i3, K) = dd.readBeamProperties(prop)
+            x1 = nurbs.curveDerivatives(*beam.curve, beam.prop_eta, 0)[0][:,0]
+            station = np.abs(x1[:,None] - bg.X1_STATIONS[None,:]).argmin(axis=1)
+            n = len(station) - 1 if skip_last and skip_last[k] else len(station)
+            S[station[:n]] = K[:n]
+            mass[station[:n]] = np.array([cm_x2, cm_x3, mpus, i1, i2, i3]).T[:n]
+        return {'S': S, 'mass': mass}
+
+    @staticmethod
+    def _propName(deck, beamName):
+        for node in deck.findAll('BEAM_NAME', beamName):
+            if node.children is not None:
+                return node.find('BEAM_PROPERTY_NAME').text
+        raise ValueError("%s has no beam %s" % (deck.path, beamName))
+
+    def _estimate(self, sections):
+        # scale the monoplane sections by D S D, with D the square roots of
+        # the ratios of the diagonal terms at the outermost analyzed biplane
+        # station (so the estimate stays symmetric positive-definite)
+        analyzed = np.nonzero(sections['analyzed'])[0]
+        last = analyzed[-1]
+        d = np.sqrt(np.diagonal(sections['S'][last])/np.diagonal(self.monoplane['S'][last]))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = sections['mass'][last]/self.monoplane['mass'][last]
+        for i in np.nonzero(~sections['analyzed'])[0]:
+            sections['S'][i] = d[:,None]*self.monoplane['S'][i]*d[None,:]
+            sections['mass'][i] = np.where(np.isfinite(ratio), ratio, 1.0)*self.monoplane['mass'][i]
+
+    def sections(self, height, stations, monoplane_last=False):
+        """
+        Return the stiffness matrices and mass properties of spar stations
+        (numbered from 1), biplane sections of the given height, with the
+        monoplane section at the last station if monoplane_last is True (or at
+        every station if height is None). Also returns the number of estimated
+        sections used.
+        """
+
+        idx = np.asarray(stations) - 1
+        if height is None:
+            return (self.monoplane['S'][idx], self.monoplane['mass'][idx], 0)
+        lib = self.biplane[height]
+        (S, mass) = (lib['S'][idx].copy(), lib['mass'][idx].copy())
+        bi = idx[:-1] if monoplane_last else idx
+        if monoplane_last:
+            S[-1] = self.monoplane['S'][idx[-1]]
+            mass[-1] = self.monoplane['mass'][idx[-1]]
+        return (S, mass, int(np.sum(~lib['analyzed'][bi])))
+
+
+def designLabel(design):
+    """
+    Return the name of a design, in the style of the shipped case (e.g.
+    '24-bispar-rj452-g125', with '-half' for half-height shear webs).
+    """
+
+    rj = bg.X1_STATIONS[design['jt_end_station'] - 1]/bg.R
+    label = '24-bispar-rj%03d-g%03d' % (int(round(1000*rj)), int(round(100*design['g__to__c'])))
+    return label + ('-half' if design['height'] == 'half' else '')
+
+
+def designGrid(joint_stations=range(14, 21), gaps=(0.75, 1.0, 1.25, 1.5), heights=('full', 'half')):
+    """
+    Return every combination of joint location (the spar station at the end
+    of the joint transition), gap-to-chord ratio and shear-web height, as a
+    list of design dictionaries.
+    """
+
+    designs = []
+    for height in heights:
+        for jt_end_station in joint_stations:
+            if not 3 <= jt_end_station < len(bg.X1_STATIONS):
+                raise ValueError("the joint must end between stations 3 and %d" % (len(bg.X1_STATIONS) - 1))
+            for g__to__c in gaps:
+                designs.append({'jt_end_station': int(jt_end_station), 'g__to__c': float(g__to__c), 'height': height})
+    return designs
+
+
+def buildGraph(design, library, mesh='stations'):
+    """
+    Build the beam graph of one design.
+
+    Parameters
+    ----------
+    design : <dictionary>
+        'jt_end_station', 'g__to__c' and 'height'.
+    library : <StationLibrary>
+        The cross-section properties.
+    mesh : <string>
+        'stations' for one element between each pair of spar stations (like
+        the shipped meshes), 'adaptive' for adaptiveMesh.adaptiveEtas, or
+        'coarse' for one element per beam (the cheap estimate).
+
+    Returns
+    -------
+    graph : <BeamGraph>
+    mass : <float>
+        The mass of the spar, [kg].
+    estimated : <int>
+        The number of estimated cross-sections used.
+    """
+
+    curves = bg.biplaneCurves(bg.biplanePoints(design['g__to__c'], design['jt_end_station']))
+    regions = dict((r['name'], r) for r in bg.biplaneRegions(design['jt_end_station']))
+    beams = []
+    mass = 0.0
+    estimated = 0
+    for name in library.beam_names:
+        (key, monoplane_last) = BEAMS[name]
+        region = regions[name.split('_')[1]]
+        (start, end) = region['stations']
+        stations = np.arange(start, end + 1)
+        prop_eta = bg.stationEtas(curves[key], start, end)
+        height = None if monoplane_last is None else design['height']
+        (S, props, n) = library.sections(height, stations, bool(monoplane_last))
+        if key in ('CD', 'DE'):
+            estimated += n   # the lower spar repeats the same sections
+        if mesh == 'coarse':
+            elem_eta = np.array([0.0, 1.0])
+        elif mesh == 'adaptive':
+            elem_eta = am.adaptiveEtas(curves[key], prop_eta, S)
+        else:
+            elem_eta = prop_eta
+        beam = ba.CurvedBeam(*curves[key], elem_eta=elem_eta, order=3, prop_eta=prop_eta, S=S, name=name)
+        beams.append(beam)
+        # the mass: mass per unit span, integrated along the reference line
+        eta = np.linspace(0.0, 1.0, 201)
+        ds = np.linalg.norm(nurbs.curveDerivatives(*curves[key], eta, 1)[1], axis=1)
+        f = np.interp(eta, prop_eta, props[:,2])*ds
+        mass += np.sum(0.5*(f[1:] + f[:-1])*np.diff(eta))
+    graph = ba.BeamGraph(beams, library.ends)
+    for (vertex, fixed) in library.fixed.items():
+        graph.fixed[graph.vertices[vertex]] = fixed
+    return (graph, mass, estimated)
+
+
+def tipResponse(graph):
+    """
+    Solve the tip loads (TIP_LOADS) on a beam graph, and return the flapwise
+    tip deflection under the flapwise load and the tip twist under the
+    torsional load (as positive numbers).
+    """
+
+    P = np.zeros((len(TIP_LOADS), graph.nnodes, 6))
+    P[:,graph.vertices[TIP_VERTEX]] = TIP_LOADS
+    U = ba.SparseStaticSolver(graph).solve(P)[:,graph.vertices[TIP_VERTEX]]
+    return {'tip_u3': abs(U[0,2]), 'tip_r1': abs(U[1,3])}
+
+
+def violates(response, limits, margin=0.0):
+    """
+    Return True if any result breaks its limit by more than the margin (a
+    fraction of the limit).
+    """
+
+    return any(response[k] > limits[k]*(1.0 + margin) for k in limits)
+
+
+def evaluateDesign(design, library, limits=None, prune_margin=0.05, mesh='stations', write_dir=None, check=False):
+    """
+    Evaluate one design: a cheap estimate first, then (unless it is pruned)
+    the full solve.
+
+    Parameters
+    ----------
+    design : <dictionary>
+        See buildGraph.
+    library : <StationLibrary>
+        The cross-section properties.
+    limits : <dictionary>
+        (optional) The largest allowed 'tip_u3' [m] and/or 'tip_r1' [rad].
+    prune_margin : <float>
+        Prune a design only if its cheap estimate breaks a limit by more than
+        this fraction of the limit.
+    mesh : <string>
+        The mesh for the full solve (see buildGraph).
+    write_dir : <string>
+        (optional) Write the DYMORE geometry files of every design that is not
+        pruned to write_dir/<label>.
+    check : <logical>
+        Set to True to solve the full mesh even if the design is pruned, to
+        check the estimate. A checked design that the full solve shows to be
+        within the limits was pruned wrongly, and its status is 'ok'.
+
+    Returns
+    -------
+    row : <dictionary>
+        One row of the results table (see TABLE_COLUMNS). The status is
+        'pruned', 'fails' (the full solve breaks a limit) or 'ok'. tip_u3 and
+        tip_r1 are None for a design that was pruned and not checked.
+    """
+
+    t0 = time.time()
+    limits = limits or {}
+    unknown = set(limits) - set(LIMIT_NAMES)
+    if unknown:
+        raise ValueError("no limits can be set on %s" % ', '.join(sorted(unknown)))
+    label = designLabel(design)
+    row = {'label': label, 'rj__to__R': bg.X1_STATIONS[design['jt_end_station'] - 1]/bg.R,
+           'g__to__c': design['g__to__c'], 'height': design['height'],
+           'jt_end_station': design['jt_end_station']}
+
+    (graph, mass, estimated) = buildGraph(design, library, mesh='coarse')
+    estimate = tipResponse(graph)
+    row.update({'estimate_tip_u3': estimate['tip_u3'], 'estimate_tip_r1': estimate['tip_r1'],
+                'mass': mass, 'estimated_sections': estimated})
+    pruned = violates(estimate, limits, prune_margin)
+    if pruned and not check:
+        row.update({'status': 'pruned', 'tip_u3': None, 'tip_r1': None, 'elements': graph.nelem,
+                    'seconds': time.time() - t0})
+        return row
+
+    (graph, mass, estimated) = buildGraph(design, library, mesh=mesh)
+    response = tipResponse(graph)
+    row.update(response)
+    if violates(response, limits):
+        row.update({'status': 'pruned' if pruned else 'fails', 'elements': graph.nelem})
+    else:
+        row.update({'status': 'ok', 'elements': graph.nelem})
+    if write_dir is not None and row['status'] != 'pruned':
+        bg.writeBiplaneGeometry(os.path.join(write_dir, label), g__to__c=design['g__to__c'],
+                                jt_end_station=design['jt_end_station'],
+                                biplane_height_scale=HEIGHT_SCALES[design['height']])
+    row['seconds'] = time.time() - t0
+    return row
+
+
+# the library of a worker process: (hash of the pickled library, library)
+_WORKER_LIBRARY = (None, None)
+
+
+def _evaluate(args):
+    # the pickled library comes with every job (a ProcessPoolExecutor
+    # initializer needs Python 3.7), and is unpickled once per worker
+    global _WORKER_LIBRARY
+    ((key, pickled), design, limits, prune_margin, mesh, write_dir, check) = args
+    if _WORKER_LIBRARY[0] != key:
+        _WORKER_LIBRARY = (key, pickle.loads(pickled))
+    return evaluateDesign(design, _WORKER_LIBRARY[1], limits, prune_margin, mesh, write_dir, check)
+
+
+def checkEstimates(rows, limits=None, prune_margin=0.05):
+    """
+    Check the designs that were solved on the full mesh: the ratio of each
+    estimate to the full solve should be within ESTIMATE_RATIOS, and none of
+    the pruned ones (see evaluateDesign, check) should be within the limits.
+
+    Returns
+    -------
+    problems : <list of strings>
+        One line for each design that did not pass (an empty list if they all
+        did).
+    """
+
+    limits = limits or {}
+    problems = []
+    for row in rows:
+        if row['tip_u3'] is None:
+            continue
+        for name in LIMIT_NAMES:
+            ratio = row['estimate_' + name]/row[name]
+            (low, high) = ESTIMATE_RATIOS[name]
+            if not low <= ratio <= high:
+                problems.append("%s: the estimate of %s is %.4f times the full solve, outside [%.3f, %.3f]"
+                                % (row['label'], name, ratio, low, high))
+        estimate = dict((name, row['estimate_' + name]) for name in LIMIT_NAMES)
+        if row['status'] == 'ok' and violates(estimate, limits, prune_margin):
+            problems.append("%s: pruned, but the full solve is within the limits" % row['label'])
+    return problems
+
+
+def runSweep(designs, library=None, table='design_sweep.csv', limits=None, prune_margin=0.05,
+             mesh='stations', workers=None, write_dir=None, check_every=10, verbose=True):
+    """
+    Evaluate many designs in a pool of worker processes, appending each
+    result to a CSV table as soon as it is ready.
+
+    Parameters
+    ----------
+    designs : <list of dictionaries>
+        The designs (see designGrid).
+    library : <StationLibrary>
+        (optional) The cross-section properties. Read from the template decks
+        by default.
+    table : <string>
+        The CSV file to write (overwritten), or None.
+    limits, prune_margin, mesh, write_dir :
+        See evaluateDesign.
+    workers : <int>
+        The number of worker processes (default: one per CPU; 1 evaluates the
+        designs in this process).
+    check_every : <int>
+        Solve every check_every-th design (the first, and so on) on the full
+        mesh even if it is pruned (None or 0 for none of them). A warning is
+        given if the estimate of any design solved on the full mesh is out of
+        ESTIMATE_RATIOS, or a design was pruned wrongly (see checkEstimates).
+    verbose : <logical>
+        Set to True to print one line for each design as it finishes.
+
+    Returns
+    -------
+    rows : <list of dictionaries>
+        One row for each design, in the same order as designs.
+    """
+
+    library = library or StationLibrary()
+    jobs = [(design, limits, prune_margin, mesh, write_dir, bool(check_every) and n % check_every == 0)
+            for (n, design) in enumerate(designs)]
+    rows = [None] * len(designs)
+    f = open(table, 'w', newline='') if table else None
+    try:
+        writer = csv.DictWriter(f, TABLE_COLUMNS) if f else None
+        if writer:
+            writer.writeheader()
+            f.flush()
+
+        def finish(n, row):
+            rows[n] = row
+            if writer:
+                writer.writerow(dict((k, '' if v is None else v) for (k, v) in row.items()))
+                f.flush()
+            if verbose:
+                tip = row['tip_u3'] if row['tip_u3'] is not None else row['estimate_tip_u3']
+                print("%-7s %-28s tip u3 = %.4e m (%.2f s)" % (row['status'], row['label'], tip, row['seconds']))
+
+        if workers == 1 or len(jobs) <= 1:
+            for (n, job) in enumerate(jobs):
+                finish(n, evaluateDesign(job[0], library, *job[1:]))
+        else:
+            pickled = pickle.dumps(library, pickle.HIGHEST_PROTOCOL)
+            shared = (hashlib.sha1(pickled).hexdigest(), pickled)
+            with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(jobs))) as pool:
+                futures = dict((pool.submit(_evaluate, (shared,) + job), n) for (n, job) in enumerate(jobs))
+                for future in as_completed(futures):
+                    finish(futures[future], future.result())
+    finally:
+        if f:
+            f.close()
+    problems = checkEstimates(rows, limits, prune_margin)
+    if problems:
+        warnings.warn("the cheap estimates are further off than ESTIMATE_RATIOS, so prune_margin may be "
+                      "too small:\n  " + '\n  '.join(problems))
+    return rows
@@ -0,0 +1,304 @@
+"""
+The figureRenderer module draws the paper figures (the Fig. 18 family and the
+edgewise-deflection family) for any number of cases, without a display.
+
+The plot scripts (plot_fig_18_deflections_and_bending_moments.py and
+plot_edgewise_deflections_under_torsional_tipload.py) are meant for an
+interactive pylab session and draw one set of figures at a time. Here every
+figure is drawn on its own matplotlib Figure with the Agg canvas (no pyplot, no
+windows, no os.chdir), in a pool of worker processes.
+
+A figure is only drawn again if its input surveys, its style or the renderer
+have changed since it was last drawn. The key of each figure (a SHA-1 hash of
+all three) is kept in render_cache.json in the output directory.
+
+Example
+-------
+>>> from DYMORE import figureRenderer as fr
+>>> groups = fr.caseGroups('sweep')   # one group per load type x magnitude
+>>> done = fr.renderFigures(groups, 'sweep_figures', workers=4)
+"""
+
+import copy
+import glob
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from . import mdtReader as mdt
+from . import resample as rs
+
+
+# change this to draw every figure again
+RENDERER_VERSION = 1
+
+CACHE_FILENAME = 'render_cache.json'
+
+# the spar types, in the order they are drawn
+SPARS = ('monoplane_spar', 'full-height_biplane_spar', 'half-height_biplane_spar')
+
+# x1-coordinates of the biplane spar points (C-D-E-F upper, G-H-E lower)
+BIPLANE_POINTS = {'C': 0.0, 'D': 25.2, 'E': 41.5, 'F': 91.9, 'G': 0.0, 'H': 25.2}
+
+# the span of the monoplane spar
+MONOPLANE_SPAN = 91.9
+
+# how each spar type is drawn: the line format of the monoplane spar, or of the
+# upper and lower biplane spar elements
+SPAR_LINES = {
+    'monoplane_spar': {'fmt': ('rs--',), 'color': 'red', 'label': ('monoplane spar',)},
+    'full-height_biplane_spar': {'fmt': ('go-', 'gx-'), 'color': 'green',
+                                 'label': ('full-height biplane spar, upper', 'full-height biplane spar, lower')},
+    'half-height_biplane_spar': {'fmt': ('bo-.', 'bx-.'), 'color': 'blue',
+                                 'label': ('half-height biplane spar, upper', 'half-height biplane spar, lower')},
+    }
+
+# the figure families; each panel is one figure, of one survey column vs. span
+# (column numbers as in the .mdt files, eta in column 0)
+FAMILIES = {
+    'fig_18': {
+        'formats': ('pdf', 'png'),
+        'style': {'scalefactor': 1.6, 'fw': 7, 'fh': 3, 'glw': 3.0, 'gms': 10.0, 'gmew': 2.0, 'font_size': 18.0},
+        'panels': [
+            {'name': 'fig_18a_deflections', 'quantity': 'disp', 'column': 3, 'scale': 1.0, 'skip': 3,
+             'stations': False, 'ylabel': 'flapwise deflection [m]',
+             'adjust': {'left': 0.10, 'right': 0.97, 'bottom': 0.13, 'top': 0.96}},
+            {'name': 'fig_18b_bendmoment', 'quantity': 'force', 'column': 5, 'scale': 1.0e-3, 'skip': 1,
+             'stations': True, 'ylabel': 'bending moment [kN*m]',
+             'adjust': {'left': 0.12, 'right': 0.97, 'bottom': 0.13, 'top': 0.96}},
+            {'name': 'fig_18c_axialforce', 'quantity': 'force', 'column': 1, 'scale': 1.0e-3, 'skip': 1,
+             'stations': True, 'ylabel': 'axial force resultant [kN]',
+             'adjust': {'left': 0.10, 'right': 0.97, 'bottom': 0.13, 'top': 0.96}},
+            ],
+        },
+    'edgewise': {
+        'formats': ('eps', 'png'),
+        'style': {'scalefactor': 1.0, 'fw': 8, 'fh': 4, 'glw': 1.5, 'gms': 7.5, 'gmew': 1.5, 'font_size': 10.0},
+        'panels': [
+            {'name': 'fig_xx_edgewise_deflections', 'quantity': 'disp', 'column': 2, 'scale': 1.0, 'skip': 1,
+             'stations': False, 'ylabel': 'edgewise deflections [m]',
+             'adjust': {'right': 0.93, 'bottom': 0.16}},
+            ],
+        },
+    }
+
+
+def caseGroups(root, spars=SPARS):
+    """
+    Group the cases of a case tree (<spar type>/<load type>/<magnitude label>)
+    by load type and magnitude, so each group can be drawn in one set of
+    figures.
+
+    Returns
+    -------
+    groups : <list of dictionaries>
+        {'name': '<load type>/<magnitude label>', 'cases': {spar type: case
+        directory}}, for every load type and magnitude with a FIGURES directory.
+    """
+
+    found = {}
+    for spar in spars:
+        for figures_dir in sorted(glob.glob(os.path.join(root, spar, '*', '*', 'FIGURES'))):
+            case_dir = os.path.dirname(figures_dir)
+            (load_dir, label) = os.path.split(case_dir)
+            name = os.path.basename(load_dir) + '/' + label
+            found.setdefault(name, {})[spar] = case_dir
+    return [{'name': name, 'cases': found[name]} for name in sorted(found)]
+
+
+def surveyFiles(spar, case_dir, quantity):
+    """
+    Return the survey files one spar type contributes to a figure.
+    """
+
+    figures_dir = os.path.join(case_dir, 'FIGURES')
+    if spar == 'monoplane_spar':
+        return [os.path.join(figures_dir, 'svy_%s_spar.mdt' % quantity)]
+    return [os.path.join(figures_dir, 'svy_%s_%s.mdt' % (quantity, s)) for s in mdt.BIPLANE_SEGMENTS]
+
+
+def spanwiseLines(spar, case_dir, panel):
+    """
+    Read the survey results of one spar type and arrange them as lines vs. span
+    (x1-coordinate).
+
+    Returns
+    -------
+    lines : <list of np.arrays>
+        One array of shape (npoints, 2) with x1 and the plotted value, for the
+        monoplane spar; two (upper and lower elements) for a biplane spar.
+    """
+
+    j = panel['column']
+    if spar == 'monoplane_spar':
+        data = mdt.readSurvey(surveyFiles(spar, case_dir, panel['quantity'])[0])
+        x1 = data[:,0]*MONOPLANE_SPAN
+        y = data[:,j]
+        if panel['stations']:
+            # results at the spar stations, instead of at the Gauss points
+            (x1, y) = (rs.X1_STATIONS, rs.interpolate(x1, y, rs.X1_STATIONS))
+        return [np.column_stack([x1, y])]
+
+    figures_dir = os.path.join(case_dir, 'FIGURES')
+    (CD, DE, EF, GH, HE) = mdt.readSegments(figures_dir, 'svy_' + panel['quantity'])
+    P = BIPLANE_POINTS
+
+    def span(data, start, end):
+        return np.column_stack([data[:,0]*(P[end] - P[start]) + P[start], data[:,j]])
+
+    # the upper inboard biplane element + outboard monoplane, and the lower one
+    upper = np.vstack([span(CD, 'C', 'D')[:-1], span(DE, 'D', 'E')[:-1], span(EF, 'E', 'F')])
+    lower = np.vstack([span(GH, 'G', 'H')[:-1], span(HE, 'H', 'E')[:-1], span(EF, 'E', 'F')])
+    return [upper, lower]
+
+
+def figureKey(job):
+    """
+    Return the cache key of a figure: a SHA-1 hash of the renderer version, the
+    style and panel, and the contents of every input survey.
+    """
+
+    h = hashlib.sha1()
+    spec = {'version': RENDERER_VERSION, 'style': job['style'], 'panel': job['panel'],
+            'formats': job['formats'], 'spars': sorted(job['cases']), 'lines': SPAR_LINES,
+            'points': BIPLANE_POINTS}
+    h.update(json.dumps(spec, sort_keys=True).encode('utf-8'))
+    for spar in sorted(job['cases']):
+        for path in surveyFiles(spar, job['cases'][spar], job['panel']['quantity']):
+            h.update(spar.encode('utf-8') + b'\0' + os.path.basename(path).encode('utf-8') + b'\0')
+            with open(path, 'rb') as f:
+                h.update(hashlib.sha1(f.read()).digest())
+    return h.hexdigest()
+
+
+def renderFigure(job):
+    """
+    Draw one figure and save it in every format of its family. This runs in a
+    worker process.
+
+    Returns
+    -------
+    paths : <list of strings>
+        The files written.
+    """
+
+    # imported here, so worker processes never load pyplot or an interactive
+    # backend
+    import matplotlib
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    style = job['style']
+    panel = job['panel']
+    with matplotlib.rc_context({'font.size': style['font_size']}):
+        fig = Figure(figsize=(style['fw']*style['scalefactor'], style['fh']*style['scalefactor']))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot(1, 1, 1)
+        for spar in SPARS:
+            if spar not in job['cases']:
+                continue
+            lines = spanwiseLines(spar, job['cases'][spar], panel)
+            look = SPAR_LINES[spar]
+            skip = 1 if (spar == 'monoplane_spar' and panel['stations']) else panel['skip']
+            for (k, line) in enumerate(lines):
+                ax.plot(line[::skip,0], line[::skip,1]*panel['scale'], look['fmt'][k], markerfacecolor='None',
+                        markersize=style['gms'], linewidth=style['glw'], markeredgewidth=style['gmew'],
+                        markeredgecolor=look['color'], label=look['label'][k], zorder=2 + k)
+        ax.plot([0, 100], [0, 0], 'k:', linewidth=2.0, label='zeroline', zorder=1)  # zero-line of y-axis
+        ax.set_xlabel('span [m]')
+        ax.set_ylabel(panel['ylabel'])
+        fig.subplots_adjust(**panel['adjust'])
+        paths = []
+        for fmt in job['formats']:
+            path = os.path.join(job['out_dir'], '%s.%s' % (panel['name'], fmt))
+            fig.savefig(path)
+            paths.append(path)
+    return paths
+
+
+def figureJobs(groups, out_dir, families=None):
+    """
+    List the figures to draw: every panel of every family, for every group.
+    """
+
+    jobs = []
+    for group in groups:
+        group_dir = os.path.join(out_dir, group['name'].replace('/', '_'))
+        for family in sorted(families or FAMILIES):
+            spec = FAMILIES[family]
+            for panel in spec['panels']:
+                jobs.append({'family': family, 'group': group['name'], 'cases': dict(group['cases']),
+                             'panel': copy.deepcopy(panel), 'style': dict(spec['style']),
+                             'formats': list(spec['formats']), 'out_dir': group_dir,
+                             'name': '%s/%s' % (group['name'], panel['name'])})
+    return jobs
+
+
+def renderFigures(groups, out_dir='figures', families=None, workers=None, force=False):
+    """
+    Draw the figure families for many groups of cases, skipping figures whose
+    inputs and style have not changed since they were last drawn.
+
+    Parameters
+    ----------
+    groups : <list of dictionaries>
+        Groups of cases, laid out as by caseGroups.
+    out_dir : <string>
+        The directory the figures are saved in, one subdirectory per group.
+    families : <list of strings>
+        Keys of FAMILIES (default: all of them).
+    workers : <int>
+        The number of worker processes (default: the number of CPUs).
+    force : <bool>
+        If True, draw every figure, even if it is up to date.
+
+    Returns
+    -------
+    done : <list of tuples>
+        (figure name, 'rendered', 'cached' or 'missing') for each figure;
+        'missing' figures lack some of their input surveys.
+    """
+
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+    cache_path = os.path.join(out_dir, CACHE_FILENAME)
+    cache = {}
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r') as f:
+            cache = json.load(f)
+
+    stale = []
+    done = []
+    for job in figureJobs(groups, out_dir, families):
+        try:
+            job['key'] = figureKey(job)
+        except (IOError, OSError):
+            # a case that has not been run (or not finished) yet
+            done.append((job['name'], 'missing'))
+            continue
+        outputs = [os.path.join(job['out_dir'], '%s.%s' % (job['panel']['name'], fmt)) for fmt in job['formats']]
+        if not force and cache.get(job['name']) == job['key'] and all(os.path.exists(p) for p in outputs):
+            done.append((job['name'], 'cached'))
+        else:
+            if not os.path.isdir(job['out_dir']):
+                os.makedirs(job['out_dir'])
+            stale.append(job)
+
+    if len(stale) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(stale))) as pool:
+            list(pool.map(renderFigure, stale))
+    else:
+        for job in stale:
+            renderFigure(job)
+
+    for job in stale:
+        cache[job['name']] = job['key']
+        done.append((job['name'], 'rendered'))
+    tmp = cache_path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+    os.replace(tmp, cache_path)
+    return done
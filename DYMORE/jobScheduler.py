@@ -0,0 +1,299 @@
+"""
+Functions in the jobScheduler module run an external solver (Dymore.exe, or a
+stand-in like stubSolver.py) in many case directories at once.
+
+Each case runs the solver command in its own directory, with at most a fixed
+number of cases running at a time. Every start and finish is appended to a
+journal file, so a sweep that is interrupted can be started again and picks up
+where it stopped. The journal decides which cases are skipped: a case whose last
+record is 'done', with the same input signature and with its FIGURES/*.mdt
+outputs still there, is skipped; a case whose last record is 'failed' or
+'running' (interrupted), or whose inputs changed, runs again. Only a case the
+journal has no record of is skipped by the modification times alone, if its
+outputs are newer than all of its input files.
+
+Example
+-------
+>>> from DYMORE import jobScheduler as js
+>>> import glob
+>>> cases = sorted(glob.glob('*_spar/*_tipload/*'))
+>>> results = js.runCases(cases, workers=4, journal='sweep_journal.jsonl')
+
+On Linux, use the stub solver instead of Dymore.exe:
+
+>>> results = js.runCases(cases, command=js.STUB_COMMAND, workers=4)
+"""
+
+from __future__ import print_function
+import fnmatch
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+DYMORE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# the solver command run in each case directory; '{deck}' is replaced with the
+# name of the case's *.dym file and '{case_dir}' with the case directory
+DEFAULT_COMMAND = [os.path.join(DYMORE_DIR, 'Dymore.exe'), '{deck}']
+STUB_COMMAND = [sys.executable, os.path.join(DYMORE_DIR, 'stubSolver.py'), '{deck}']
+
+OUTPUT_DIR = 'FIGURES'
+OUTPUT_PATTERN = '*.mdt'
+
+# solver scratch files (the ones clean.bat erases), which are not inputs
+SCRATCH_PATTERNS = ['*.ats', '*.grf', '*.html', '*.out', '*.plt', '*.ps', '*.rcv', '*.eig', '*~',
+                    'PlotSensors.m', 'PlotObjects.m', 'solver.log']
+FIGURES_PATTERNS = ['*.mdt', '*.mdt.npy', '*.png', '*.eps', '*.ps']
+
+
+def findDeck(case_dir):
+    """
+    Return the name of the DYMORE input deck (*.dym) in a case directory.
+    """
+
+    decks = sorted(glob.glob(os.path.join(case_dir, '*.dym')))
+    if len(decks) != 1:
+        raise ValueError("expected one *.dym file in %s, found %d" % (case_dir, len(decks)))
+    return os.path.basename(decks[0])
+
+
+def inputFiles(case_dir):
+    """
+    Return the paths of the input files in a case directory (everything except
+    the FIGURES directory and solver scratch files).
+    """
+
+    paths = []
+    for name in sorted(os.listdir(case_dir)):
+        path = os.path.join(case_dir, name)
+        if name == OUTPUT_DIR or not os.path.isfile(path) or any(fnmatch.fnmatch(name, p) for p in SCRATCH_PATTERNS):
+            continue
+        paths.append(path)
+    return paths
+
+
+def cleanCase(case_dir):
+    """
+    Erase the solver outputs in a case directory and make sure the FIGURES
+    subdirectory exists (the same as clean.bat).
+    """
+
+    figures = os.path.join(case_dir, OUTPUT_DIR)
+    for pattern in SCRATCH_PATTERNS:
+        for path in glob.glob(os.path.join(case_dir, pattern)):
+            os.remove(path)
+    for pattern in FIGURES_PATTERNS:
+        for path in glob.glob(os.path.join(figures, pattern)):
+            os.remove(path)
+    if not os.path.isdir(figures):
+        os.makedirs(figures)
+
+
+def inputSignature(case_dir):
+    """
+    Return a hash of the names, sizes and modification times of a case's
+    input files. It changes whenever an input file is edited, added or removed.
+    """
+
+    h = hashlib.sha1()
+    for path in inputFiles(case_dir):
+        st = os.stat(path)
+        h.update(('%s %d %r\n' % (os.path.basename(path), st.st_size, st.st_mtime)).encode('utf-8'))
+    return h.hexdigest()
+
+
+def isUpToDate(case_dir):
+    """
+    Return True if a case has solver outputs (FIGURES/*.mdt) that are all newer
+    than every one of its input files.
+    """
+
+    outputs = glob.glob(os.path.join(case_dir, OUTPUT_DIR, OUTPUT_PATTERN))
+    if not outputs:
+        return False
+    inputs = inputFiles(case_dir)
+    newest_input = max(os.path.getmtime(p) for p in inputs) if inputs else 0.0
+    return min(os.path.getmtime(p) for p in outputs) >= newest_input
+
+
+def readJournal(journal):
+    """
+    Read a journal file and return the last record for each case.
+
+    Returns
+    -------
+    records : <dictionary>
+        case directory (absolute path) -> the last record written for it.
+        A case that was interrupted has the status 'running'.
+    """
+
+    records = {}
+    if journal is None or not os.path.exists(journal):
+        return records
+    with open(journal, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a line cut short when the sweep was interrupted
+            records[record['case']] = record
+    return records
+
+
+class Journal(object):
+    """
+    An append-only journal of case starts and finishes, safe to write from
+    several threads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        if self.path is None:
+            return
+        record = dict(record, time=time.time())
+        line = json.dumps(record, sort_keys=True) + '\n'
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def runCase(case_dir, command=DEFAULT_COMMAND, timeout=None):
+    """
+    Clean one case directory, then run the solver in it. The solver output is
+    saved to solver.log in the case directory.
+
+    Parameters
+    ----------
+    case_dir : <string>
+        The case directory.
+    command : <list of strings>
+        The solver command. '{deck}' and '{case_dir}' are replaced in each
+        argument.
+    timeout : <float>
+        (optional) The number of seconds to wait before the solver is killed.
+
+    Returns
+    -------
+    returncode : <int>
+        The solver's return code (-1 if it timed out or could not be started).
+    seconds : <float>
+        The wall-clock time the solver took.
+
+    Raises ValueError if the case directory does not have exactly one *.dym
+    file (see findDeck).
+    """
+
+    deck = findDeck(case_dir)   # before anything is erased
+    cleanCase(case_dir)
+    args = [a.format(deck=deck, case_dir=case_dir) for a in command]
+    t0 = time.time()
+    with open(os.path.join(case_dir, 'solver.log'), 'w') as log:
+        try:
+            returncode = subprocess.call(args, cwd=case_dir, stdout=log, stderr=subprocess.STDOUT, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            log.write("\n***ERROR*** solver timed out after %g s\n" % timeout)
+            returncode = -1
+        except OSError as e:
+            log.write("\n***ERROR*** could not start the solver: %s\n" % e)
+            returncode = -1
+    return (returncode, time.time() - t0)
+
+
+def runCases(case_dirs, command=DEFAULT_COMMAND, workers=4, journal='sweep_journal.jsonl',
+             force=False, timeout=None, verbose=True):
+    """
+    Run the solver in many case directories, a few at a time.
+
+    Parameters
+    ----------
+    case_dirs : <list of strings>
+        The case directories to run.
+    command : <list of strings>
+        The solver command (see runCase).
+    workers : <int>
+        The maximum number of solver processes running at once.
+    journal : <string>
+        The journal file, or None for no journal. Records are appended to it,
+        so it keeps the history of earlier sweeps.
+    force : <logical>
+        Set to True to run every case, even if its outputs are up to date.
+        Otherwise a case is skipped if its last journal record is 'done' with
+        the same input signature, or, if the journal has no record of it, if
+        its outputs are newer than its inputs (see isUpToDate).
+    timeout : <float>
+        (optional) The number of seconds each solver run may take.
+    verbose : <logical>
+        Set to True to print one line for each case as it finishes.
+
+    Returns
+    -------
+    results : <list of dictionaries>
+        One record for each case, in the same order as case_dirs, with the keys
+        'case', 'status' ('done', 'failed' or 'skipped'), 'returncode',
+        'seconds' and 'inputs' (the input signature), and 'error' (the
+        message) for a case that could not be run at all, e.g. one without
+        exactly one *.dym file.
+    """
+
+    log = Journal(journal)
+    previous = readJournal(journal)
+    results = [None] * len(case_dirs)
+    pending = []
+    for (n, case_dir) in enumerate(case_dirs):
+        key = os.path.abspath(case_dir)
+        signature = inputSignature(case_dir)
+        last = previous.get(key)
+        if force:
+            skip = False
+        elif last is not None:
+            # the journal wins over the modification times: a failed or
+            # interrupted case, or one whose inputs changed, runs again
+            skip = (last['status'] == 'done' and last.get('inputs') == signature and
+                    bool(glob.glob(os.path.join(case_dir, OUTPUT_DIR, OUTPUT_PATTERN))))
+        else:
+            skip = isUpToDate(case_dir)
+        if skip:
+            results[n] = {'case': key, 'status': 'skipped', 'returncode': None,
+                          'seconds': 0.0, 'inputs': signature}
+            if verbose:
+                print("skipped  " + case_dir + " (outputs are up to date)")
+        else:
+            pending.append((n, case_dir, key, signature))
+
+    def job(item):
+        (n, case_dir, key, signature) = item
+        log.write({'case': key, 'status': 'running', 'inputs': signature})
+        error = None
+        try:
+            (returncode, seconds) = runCase(case_dir, command, timeout)
+        except (ValueError, EnvironmentError) as e:
+            # e.g. no deck, or the case directory could not be cleaned: this
+            # case fails, the others still run
+            (returncode, seconds, error) = (-1, 0.0, str(e))
+        record = {'case': key, 'status': 'done' if returncode == 0 else 'failed',
+                  'returncode': returncode, 'seconds': seconds, 'inputs': signature}
+        if error is not None:
+            record['error'] = error
+        log.write(record)
+        if verbose:
+            print("%-8s %s (%.1f s)%s" % (record['status'], case_dir, seconds,
+                                         '' if error is None else ': ' + error))
+        return (n, record)
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for (n, record) in pool.map(job, pending):
+                results[n] = record
+    return results
@@ -1,18 +1,112 @@
-import DYMOREutilities as du
+"""
+Write the DYMORE-formatted mass and stiffness matrices of one spar station
+(from its VABS output file and the station's entry in the truegrid layup file)
+to a file of their own.
+
+Paths are relative to the spardesign directory, so this can be run from
+anywhere (it no longer changes the working directory to find the truegrid
+package). The truegrid package is not installed with the DYMORE package: its
+layup reader is loaded from the truegrid directory of the spardesign directory,
+which must be given (spardesign mkblock --spardesign-dir DIR) unless it is the
+current directory or the one this module sits in.
+
+Usage: from the spardesign directory, type:
+> python -m DYMORE.makeSingleMKblock
+or, with other inputs:
+> spardesign mkblock --station 16 --spardesign-dir . VABS/cs_database/biplane_full-hSW_curved/spar_station_16__k2_0020.dat.K ...
+"""
+
+import importlib.util
 import os
-os.chdir('..')
-import truegrid.read_layup as rl
-os.chdir('DYMORE')
+
+from . import DYMOREutilities as du
+
+
+SPARDESIGN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYUP_READER = os.path.join('truegrid', 'read_layup.py')
 
 # parameters #####################################################################
 spar_station = 16
-dymoreMKfile = du.makeFile('spar_station_16__k2_0020_MK.dat')
-vabsMK = '../VABS/cs_database/biplane_full-hSW_curved/spar_station_16__k2_0020.dat.K'
+dymoreMKfile = 'DYMORE/spar_station_16__k2_0020_MK.dat'
+vabsMK = 'VABS/cs_database/biplane_full-hSW_curved/spar_station_16__k2_0020.dat.K'
+layupFile = 'truegrid/biplane_cross-sections_layup_20120517_full-hSW.txt'
 ##################################################################################
 
 
-# write the mass and stiffness matrices as a DYMORE-formatted file
-layup_data = rl.readLayupFile('../truegrid/biplane_cross-sections_layup_20120517_full-hSW.txt')
-stationData = rl.extractStationData(layup_data,spar_station)
-du.writeMKmatrices(dymoreMKfile, vabsMK, stationData, CoordType='ETA_COORDINATE', debug_flag=True)
-dymoreMKfile.close()
\ No newline at end of file
+def readLayupModule(spardesign_dir=None):
+    """
+    Load the truegrid layup reader (truegrid/read_layup.py) from a spardesign
+    directory, without changing sys.path.
+
+    Parameters
+    ----------
+    spardesign_dir : <string>
+        (optional) The spardesign directory. Defaults to the current directory,
+        or else the directory the DYMORE package sits in.
+
+    Returns
+    -------
+    read_layup : <module>
+    """
+
+    if spardesign_dir is None:
+        found = [d for d in (os.getcwd(), SPARDESIGN_DIR) if os.path.isfile(os.path.join(d, LAYUP_READER))]
+        spardesign_dir = found[0] if found else os.getcwd()
+    path = os.path.join(spardesign_dir, LAYUP_READER)
+    if not os.path.isfile(path):
+        raise IOError("the truegrid layup reader %s was not found; give the spardesign directory, "
+                      "which has the truegrid package (spardesign mkblock --spardesign-dir DIR)" % path)
+    spec = importlib.util.spec_from_file_location('truegrid.read_layup', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def makeSingleMKblock(spar_station, vabsMK, layupFile, dymoreMKfile, CoordType='ETA_COORDINATE', debug_flag=False,
+                      spardesign_dir=None):
+    """
+    Write the mass and stiffness matrices of one spar station as a
+    DYMORE-formatted file.
+
+    Parameters
+    ----------
+    spar_station : <int>
+        The spar station number.
+    vabsMK : <string>
+        The path to the VABS output file (*.dat.K) of the station.
+    layupFile : <string>
+        The path to the truegrid layup file, which has the spanwise
+        coordinates of the station.
+    dymoreMKfile : <string>
+        The path to the file to write.
+    CoordType : <string>
+        See DYMOREutilities.writeMKmatrices.
+    debug_flag : <logical>
+        Set to True to print out extra debugging information to the screen.
+    spardesign_dir : <string>
+        (optional) The spardesign directory, with the truegrid package (see
+        readLayupModule).
+
+    Returns
+    -------
+    <none>
+    """
+
+    rl = readLayupModule(spardesign_dir)
+    layup_data = rl.readLayupFile(layupFile)
+    stationData = rl.extractStationData(layup_data, spar_station)
+    f = du.makeFile(dymoreMKfile)
+    try:
+        du.writeMKmatrices(f, vabsMK, stationData, CoordType=CoordType, debug_flag=debug_flag)
+    finally:
+        f.close()
+
+
+def main():
+    path = lambda p: os.path.join(SPARDESIGN_DIR, p)
+    makeSingleMKblock(spar_station, path(vabsMK), path(layupFile), path(dymoreMKfile), debug_flag=True,
+                      spardesign_dir=SPARDESIGN_DIR)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""
+Functions in the mdtReader module read DYMORE survey files (FIGURES/*.mdt).
+
+Each .mdt file is parsed from text only once. The parsed array is saved next to
+it as a binary .npy sidecar (svy_disp_CD.mdt -> svy_disp_CD.mdt.npy), which is
+used until the .mdt file is modified again. Later reads memory-map the sidecar,
+so they never touch the text parser, and columns are handed out as views of the
+mapped file without copying.
+
+Arrays are mapped copy-on-write: a caller may change them in place (e.g. scale
+the eta column to x1-coordinates) without changing the sidecar or what other
+callers see.
+
+Example
+-------
+>>> from DYMORE import mdtReader as mdt
+>>> AB = mdt.readSurvey('monoplane_spar/flapwise_tipload/1e03/FIGURES/svy_disp_spar.mdt')
+>>> (CD, DE, EF, GH, HE) = mdt.readSegments('full-height_biplane_spar/flapwise_tipload/1e03/FIGURES', 'svy_disp')
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+SIDECAR_SUFFIX = '.npy'
+
+# the five beams of the biplane spar, in the order the plot scripts use them
+BIPLANE_SEGMENTS = ('CD', 'DE', 'EF', 'GH', 'HE')
+
+
+def sidecarPath(mdtpath):
+    """
+    Return the path of the binary sidecar of a .mdt file.
+    """
+
+    return mdtpath + SIDECAR_SUFFIX
+
+
+def parseSurvey(mdtpath):
+    """
+    Parse a .mdt file from text, without using the sidecar. (np.loadtxt has a
+    C parser since NumPy 1.23; it is faster than np.fromstring or splitting
+    the text in Python.)
+
+    Returns
+    -------
+    data : <np.array>
+        Shape (nrows, ncols).
+    """
+
+    return np.loadtxt(mdtpath, dtype=float, ndmin=2)
+
+
+def isFresh(mdtpath):
+    """
+    Return True if the sidecar of a .mdt file exists and is not older than it.
+    """
+
+    try:
+        return os.stat(sidecarPath(mdtpath)).st_mtime_ns >= os.stat(mdtpath).st_mtime_ns
+    except OSError:
+        return False
+
+
+def readSurvey(mdtpath):
+    """
+    Read a .mdt file, from its sidecar if the sidecar is up to date.
+
+    Parameters
+    ----------
+    mdtpath : <string>
+        The path of the .mdt file.
+
+    Returns
+    -------
+    data : <np.array>
+        Shape (nrows, ncols), memory-mapped copy-on-write from the sidecar.
+        (If the sidecar cannot be written, e.g. in a read-only directory, the
+        parsed array is returned instead.)
+    """
+
+    sidecar = sidecarPath(mdtpath)
+    if not isFresh(mdtpath):
+        data = parseSurvey(mdtpath)
+        tmp = sidecar + '.tmp%d' % os.getpid()
+        try:
+            with open(tmp, 'wb') as f:
+                np.save(f, data)
+            os.replace(tmp, sidecar)
+        except (IOError, OSError):
+            return data
+    return np.load(sidecar, mmap_mode='c')
+
+
+def readColumns(mdtpath, columns):
+    """
+    Return some columns of a .mdt file, as views of the memory-mapped sidecar.
+
+    Parameters
+    ----------
+    mdtpath : <string>
+        The path of the .mdt file.
+    columns : <list of ints>
+        The column numbers, e.g. [0, 3] for eta and u3.
+
+    Returns
+    -------
+    views : <list of np.arrays>
+        One 1-D array of shape (nrows,) for each column.
+    """
+
+    data = readSurvey(mdtpath)
+    return [data[:,j] for j in columns]
+
+
+def readSurveys(mdtpaths, max_workers=None):
+    """
+    Read many .mdt files at once. Files that have to be parsed are parsed in
+    parallel threads; files with up-to-date sidecars are only memory-mapped.
+
+    Returns
+    -------
+    data : <list of np.arrays>
+        One array for each path, in the same order.
+    """
+
+    mdtpaths = list(mdtpaths)
+    stale = [p for p in mdtpaths if not isFresh(p)]
+    if max_workers is None:
+        max_workers = len(stale)
+    if max_workers > 1 and len(stale) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            parsed = dict(zip(stale, pool.map(readSurvey, stale)))
+        return [parsed[p] if p in parsed else readSurvey(p) for p in mdtpaths]
+    return [readSurvey(p) for p in mdtpaths]
+
+
+def readSegments(figures_dir, prefix, segments=BIPLANE_SEGMENTS):
+    """
+    Read one survey of every biplane segment at once, e.g.
+    readSegments('FIGURES', 'svy_force') reads svy_force_CD.mdt ...
+    svy_force_HE.mdt.
+
+    Returns
+    -------
+    data : <tuple of np.arrays>
+        One array for each segment, in the order of segments.
+    """
+
+    return tuple(readSurveys([os.path.join(figures_dir, '%s_%s.mdt' % (prefix, s)) for s in segments]))
+
+
+def clearSidecars(figures_dir):
+    """
+    Delete the sidecars in a directory, e.g. before archiving a FIGURES
+    directory. Returns the number of files deleted.
+    """
+
+    count = 0
+    for name in os.listdir(figures_dir):
+        if name.endswith('.mdt' + SIDECAR_SUFFIX):
+            os.remove(os.path.join(figures_dir, name))
+            count += 1
+    return count
@@ -0,0 +1,309 @@
+"""
+Functions in the modalAnalysis module find the natural frequencies and mode
+shapes of the beams in a DYMORE deck (the monoplane spar, or the biplane spar
+with its joined beams), without Dymore.exe.
+
+The beams are meshed and the sparse stiffness matrix is assembled as for the
+static problem (see beamAssembly). The consistent mass matrix is assembled on
+the same mesh from the @MASS_PER_UNIT_SPAN, @MOMENTS_OF_INERTIA and
+@CENTRE_OF_MASS_LOCATION of each cross-section. The lowest modes of
+
+    K x = omega^2 M x
+
+are found with a sparse shift-invert Lanczos eigensolver (ARPACK, through
+scipy.sparse.linalg.eigsh): K - shift*M is factored once, with the same
+sparse direct solver as the static problem, and each Lanczos step is one
+forward and back substitution, so the time grows close to linearly with the
+number of elements. The number of modes and the shift are read from the deck
+(@NUMBER_OF_EIGENVALUES and @EIGEN_SPECTRUM_SHIFT, in rad^2/s^2).
+
+The mode shapes are normalized to unit modal mass, with the largest
+component of each made positive, and written in the same layout as the DYMORE
+surveys (see beamSolver), one directory per mode, next to the static
+surveys:
+    FIGURES/MODES/mode01/svy_disp_CD.mdt ... svy_force_HE.mdt
+    FIGURES/MODES/frequencies.dat  (mode, omega^2 [rad^2/s^2], frequency [Hz])
+so the plot scripts and mdtReader.readSegments read each mode unchanged.
+
+The time grows with the number of degrees of freedom, not of elements, and
+is under a second only up to about 200,000 of them. For 10 modes of the
+biplane spar (see benchmarks/bench_modal_analysis.py), the eigensolve takes
+about 0.6 s for 30,000 linear elements (180,000 degrees of freedom) and
+0.7 s for 10,000 cubic elements (180,000). It takes about 2.5 s for 30,000
+cubic elements (540,000), which is not sub-second. Cubic meshes that fine
+are not needed: the frequencies stop changing (to 1e-7) at about 3,000 cubic
+elements.
+
+Example
+-------
+>>> from DYMORE import modalAnalysis as ma
+>>> import glob
+>>> cases = sorted(glob.glob('full-height_biplane_spar/flapwise_tipload/*'))
+>>> written = ma.analyzeCases(cases)   # one eigensolution for all 4 cases
+>>> ma.readFrequencies(cases[0])
+"""
+
+import glob
+import hashlib
+import os
+import shutil
+
+import numpy as np
+import scipy.sparse.linalg as spla
+from scipy.sparse.linalg import splu
+
+from . import DYMOREdeck as dd
+from . import beamAssembly as ba
+from . import beamSolver as bs
+
+
+# the defaults, if the deck does not say
+NUMBER_OF_MODES = 10
+SPECTRUM_SHIFT = 0.0
+
+# entries of the mass matrix smaller than this, relative to the largest, are
+# round-off (e.g. from centre of mass locations of 1e-17) and are dropped;
+# for straight beams that is about half of them, and half the time of the
+# mass products in each Lanczos step
+DROP_TOLERANCE = 1.0e-14
+
+MODES_DIRNAME = 'MODES'
+FREQUENCIES_FILENAME = 'frequencies.dat'
+
+
+class SparseModalSolver(object):
+    """
+    The sparse stiffness and mass matrices of a beam graph, for finding its
+    lowest natural frequencies and mode shapes.
+
+    Parameters
+    ----------
+    graph : <BeamGraph>
+        The beams, with mass properties (see beamAssembly.readBeamGraph).
+    fixed : <np.array of bool>
+        (optional) Which degrees of freedom are held at zero, shape (ndof,) or
+        (nnodes, 6). Defaults to graph.fixed.
+    K, M : <scipy.sparse matrix>
+        (optional) The global stiffness and mass matrices, if they are
+        already assembled.
+    """
+
+    def __init__(self, graph, fixed=None, K=None, M=None):
+        self.graph = graph
+        self.fixed = np.asarray(graph.fixed if fixed is None else fixed, dtype=bool).ravel()
+        self.free = np.flatnonzero(~self.fixed)
+        K = graph.assemble() if K is None else K
+        M = graph.assembleMass() if M is None else M
+        self.Kff = K[self.free,:][:,self.free].tocsc()
+        self.Mff = M[self.free,:][:,self.free].tocsr()
+        if self.Mff.nnz:
+            self.Mff.data[np.abs(self.Mff.data) < DROP_TOLERANCE*np.abs(self.Mff.data).max()] = 0.0
+            self.Mff.eliminate_zeros()
+
+    def solve(self, nmodes=NUMBER_OF_MODES, shift=SPECTRUM_SHIFT, tol=1.0e-10):
+        """
+        Find the modes whose eigenvalues (omega^2) are nearest the shift; with
+        the default shift of 0, the lowest modes.
+
+        Parameters
+        ----------
+        nmodes : <int>
+            The number of modes.
+        shift : <float>
+            The shift [rad^2/s^2]. It must not be an eigenvalue; with no
+            boundary conditions (rigid-body modes), use a small negative one.
+        tol : <float>
+            The relative accuracy of the eigenvalues (0 = machine precision,
+            which takes about 20% more Lanczos steps).
+
+        Returns
+        -------
+        eigenvalues : <np.array>
+            omega^2 [rad^2/s^2] of each mode, shape (nmodes,), in increasing
+            order.
+        U : <np.array>
+            The mode shapes (nodal displacements and rotations), shape
+            (nmodes, nnodes, 6), with unit modal mass.
+        """
+
+        n = len(self.free)
+        if not 0 < nmodes < n:
+            raise ValueError("can find 1 to %d modes, not %d" % (n - 1, nmodes))
+        factor = splu((self.Kff - shift*self.Mff).tocsc(), permc_spec='MMD_AT_PLUS_A')
+        OPinv = spla.LinearOperator((n, n), matvec=factor.solve, dtype=float)
+        (eigenvalues, X) = spla.eigsh(self.Kff, k=nmodes, M=self.Mff, sigma=shift, which='LM',
+                                      OPinv=OPinv, tol=tol)
+        order = np.argsort(eigenvalues)
+        (eigenvalues, X) = (eigenvalues[order], X[:,order])
+        # unit modal mass, and the largest component positive
+        X /= np.sqrt(np.einsum('ij,ij->j', X, self.Mff @ X))
+        X *= np.sign(X[np.abs(X).argmax(axis=0), np.arange(nmodes)])
+        U = np.zeros((nmodes, self.graph.ndof))
+        U[:,self.free] = X.T
+        return (eigenvalues, U.reshape(nmodes, self.graph.nnodes, 6))
+
+    def surveys(self, U, inertial=True):
+        """
+        Arrange the mode shapes of each beam in the DYMORE survey layout (see
+        beamAssembly.graphSurveys); the forces, moments and strains are those
+        of the mode shapes.
+        """
+
+        return ba.graphSurveys(self.graph, U, inertial)
+
+
+def frequencies(eigenvalues):
+    """
+    Return the natural frequencies [Hz] of eigenvalues omega^2 [rad^2/s^2].
+    """
+
+    return np.sqrt(np.maximum(eigenvalues, 0.0))/(2.0*np.pi)
+
+
+def readModalParameters(deck):
+    """
+    Return the number of modes (@NUMBER_OF_EIGENVALUES) and the shift
+    (@EIGEN_SPECTRUM_SHIFT) a deck asks for, or the defaults.
+
+    Returns
+    -------
+    nmodes : <int>
+    shift : <float>
+    """
+
+    nmodes = deck.find('NUMBER_OF_EIGENVALUES')
+    shift = deck.find('EIGEN_SPECTRUM_SHIFT')
+    return (NUMBER_OF_MODES if nmodes is None else int(nmodes.array[0]),
+            SPECTRUM_SHIFT if shift is None else float(shift.array[0]))
+
+
+def modesDirectory(deck):
+    """
+    Return the directory the mode shapes of a deck are written in
+    (FIGURES/MODES, next to the static surveys).
+    """
+
+    figures = deck.find('FIGURES_PATH')
+    figures = './FIGURES/' if figures is None else figures.text.replace('\\', '/')
+    return os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(deck.path)), figures, MODES_DIRNAME))
+
+
+def writeModes(deck, graph, eigenvalues, surveys):
+    """
+    Write the frequencies and mode shapes of one case.
+
+    Parameters
+    ----------
+    deck : <DeckFile>
+        The deck, which names the surveys of each beam.
+    graph : <BeamGraph>
+        The beams.
+    eigenvalues : <np.array>
+        omega^2 of each mode (see SparseModalSolver.solve).
+    surveys : <dictionary>
+        inertial (True or False) -> the mode shapes in the survey layout (see
+        SparseModalSolver.surveys).
+
+    Returns
+    -------
+    written : <list of strings>
+        The paths of the files that were written.
+    """
+
+    modes_dir = modesDirectory(deck)
+    if not os.path.isdir(modes_dir):
+        os.makedirs(modes_dir)
+    # the modes of an earlier run with more of them
+    mode_dirs = set('mode%02d' % (m + 1) for m in range(len(eigenvalues)))
+    for old in glob.glob(os.path.join(modes_dir, 'mode*')):
+        if os.path.basename(old) not in mode_dirs:
+            shutil.rmtree(old)
+    path = os.path.join(modes_dir, FREQUENCIES_FILENAME)
+    table = np.column_stack([np.arange(1, len(eigenvalues) + 1), eigenvalues, frequencies(eigenvalues)])
+    np.savetxt(path, table, fmt=['%5d', bs.SURVEY_FORMAT, bs.SURVEY_FORMAT])
+    written = [path]
+    for (b, beam) in enumerate(graph.beams):
+        for (surveyType, path) in bs.surveyPaths(deck, beam):
+            survey = deck.findDefinition('SURVEY_NAME', os.path.basename(path)[:-4])
+            frame = survey.find('FRAME_NAME')
+            inertial = frame is None or frame.text == 'INERTIAL'
+            for m in range(len(eigenvalues)):
+                mode_path = os.path.join(modes_dir, 'mode%02d' % (m + 1), os.path.basename(path))
+                bs.writeSurvey(mode_path, surveys[inertial][b][surveyType][m])
+                written.append(mode_path)
+    return written
+
+
+def readFrequencies(case_dir):
+    """
+    Read the natural frequencies written for a case.
+
+    Returns
+    -------
+    eigenvalues, freqs : <np.array>
+        omega^2 [rad^2/s^2] and the frequency [Hz] of each mode.
+    """
+
+    decks = glob.glob(os.path.join(case_dir, '*.dym'))
+    if len(decks) != 1:
+        raise ValueError("expected one *.dym file in %s, found %d" % (case_dir, len(decks)))
+    table = np.loadtxt(os.path.join(modesDirectory(dd.readDeck(decks[0])), FREQUENCIES_FILENAME), ndmin=2)
+    return (table[:,1], table[:,2])
+
+
+def modelKey(graph, nmodes, shift):
+    """
+    Return a hash of everything that goes into the modes of a beam graph, so
+    cases that differ only in their loads share one eigensolution.
+    """
+
+    h = hashlib.sha1(ba.modelKey(graph).encode('utf-8'))
+    for beam in graph.beams:
+        h.update(np.ascontiguousarray(beam.prop_M).tobytes())
+    h.update(np.array([nmodes, shift]).tobytes())
+    return h.hexdigest()
+
+
+def analyzeCases(case_dirs, beamNames=None, nmodes=None):
+    """
+    Find the natural frequencies and mode shapes of the beams in many case
+    directories, and write them (see writeModes).
+
+    Cases with the same beams (e.g. the load cases of one spar type) share one
+    eigensolution.
+
+    Parameters
+    ----------
+    case_dirs : <list of strings>
+        The case directories, each with one *.dym deck.
+    beamNames : <list of strings>
+        (optional) The @BEAM_NAMEs to include. Defaults to every beam.
+    nmodes : <int>
+        (optional) The number of modes. Defaults to @NUMBER_OF_EIGENVALUES.
+
+    Returns
+    -------
+    written : <list of strings>
+        The paths of the files that were written.
+    """
+
+    groups = {}
+    for case_dir in case_dirs:
+        decks = glob.glob(os.path.join(case_dir, '*.dym'))
+        if len(decks) != 1:
+            raise ValueError("expected one *.dym file in %s, found %d" % (case_dir, len(decks)))
+        deck = dd.readDeck(decks[0])
+        graph = ba.readBeamGraph(deck, beamNames)
+        (deck_nmodes, shift) = readModalParameters(deck)
+        n = deck_nmodes if nmodes is None else nmodes
+        group = groups.setdefault(modelKey(graph, n, shift), (graph, n, shift, []))
+        group[3].append(deck)
+
+    written = []
+    for (graph, n, shift, decks) in groups.values():
+        solver = SparseModalSolver(graph)
+        (eigenvalues, U) = solver.solve(n, shift)
+        surveys = dict((inertial, solver.surveys(U, inertial)) for inertial in (True, False))
+        for deck in decks:
+            written.extend(writeModes(deck, graph, eigenvalues, surveys))
+    return written
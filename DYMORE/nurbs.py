@@ -0,0 +1,370 @@
+"""
+Functions in the nurbs module evaluate NURBS curves (and their derivatives) with
+NumPy, the way DYMORE defines beam reference lines in @CURVE_DEFINITION blocks.
+
+A curve is given by its control points, weights, degree and knot sequence. If a
+deck has no @KNOT_SEQUENCE, the knots are clamped and uniform (a Bezier curve,
+when there are degree+1 control points).
+
+Every function takes a whole array of parameters at once. findSpan and
+nonzeroBasis are the batched equivalents of findspan.m and basisfun.m /
+basisfunder.m in the nurbs-1.3.6 toolbox (Algorithms A2.1-A2.3 of "The NURBS
+Book"): only the degree+1 basis functions that are not zero at each parameter
+are computed, so the cost does not grow with the number of control points.
+
+x1ToEta and invertCoordinate map x1-coordinates back to curve parameters
+(eta-coordinates): x1ToEta repeats the bisection of x1_to_eta.m exactly, and
+invertCoordinate starts from a lookup table and refines with Newton steps,
+which is much faster for dense meshes.
+
+Example
+-------
+>>> from DYMORE import nurbs
+>>> import numpy as np
+>>> ctrl = np.array([[25.2, 0.0, 4.768], [33.35, 0.0, 4.768], [33.35, 0.0, 0.0], [41.5, 0.0, 0.0]])
+>>> (C, dC) = nurbs.curveDerivatives(ctrl, np.ones(4), 3, nurbs.clampedKnots(4, 3), np.linspace(0, 1, 5))
+"""
+
+import numpy as np
+
+
+def clampedKnots(numCtrl, degree):
+    """
+    Return the clamped, uniform knot sequence for a curve with numCtrl control
+    points, e.g. clampedKnots(4, 3) -> [0, 0, 0, 0, 1, 1, 1, 1].
+    """
+
+    interior = np.linspace(0.0, 1.0, numCtrl - degree + 1)[1:-1]
+    return np.concatenate([np.zeros(degree + 1), interior, np.ones(degree + 1)])
+
+
+def basisFunctions(degree, knots, u, derivatives=0):
+    """
+    Evaluate all the B-spline basis functions of a knot sequence, and their
+    derivatives, at the parameters u (a dense table; see nonzeroBasis for only
+    the nonzero ones).
+
+    Parameters
+    ----------
+    degree : <int>
+        The degree of the basis functions.
+    knots : <np.array>
+        The knot sequence, shape (numCtrl + degree + 1,).
+    u : <np.array>
+        The parameters to evaluate at, shape (M,), between the first and last
+        knots.
+    derivatives : <int>
+        The number of derivatives to return.
+
+    Returns
+    -------
+    N : <np.array>
+        Shape (derivatives+1, M, numCtrl). N[k] holds the k-th derivatives.
+    """
+
+    knots = np.asarray(knots, dtype=float)
+    u = np.atleast_1d(np.asarray(u, dtype=float))
+    m = len(knots) - 1
+    # degree 0: 1 on the knot span holding u; u at the last knot belongs to the
+    # last non-empty span
+    last = np.flatnonzero(knots[:-1] < knots[1:])[-1]
+    span = np.clip(np.searchsorted(knots, u, side='right') - 1, 0, last)
+    span[u >= knots[last+1]] = last
+    table = [np.zeros((len(u), m))]
+    table[0][np.arange(len(u)), span] = 1.0
+
+    def ratio(num, den):
+        return np.divide(num, den, out=np.zeros(np.broadcast(num, den).shape), where=den != 0)
+
+    for p in range(1, degree + 1):
+        prev = table[-1]
+        left = ratio(u[:,None] - knots[None,:m-p], knots[p:m] - knots[:m-p])
+        right = ratio(knots[None,p+1:m+1] - u[:,None], knots[p+1:m+1] - knots[1:m-p+1])
+        table.append(left*prev[:,:-1] + right*prev[:,1:])
+
+    def derivative(k, q):
+        # the k-th derivatives of the degree-q basis functions:
+        # N_{i,q}^(k) = q * (N_{i,q-1}^(k-1) / (t_{i+q} - t_i) - N_{i+1,q-1}^(k-1) / (t_{i+q+1} - t_{i+1}))
+        if k == 0:
+            return table[q]
+        if q == 0:
+            return np.zeros_like(table[0])
+        d = derivative(k-1, q-1)
+        n = m - q
+        return q*(ratio(d[:,:-1], knots[q:q+n] - knots[:n]) - ratio(d[:,1:], knots[q+1:q+1+n] - knots[1:1+n]))
+
+    out = [derivative(k, degree) for k in range(derivatives + 1)]
+    return np.array(out)
+
+
+def findSpan(numCtrl, degree, u, knots):
+    """
+    Find the knot span of each parameter: the index i with
+    knots[i] <= u < knots[i+1] (the last non-empty span for u at the end of the
+    curve).
+
+    Returns
+    -------
+    span : <np.array of ints>
+        Shape (M,).
+    """
+
+    knots = np.asarray(knots, dtype=float)
+    u = np.atleast_1d(np.asarray(u, dtype=float))
+    span = np.searchsorted(knots, u, side='right') - 1
+    return np.clip(span, degree, numCtrl - 1)
+
+
+def nonzeroBasis(span, u, degree, knots, derivatives=0):
+    """
+    Evaluate the degree+1 basis functions that are not zero at each parameter,
+    and their derivatives.
+
+    Parameters
+    ----------
+    span : <np.array of ints>
+        The knot spans, from findSpan.
+    u : <np.array>
+        The parameters, shape (M,).
+    degree : <int>
+        The degree of the basis functions.
+    knots : <np.array>
+        The knot sequence.
+    derivatives : <int>
+        The number of derivatives to return.
+
+    Returns
+    -------
+    N : <np.array>
+        Shape (derivatives+1, M, degree+1). N[k,m,a] is the k-th derivative of
+        basis function span[m]-degree+a at u[m].
+    """
+
+    knots = np.asarray(knots, dtype=float)
+    u = np.atleast_1d(np.asarray(u, dtype=float))
+    M = len(u)
+
+    # Algorithm A2.2, for all the parameters at once; local[q] holds the
+    # nonzero basis functions of degree q (span-q ... span)
+    local = [np.ones((M, 1))]
+    left = np.empty((degree + 1, M))
+    right = np.empty((degree + 1, M))
+    for j in range(1, degree + 1):
+        left[j] = u - knots[span + 1 - j]
+        right[j] = knots[span + j] - u
+        prev = local[-1]
+        N = np.empty((M, j + 1))
+        saved = np.zeros(M)
+        for r in range(j):
+            den = right[r+1] + left[j-r]
+            temp = np.divide(prev[:,r], den, out=np.zeros(M), where=den != 0)
+            N[:,r] = saved + right[r+1]*temp
+            saved = left[j-r]*temp
+        N[:,j] = saved
+        local.append(N)
+
+    def derivative(k, q):
+        # the k-th derivatives of the nonzero degree-q functions, from the
+        # (k-1)-th derivatives of the degree-(q-1) ones
+        if k == 0:
+            return local[q]
+        if q == 0:
+            return np.zeros((M, 1))
+        d = derivative(k - 1, q - 1)
+        zero = np.zeros((M, 1))
+        (dl, dr) = (np.hstack([zero, d]), np.hstack([d, zero]))
+        i = span[:,None] - q + np.arange(q + 1)
+        den_l = knots[i + q] - knots[i]
+        den_r = knots[i + q + 1] - knots[i + 1]
+        return q*(np.divide(dl, den_l, out=np.zeros_like(dl), where=den_l != 0)
+                  - np.divide(dr, den_r, out=np.zeros_like(dr), where=den_r != 0))
+
+    return np.array([derivative(k, degree) for k in range(derivatives + 1)])
+
+
+def curveDerivatives(ctrl, weights, degree, knots, u, derivatives=1):
+    """
+    Evaluate a NURBS curve and its derivatives with respect to the parameter.
+
+    Parameters
+    ----------
+    ctrl : <np.array>
+        The control points, shape (numCtrl, dim).
+    weights : <np.array>
+        The weights, shape (numCtrl,).
+    degree : <int>
+        The degree of the curve.
+    knots : <np.array>
+        The knot sequence.
+    u : <np.array>
+        The parameters to evaluate at, shape (M,).
+    derivatives : <int>
+        The number of derivatives to return (0, 1 or 2).
+
+    Returns
+    -------
+    C : <np.array>
+        Shape (derivatives+1, M, dim). C[0] holds the points on the curve and
+        C[k] the k-th derivatives.
+    """
+
+    if derivatives > 2:
+        raise ValueError("only up to 2 derivatives are supported")
+    ctrl = np.asarray(ctrl, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    knots = np.asarray(knots, dtype=float)
+    u = np.atleast_1d(np.asarray(u, dtype=float))
+    span = findSpan(len(ctrl), degree, u, knots)
+    N = nonzeroBasis(span, u, degree, knots, derivatives)
+    # the control points (and weights) of the nonzero basis functions
+    idx = span[:,None] - degree + np.arange(degree + 1)
+    w = weights[idx]
+    A = np.einsum('kma,ma,mad->kmd', N, w, ctrl[idx])
+    W = np.einsum('kma,ma->km', N, w)[:,:,None]
+    C = [A[0]/W[0]]
+    if derivatives >= 1:
+        C.append((A[1] - W[1]*C[0])/W[0])
+    if derivatives >= 2:
+        C.append((A[2] - 2.0*W[1]*C[1] - W[2]*C[0])/W[0])
+    return np.array(C)
+
+
+def curvature(ctrl, weights, degree, knots, u):
+    """
+    Evaluate the curvature of a NURBS curve, |C' x C''| / |C'|^3 (as in
+    get_curvatures_tangents_normals.m).
+
+    Returns
+    -------
+    k : <np.array>
+        Shape (M,).
+    """
+
+    (C, dC, d2C) = curveDerivatives(ctrl, weights, degree, knots, u, 2)
+    if dC.shape[1] == 2:
+        cross = np.abs(dC[:,0]*d2C[:,1] - dC[:,1]*d2C[:,0])
+    else:
+        cross = np.linalg.norm(np.cross(dC, d2C), axis=1)
+    return cross/np.linalg.norm(dC, axis=1)**3
+
+
+def x1ToEta(ctrl, weights, degree, knots, x1, tol=1.0e-6, axis=0, max_iterations=100):
+    """
+    Find the curve parameters (eta-coordinates) where a curve reaches the given
+    x1-coordinates, by bisection. This is x1_to_eta.m for a whole array of
+    x1-coordinates at once: every x1 goes through the same steps as in the
+    MATLAB function, so the results agree with it to the last bit (use
+    invertCoordinate for a faster inverse, to the same tolerance).
+
+    Parameters
+    ----------
+    ctrl, weights, degree, knots :
+        The curve (see curveDerivatives). Its coordinate along axis must
+        increase with the parameter.
+    x1 : <np.array>
+        The coordinates to find, shape (M,).
+    tol : <float>
+        The tolerance on the coordinate.
+    axis : <int>
+        The coordinate to match (0 for x1).
+
+    Returns
+    -------
+    eta : <np.array>
+        Shape (M,).
+    """
+
+    x1 = np.atleast_1d(np.asarray(x1, dtype=float))
+    eta = np.full(len(x1), 0.5)
+    increment = 0.25
+    active = np.arange(len(x1))
+    for i in range(max_iterations):
+        p = curveDerivatives(ctrl, weights, degree, knots, eta[active], 0)[0][:,axis]
+        miss = np.abs(p - x1[active]) > tol
+        active = active[miss]
+        if len(active) == 0:
+            return eta
+        eta[active] += np.where(p[miss] > x1[active], -increment, increment)
+        increment /= 2.0
+    raise ValueError("x1-coordinates %s are not on the curve" % (x1[active],))
+
+
+def inverseTable(ctrl, weights, degree, knots, samples_per_span=16, axis=0):
+    """
+    Tabulate one coordinate of a curve at evenly spaced parameters in every knot
+    span, for invertCoordinate.
+
+    Returns
+    -------
+    u : <np.array>
+        The parameters.
+    x : <np.array>
+        The coordinate at each parameter, strictly increasing.
+    """
+
+    knots = np.asarray(knots, dtype=float)
+    breaks = np.unique(knots[degree:len(knots) - degree])
+    t = np.linspace(0.0, 1.0, samples_per_span + 1)[:-1]
+    u = np.append((breaks[:-1,None] + t*np.diff(breaks)[:,None]).ravel(), breaks[-1])
+    x = curveDerivatives(ctrl, weights, degree, knots, u, 0)[0][:,axis]
+    if np.any(np.diff(x) <= 0.0):
+        raise ValueError("the curve is not monotone along coordinate %d" % axis)
+    return (u, x)
+
+
+def invertCoordinate(ctrl, weights, degree, knots, x, tol=1.0e-6, axis=0, table=None, max_iterations=50):
+    """
+    Find the curve parameters where a curve reaches the given coordinates, for
+    a whole array of coordinates at once (a faster x1ToEta).
+
+    Each coordinate starts from a linear interpolation in a lookup table of the
+    curve (see inverseTable), which also brackets the answer, and is refined by
+    Newton iterations on the curve. A Newton step that leaves the bracket, or
+    a flat spot on the curve, falls back to a bisection step, so every
+    coordinate converges to within tol.
+
+    Parameters
+    ----------
+    ctrl, weights, degree, knots :
+        The curve (see curveDerivatives). Its coordinate along axis must
+        increase with the parameter.
+    x : <np.array>
+        The coordinates to find, shape (M,).
+    tol : <float>
+        The tolerance on the coordinate (the same as x1ToEta).
+    axis : <int>
+        The coordinate to match (0 for x1).
+    table : <tuple>
+        The lookup table from inverseTable, to reuse it for many calls.
+
+    Returns
+    -------
+    eta : <np.array>
+        Shape (M,).
+    """
+
+    x = np.atleast_1d(np.asarray(x, dtype=float))
+    (ut, xt) = inverseTable(ctrl, weights, degree, knots, axis=axis) if table is None else table
+    outside = (x < xt[0] - tol) | (x > xt[-1] + tol)
+    if np.any(outside):
+        raise ValueError("x1-coordinates %s are not on the curve" % (x[outside],))
+
+    i = np.clip(np.searchsorted(xt, x, side='right') - 1, 0, len(xt) - 2)
+    (lo, hi) = (ut[i], ut[i+1])
+    eta = lo + np.clip((x - xt[i])/(xt[i+1] - xt[i]), 0.0, 1.0)*(hi - lo)
+    active = np.arange(len(x))
+    for k in range(max_iterations):
+        (C, dC) = curveDerivatives(ctrl, weights, degree, knots, eta[active], 1)
+        f = C[:,axis] - x[active]
+        miss = np.abs(f) > tol
+        (active, f, d) = (active[miss], f[miss], dC[miss,axis])
+        if len(active) == 0:
+            return eta
+        u = eta[active]
+        hi[active] = np.where(f > 0.0, u, hi[active])
+        lo[active] = np.where(f > 0.0, lo[active], u)
+        step = np.divide(f, d, out=np.full(len(f), np.inf), where=d > 0.0)
+        newton = u - step
+        inside = (newton > lo[active]) & (newton < hi[active])
+        eta[active] = np.where(inside, newton, 0.5*(lo[active] + hi[active]))
+    raise ValueError("x1-coordinates %s did not converge" % (x[active],))
@@ -0,0 +1,356 @@
+"""
+The profiling module times the stages of the analysis chain (VABS parsing, DYMORE
+property formatting, waiting on the solver, loading survey results, resampling
+and plotting). Each call is recorded as a timing span, with nested calls inside
+it, and some spans also record the bytes read or written. The spans are saved
+as a Chrome trace (open it in chrome://tracing or https://ui.perfetto.dev) and
+summed up per stage in a plain-text summary.
+
+Profiling is off by default, and then it costs nothing: the functions listed in
+INSTRUMENTED are only replaced by timed wrappers while profiling is on
+(enable() swaps them into their modules, and disable() puts the originals
+back), and span() hands back a shared do-nothing span.
+
+Calls made through a module (du.pullMKmatrices(...), which is how the package
+calls its own functions) are timed. Calls made in worker processes (e.g.
+figureRenderer.renderFigures with workers > 1) are not recorded; use one worker
+to see them.
+
+Example
+-------
+>>> import sys
+>>> from DYMORE import figureRenderer as fr
+>>> from DYMORE import profiling
+>>> with profiling.profile('trace.json', summary=sys.stdout):
+...     fr.renderFigures(fr.caseGroups('sweep'), 'sweep_figures', workers=1)
+
+or, from the command line:
+> spardesign --profile trace.json plot sweep --workers 1
+
+Spans can also be added around any block of code:
+>>> with profiling.span('load the design table', 'user'):
+...     table = readTable()
+"""
+
+from __future__ import print_function
+import contextlib
+import functools
+import importlib
+import json
+import os
+import threading
+import time
+
+
+# the instrumented functions: (module, function or Class.method, stage, bytes),
+# where bytes says what a call reads or writes:
+#   ('read', n)     argument n is the path of a file that is read
+#   ('write', n)    argument n is a file object that is written to
+#   ('write', 'result')  the call returns the paths of the files it wrote
+INSTRUMENTED = [
+    ('DYMORE.DYMOREutilities', 'readFile', 'vabs', ('read', 0)),
+    ('DYMORE.DYMOREutilities', 'pullMKmatrices', 'vabs', None),
+    ('DYMORE.DYMOREutilities', 'parseMKfile', 'vabs', ('read', 0)),
+    ('DYMORE.DYMOREutilities', 'parseMKlines', 'vabs', None),
+    ('DYMORE.DYMOREutilities', 'readMKfiles', 'vabs', None),
+    ('DYMORE.DYMOREutilities', 'writeDymoreMK', 'format', ('write', 0)),
+    ('DYMORE.DYMOREutilities', 'formatDymoreMK', 'format', None),
+    ('DYMORE.DYMOREutilities', 'writeBeamPropertyDefinition', 'format', ('write', 0)),
+    ('DYMORE.DYMOREutilities', 'writeMKmatrices', 'format', None),
+    ('DYMORE.jobScheduler', 'runCase', 'solver', None),
+    ('DYMORE.jobScheduler', 'runCases', 'solver', None),
+    ('DYMORE.modalAnalysis', 'SparseModalSolver.solve', 'solver', None),
+    ('DYMORE.mdtReader', 'parseSurvey', 'load', ('read', 0)),
+    ('DYMORE.mdtReader', 'readSurvey', 'load', None),
+    ('DYMORE.mdtReader', 'readSurveys', 'load', None),
+    ('DYMORE.mdtReader', 'readSegments', 'load', None),
+    ('DYMORE.resultsDatabase', 'ResultsDatabase.ingest', 'load', None),
+    ('DYMORE.regressionCheck', 'compare', 'check', None),
+    ('DYMORE.timeHistory', 'envelopes', 'load', ('read', 0)),
+    ('DYMORE.resample', 'interpolate', 'resample', None),
+    ('DYMORE.resample', 'resampleSurvey', 'resample', None),
+    ('DYMORE.figureRenderer', 'spanwiseLines', 'plot', None),
+    ('DYMORE.figureRenderer', 'renderFigure', 'plot', ('write', 'result')),
+    ('DYMORE.figureRenderer', 'renderFigures', 'plot', None),
+    ]
+
+_active = None      # the Profiler, while profiling is on
+_originals = []     # (owner, attribute, original function) of each swapped function
+
+
+class _NullSpan(object):
+    # the span handed back while profiling is off
+    args = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span(object):
+    """
+    One timed call. Extra values (e.g. 'bytes_read') can be put in span.args
+    before the span ends.
+    """
+
+    def __init__(self, profiler, name, stage, args):
+        self.profiler = profiler
+        self.name = name
+        self.stage = stage
+        self.args = args
+        self.children = 0.0
+
+    def __enter__(self):
+        self.stack = self.profiler._stack()
+        self.stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        self.stack.pop()
+        duration = (end - self.start)*1.0e6     # microseconds
+        if self.stack:
+            self.stack[-1].children += duration
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.profiler._record(self, end, duration)
+        return False
+
+
+class Profiler(object):
+    """
+    A record of timing spans, from every thread of this process.
+
+    Attributes
+    ----------
+    events : <list of dictionaries>
+        One Chrome trace event ('ph': 'X') per span, in the order they ended.
+    """
+
+    def __init__(self):
+        self.events = []
+        self.pid = os.getpid()
+        self._t0 = time.perf_counter()
+        self._local = threading.local()
+
+    def _stack(self):
+        try:
+            return self._local.stack
+        except AttributeError:
+            self._local.stack = []
+            return self._local.stack
+
+    def _record(self, span, end, duration):
+        args = dict(span.args)
+        args['self_us'] = duration - span.children
+        # list.append is atomic, so spans from several threads need no lock
+        self.events.append({'name': span.name, 'cat': span.stage, 'ph': 'X', 'pid': self.pid,
+                            'tid': threading.get_ident(), 'ts': (span.start - self._t0)*1.0e6,
+                            'dur': duration, 'args': args})
+
+    def span(self, name, stage='user', **args):
+        """
+        Return a span (a context manager) that times the block inside it.
+        """
+
+        return Span(self, name, stage, args)
+
+    def writeTrace(self, path):
+        """
+        Write the spans as a Chrome trace file (JSON).
+        """
+
+        tids = sorted(set(e['tid'] for e in self.events))
+        names = [{'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid,
+                  'args': {'name': 'main' if tid == threading.main_thread().ident else 'thread %d' % n}}
+                 for (n, tid) in enumerate(tids)]
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'traceEvents': names + sorted(self.events, key=lambda e: e['ts']),
+                       'displayTimeUnit': 'ms'}, f)
+        os.replace(tmp, path)
+
+    def summary(self):
+        """
+        Sum up the spans per stage and per function.
+
+        Returns
+        -------
+        rows : <list of dictionaries>
+            One per (stage, name), with 'stage', 'name', 'calls', 'seconds'
+            (total), 'self_seconds' (without the time in nested spans),
+            'bytes_read' and 'bytes_written'; the slowest first (by self time).
+        """
+
+        rows = {}
+        for e in self.events:
+            row = rows.setdefault((e['cat'], e['name']), {'stage': e['cat'], 'name': e['name'], 'calls': 0,
+                                                          'seconds': 0.0, 'self_seconds': 0.0,
+                                                          'bytes_read': 0, 'bytes_written': 0})
+            row['calls'] += 1
+            row['seconds'] += e['dur']/1.0e6
+            row['self_seconds'] += e['args']['self_us']/1.0e6
+            row['bytes_read'] += e['args'].get('bytes_read', 0)
+            row['bytes_written'] += e['args'].get('bytes_written', 0)
+        return sorted(rows.values(), key=lambda r: -r['self_seconds'])
+
+    def formatSummary(self):
+        """
+        Return the summary as a plain-text table: the stages first (their self
+        times add up to the time spent in instrumented code), then each
+        function.
+        """
+
+        rows = self.summary()
+        stages = {}
+        for r in rows:
+            s = stages.setdefault(r['stage'], {'calls': 0, 'self_seconds': 0.0, 'bytes_read': 0, 'bytes_written': 0})
+            for key in s:
+                s[key] += r[key]
+        total = sum(s['self_seconds'] for s in stages.values()) or 1.0
+
+        lines = ["%-10s %10s %10s %7s %12s %12s" % ('stage', 'calls', 'self [s]', 'share', 'MB read', 'MB written')]
+        for (stage, s) in sorted(stages.items(), key=lambda item: -item[1]['self_seconds']):
+            lines.append("%-10s %10d %10.4f %6.1f%% %12.3f %12.3f" % (stage, s['calls'], s['self_seconds'],
+                         100.0*s['self_seconds']/total, s['bytes_read']/1.0e6, s['bytes_written']/1.0e6))
+        lines.append('')
+        lines.append("%-50s %-10s %8s %10s %10s %12s %12s" % ('function', 'stage', 'calls', 'total [s]',
+                                                             'self [s]', 'MB read', 'MB written'))
+        for r in rows:
+            lines.append("%-50s %-10s %8d %10.4f %10.4f %12.3f %12.3f" % (r['name'], r['stage'], r['calls'],
+                         r['seconds'], r['self_seconds'], r['bytes_read']/1.0e6, r['bytes_written']/1.0e6))
+        return '\n'.join(lines) + '\n'
+
+
+def _fileSize(path):
+    try:
+        return os.path.getsize(path)
+    except (OSError, TypeError, ValueError):
+        return 0
+
+
+def _tell(f):
+    try:
+        return f.tell()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _instrument(func, name, stage, nbytes):
+    # wrap one function in a span; the wrapper is only in place while
+    # profiling is on
+    (direction, where) = nbytes if nbytes is not None else (None, None)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profiler = _active
+        if profiler is None:
+            return func(*args, **kwargs)
+        handle = args[where] if direction == 'write' and where != 'result' and len(args) > where else None
+        before = _tell(handle) if handle is not None else None
+        with profiler.span(name, stage) as span:
+            if direction == 'read' and len(args) > where:
+                span.args['bytes_read'] = _fileSize(args[where])
+            result = func(*args, **kwargs)
+            if before is not None:
+                after = _tell(handle)
+                if after is not None:
+                    span.args['bytes_written'] = after - before
+            elif direction == 'write' and where == 'result':
+                span.args['bytes_written'] = sum(_fileSize(p) for p in result)
+        return result
+
+    return wrapper
+
+
+def isEnabled():
+    """
+    Return True while profiling is on.
+    """
+
+    return _active is not None
+
+
+def enable(profiler=None):
+    """
+    Turn profiling on: swap timed wrappers in for the functions in
+    INSTRUMENTED (importing their modules), and record spans in profiler (a
+    new Profiler by default). Returns the profiler.
+    """
+
+    global _active
+    if _active is not None:
+        raise RuntimeError("profiling is already on")
+    profiler = Profiler() if profiler is None else profiler
+    for (module, attribute, stage, nbytes) in INSTRUMENTED:
+        owner = importlib.import_module(module)
+        path = attribute.split('.')
+        for part in path[:-1]:
+            owner = getattr(owner, part)
+        func = getattr(owner, path[-1])
+        name = module.split('.')[-1] + '.' + attribute
+        _originals.append((owner, path[-1], func))
+        setattr(owner, path[-1], _instrument(func, name, stage, nbytes))
+    _active = profiler
+    return profiler
+
+
+def disable():
+    """
+    Turn profiling off, and put the original functions back. Returns the
+    profiler that recorded the spans (or None if profiling was off).
+    """
+
+    global _active
+    while _originals:
+        (owner, attribute, func) = _originals.pop()
+        setattr(owner, attribute, func)
+    (profiler, _active) = (_active, None)
+    return profiler
+
+
+def span(name, stage='user', **args):
+    """
+    Return a span (a context manager) that times the block inside it, or a
+    do-nothing span while profiling is off.
+    """
+
+    profiler = _active
+    if profiler is None:
+        return _NULL_SPAN
+    return profiler.span(name, stage, **args)
+
+
+@contextlib.contextmanager
+def profile(trace=None, summary=None):
+    """
+    Profile the block inside a with statement.
+
+    Parameters
+    ----------
+    trace : <string>
+        (optional) The path of the Chrome trace file to write at the end.
+    summary : <file object>
+        (optional) Where to write the plain-text summary at the end, e.g.
+        sys.stderr.
+
+    Yields
+    ------
+    profiler : <Profiler>
+    """
+
+    profiler = enable()
+    try:
+        yield profiler
+    finally:
+        disable()
+        if trace is not None:
+            profiler.writeTrace(trace)
+        if summary is not None:
+            summary.write(profiler.formatSummary())
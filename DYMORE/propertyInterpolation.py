@@ -0,0 +1,241 @@
+"""
+The propertyInterpolation module interpolates the cross-sectional properties
+of a beam (stiffness, mass, moments of inertia and center of mass) from the
+cross-sections that VABS analyzed to any eta-coordinates, in one vectorized
+call, so a beam can be meshed densely without extra VABS runs.
+
+The 6x6 stiffness matrices are not interpolated term by term. Each one is
+factored, S = L L^T (Cholesky), the factors are interpolated, and the
+interpolated stiffness matrix is rebuilt from the interpolated factor. The
+diagonal of every factor is positive, and neither interpolation (linear, or
+PCHIP, which does not overshoot the data) can make it zero or negative between
+two positive values, so every interpolated stiffness matrix is symmetric
+positive-definite. The mass per unit span and the moments of inertia are
+positive for the same reason.
+
+Beyond the first and last cross-sections, the properties are constant (as in
+beamSolver.interpolateProperties).
+
+The error of the interpolation can be measured by leaving out one analyzed
+cross-section at a time and interpolating it from the others (heldOutErrors),
+or against cross-sections that were analyzed separately (errors).
+
+Example
+-------
+>>> import numpy as np
+>>> from DYMORE import DYMOREdeck as dd
+>>> from DYMORE import propertyInterpolation as pi
+>>> deck = dd.readDeck('monoplane_spar/flapwise_tipload/1e03/monoplane_spar.dym')
+>>> props = pi.PropertyInterpolator.fromDeck(deck, 'propSpar', kind='pchip')
+>>> (cm_x2, cm_x3, mpus, i1, i2, i3, K) = props(np.linspace(0.0, 1.0, 201))
+>>> err = props.heldOutErrors()
+>>> err['stiffness'].max()   # worst relative (Frobenius) error in K
+"""
+
+import numpy as np
+from scipy.interpolate import PchipInterpolator
+
+from . import DYMOREdeck as dd
+from . import DYMOREutilities as du
+from . import beamSolver as bs
+
+
+KINDS = ('linear', 'pchip')
+L_LOWER = np.tril_indices(6)    # the 21 terms of a lower-triangular factor
+
+
+class PropertyInterpolator(object):
+    """
+    The cross-sectional properties of one beam, interpolated between the
+    analyzed cross-sections.
+
+    Parameters
+    ----------
+    eta : <np.array>
+        The eta-coordinates of the cross-sections, shape (N,), increasing.
+    cm_x2, cm_x3 : <np.array>
+        The x2- and x3-coordinates of the center of mass, shape (N,).
+    mpus : <np.array>
+        The mass per unit span, shape (N,).
+    i1, i2, i3 : <np.array>
+        The moments of inertia about the x1-, x2- and x3-axes, shape (N,).
+    K : <np.array>
+        The Timoshenko stiffness matrices, shape (N,6,6), symmetric
+        positive-definite.
+    kind : <string>
+        'linear' or 'pchip' (piecewise cubic, monotone between cross-sections).
+
+    Calling the interpolator with an array of eta-coordinates returns
+    (cm_x2, cm_x3, mpus, i1, i2, i3, K), in the same layout as
+    DYMOREdeck.readBeamProperties.
+    """
+
+    def __init__(self, eta, cm_x2, cm_x3, mpus, i1, i2, i3, K, kind='pchip'):
+        if kind not in KINDS:
+            raise ValueError("kind must be one of %s, not %r" % (', '.join(KINDS), kind))
+        self.kind = kind
+        self.eta = np.asarray(eta, dtype=float)
+        N = len(self.eta)
+        if N < 1:
+            raise ValueError("at least 1 cross-section is needed to interpolate")
+        if np.any(np.diff(self.eta) <= 0.0):
+            raise ValueError("the eta-coordinates of the cross-sections must be increasing")
+        self.scalars = np.column_stack([np.broadcast_to(np.asarray(v, dtype=float), (N,))
+                                        for v in (cm_x2, cm_x3, mpus, i1, i2, i3)])
+        self.K = np.asarray(K, dtype=float).reshape(N,6,6)
+        try:
+            L = np.linalg.cholesky(0.5*(self.K + np.swapaxes(self.K, 1, 2)))
+        except np.linalg.LinAlgError:
+            raise ValueError("the stiffness matrices must be positive-definite")
+        # everything that is interpolated, one row per cross-section
+        self._data = np.hstack([L[:,L_LOWER[0],L_LOWER[1]], self.scalars])
+        if kind == 'pchip' and N > 2:
+            self._pchip = PchipInterpolator(self.eta, self._data, axis=0, extrapolate=False)
+        else:
+            self._pchip = None
+
+    @classmethod
+    def fromNode(cls, propNode, kind='pchip'):
+        """
+        Build the interpolator for a @BEAM_PROPERTY_NAME node (6X6_MATRICES
+        type, with ETA_COORDINATEs), e.g. from a *_props.dat file.
+        """
+
+        (coord, cm_x2, cm_x3, mpus, i1, i2, i3, K) = dd.readBeamProperties(propNode)
+        return cls(coord, cm_x2, cm_x3, mpus, i1, i2, i3, K, kind=kind)
+
+    @classmethod
+    def fromDeck(cls, deck, propName, kind='pchip'):
+        """
+        Build the interpolator for the beam property propName of a deck (a
+        DeckFile, or the path to its *.dym file).
+        """
+
+        if not isinstance(deck, dd.DeckFile):
+            deck = dd.readDeck(deck)
+        return cls.fromNode(bs._definition(deck, 'BEAM_PROPERTY_NAME', propName), kind=kind)
+
+    def __call__(self, eta):
+        """
+        Interpolate the properties to new eta-coordinates.
+
+        Parameters
+        ----------
+        eta : <np.array>
+            The eta-coordinates to interpolate to, shape (M,).
+
+        Returns
+        -------
+        cm_x2, cm_x3, mpus, i1, i2, i3 : <np.array>
+            Shape (M,).
+        K : <np.array>
+            Shape (M,6,6), symmetric positive-definite.
+        """
+
+        eta = np.clip(np.atleast_1d(np.asarray(eta, dtype=float)), self.eta[0], self.eta[-1])
+        if len(self.eta) == 1:
+            data = np.repeat(self._data, len(eta), axis=0)
+        elif self._pchip is not None:
+            data = self._pchip(eta)
+        else:
+            j = np.clip(np.searchsorted(self.eta, eta, side='right') - 1, 0, len(self.eta) - 2)
+            t = ((eta - self.eta[j])/(self.eta[j+1] - self.eta[j]))[:,None]
+            data = (1.0 - t)*self._data[j] + t*self._data[j+1]
+
+        L = np.zeros((len(eta),6,6))
+        L[:,L_LOWER[0],L_LOWER[1]] = data[:,:21]
+        K = np.matmul(L, np.swapaxes(L, 1, 2))
+        s = data[:,21:]
+        return (s[:,0], s[:,1], s[:,2], s[:,3], s[:,4], s[:,5], K)
+
+    def errors(self, eta, cm_x2, cm_x3, mpus, i1, i2, i3, K):
+        """
+        Compare the interpolated properties with cross-sections that were
+        analyzed separately (e.g. by a later VABS run).
+
+        Parameters
+        ----------
+        eta, cm_x2, cm_x3, mpus, i1, i2, i3, K :
+            The reference cross-sections, shape (M,) and (M,6,6).
+
+        Returns
+        -------
+        errors : <dictionary of np.arrays>
+            Shape (M,) each:
+            'eta'       : the eta-coordinates of the reference cross-sections
+            'stiffness' : |K - K_ref| / |K_ref| (Frobenius norms)
+            'mass'      : |mpus - mpus_ref| / mpus_ref
+            'inertia'   : the largest |i - i_ref| / i_ref of i1, i2 and i3
+            'cg'        : the distance between the centers of mass
+        """
+
+        eta = np.atleast_1d(np.asarray(eta, dtype=float))
+        M = len(eta)
+        K_ref = np.asarray(K, dtype=float).reshape(M,6,6)
+        ref = np.column_stack([np.broadcast_to(np.asarray(v, dtype=float), (M,))
+                               for v in (cm_x2, cm_x3, mpus, i1, i2, i3)])
+        values = self(eta)
+        s = np.column_stack(values[:6])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return {'eta': eta,
+                    'stiffness': np.linalg.norm(values[6] - K_ref, axis=(1,2))/np.linalg.norm(K_ref, axis=(1,2)),
+                    'mass': np.abs(s[:,2] - ref[:,2])/np.abs(ref[:,2]),
+                    'inertia': (np.abs(s[:,3:] - ref[:,3:])/np.abs(ref[:,3:])).max(axis=1),
+                    'cg': np.hypot(s[:,0] - ref[:,0], s[:,1] - ref[:,1])}
+
+    def heldOutErrors(self, stations=None):
+        """
+        Leave out one analyzed cross-section at a time, interpolate it from the
+        others, and compare (see errors).
+
+        Parameters
+        ----------
+        stations : <list of ints>
+            (optional) The indices of the cross-sections to hold out. The
+            default is every cross-section except the first and last ones
+            (which could only be extrapolated).
+
+        Returns
+        -------
+        errors : <dictionary of np.arrays>
+            See errors, one entry per held-out cross-section.
+        """
+
+        N = len(self.eta)
+        if stations is None:
+            stations = range(1, N - 1)
+        stations = list(stations)
+        keys = ('eta', 'stiffness', 'mass', 'inertia', 'cg')
+        result = dict((key, np.empty(len(stations))) for key in keys)
+        for (m, j) in enumerate(stations):
+            keep = np.arange(N) != j
+            other = PropertyInterpolator(self.eta[keep], *self.scalars[keep].T, self.K[keep], kind=self.kind)
+            err = other.errors(self.eta[j], *self.scalars[j], self.K[j])
+            for key in keys:
+                result[key][m] = err[key][0]
+        return result
+
+    def writeDefinition(self, f, propName, eta, comments=None):
+        """
+        Write a complete @BEAM_PROPERTY_DEFINITION block with the properties
+        interpolated to new eta-coordinates (see
+        DYMOREutilities.writeBeamPropertyDefinition).
+
+        Parameters
+        ----------
+        f : <file object>
+            The file handle that data will be written to.
+        propName : <string>
+            The name of the beam property, e.g. 'propCD'.
+        eta : <np.array>
+            The eta-coordinates of the new cross-sections, shape (M,).
+        comments : <string>
+            (optional) The comment for this beam property.
+
+        Returns
+        -------
+        <none>
+        """
+
+        eta = np.atleast_1d(np.asarray(eta, dtype=float))
+        du.writeBeamPropertyDefinition(f, propName, 'ETA_COORDINATE', eta, *self(eta), comments=comments)
@@ -0,0 +1,266 @@
+"""
+The regressionCheck module compares the displacement and force surveys
+(FIGURES/svy_disp_*.mdt and svy_force_*.mdt) of a whole case tree with a stored
+baseline of the same tree, e.g. after the beam properties were regenerated or
+the solver was changed, and reports the worst offending station of each case.
+
+The baseline is a results database (see resultsDatabase) saved from a tree
+whose results are known to be right. To check the tree, its surveys are
+ingested into a second, working results database (incrementally, so only the
+survey files that changed are read again), and every row of every survey is
+compared with the baseline in one vectorized pass: a value passes if
+
+    |value - baseline| <= atol + rtol*|baseline|
+
+with an absolute and a relative tolerance for each column (see TOLERANCES).
+The rows of the two surveys are matched in eta order; a survey whose rows or
+eta-coordinates changed fails as a whole.
+
+A survey file in the baseline that is missing from the tree fails its case.
+A survey file that is not in the baseline is listed, but not checked.
+
+Example
+-------
+>>> from DYMORE import regressionCheck as rc
+>>> rc.saveBaseline('sweep', 'sweep_baseline')     # once, from a good tree
+>>> report = rc.checkTree('sweep', 'sweep_baseline')
+>>> print(rc.formatReport(report))
+>>> report['passed']
+
+or, from the command line (the exit status is 1 if the check fails):
+> spardesign check sweep --baseline sweep_baseline --save
+> spardesign check sweep --baseline sweep_baseline
+"""
+
+import os
+
+import numpy as np
+
+from . import caseGenerator as cg
+from . import resultsDatabase as rdb
+
+
+# the quantities that are checked
+QUANTITIES = ('disp', 'force')
+
+# the (absolute, relative) tolerance of each value column: displacements in m,
+# rotations in rad, forces in N and moments in N*m
+TOLERANCES = {
+    'u1': (1.0e-9, 1.0e-6), 'u2': (1.0e-9, 1.0e-6), 'u3': (1.0e-9, 1.0e-6),
+    'r1': (1.0e-9, 1.0e-6), 'r2': (1.0e-9, 1.0e-6), 'r3': (1.0e-9, 1.0e-6),
+    'F1': (1.0e-6, 1.0e-6), 'F2': (1.0e-6, 1.0e-6), 'F3': (1.0e-6, 1.0e-6),
+    'M1': (1.0e-6, 1.0e-6), 'M2': (1.0e-6, 1.0e-6), 'M3': (1.0e-6, 1.0e-6),
+    }
+
+# the working results database of a tree, kept inside it (findSurveys skips
+# directories whose names start with '.')
+WORK_DIRNAME = '.regression_db'
+
+
+def toleranceArrays(tolerances=None):
+    """
+    Return the tolerances as arrays.
+
+    Parameters
+    ----------
+    tolerances : <dictionary>
+        (optional) Column name -> (atol, rtol), for the columns whose
+        tolerances differ from TOLERANCES, e.g. {'M2': (1.0e-3, 1.0e-5)}.
+
+    Returns
+    -------
+    atol, rtol : <np.array>
+        Shape (len(QUANTITIES), NUM_VALUES).
+    """
+
+    merged = dict(TOLERANCES)
+    merged.update(tolerances or {})
+    unknown = set(merged) - set(name for q in QUANTITIES for name in rdb.VALUE_NAMES[q])
+    if unknown:
+        raise KeyError("no tolerances for columns %s" % sorted(unknown))
+    tol = np.array([[merged[name] for name in rdb.VALUE_NAMES[q]] for q in QUANTITIES], dtype=float)
+    return (tol[:,:,0], tol[:,:,1])
+
+
+def saveBaseline(root, baseline):
+    """
+    Save (or bring up to date) the baseline results database of a case tree.
+
+    Returns
+    -------
+    counts : <dictionary>
+        See ResultsDatabase.ingest.
+    """
+
+    return rdb.ResultsDatabase(baseline).ingest(root)
+
+
+def _rowIndex(starts, lengths):
+    # the row numbers of several row ranges, concatenated
+    total = int(lengths.sum())
+    offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return offsets + np.arange(total)
+
+
+def compare(current, baseline, tolerances=None):
+    """
+    Compare the displacement and force surveys of two results databases.
+
+    Parameters
+    ----------
+    current, baseline : <ResultsDatabase>
+    tolerances : <dictionary>
+        (optional) See toleranceArrays.
+
+    Returns
+    -------
+    report : <dictionary>
+        'passed' (True if every case passed), 'cases' (one dictionary per
+        case of the baseline, see below), 'missing' (the survey files of the
+        baseline that are not in the tree), 'reshaped' (the survey files whose
+        rows or eta-coordinates changed), 'extra' (the survey files that are
+        not in the baseline), and 'values' (the number of values compared).
+
+        Each case has 'spar', 'load', 'magnitude', 'passed', 'failures' (the
+        number of values out of tolerance, counting every value of a missing
+        or reshaped survey), and its worst offending station: 'ratio' (the
+        error over the tolerance; above 1 fails), 'survey', 'eta', 'column',
+        'value', 'baseline' and 'tolerance' (None if nothing was compared).
+    """
+
+    (atol, rtol) = toleranceArrays(tolerances)
+    base_files = dict((p, f) for (p, f) in baseline.manifest['files'].items() if f['quantity'] in QUANTITIES)
+    cur_files = dict((p, f) for (p, f) in current.manifest['files'].items() if f['quantity'] in QUANTITIES)
+    missing = sorted(set(base_files) - set(cur_files))
+    extra = sorted(set(cur_files) - set(base_files))
+
+    # the surveys with the same number of rows are compared row by row
+    common = sorted(set(base_files) & set(cur_files))
+    nrows = lambda f: f['stop'] - f['start']
+    reshaped = [p for p in common if nrows(base_files[p]) != nrows(cur_files[p])]
+    paired = [p for p in common if nrows(base_files[p]) == nrows(cur_files[p])]
+
+    cases = sorted(set((f['spar'], f['load'], f['magnitude']) for f in base_files.values()))
+    case_of = dict((c, k) for (k, c) in enumerate(cases))
+    lengths = np.array([nrows(base_files[p]) for p in paired], dtype=np.intp)
+    b_rows = _rowIndex(np.array([base_files[p]['start'] for p in paired], dtype=np.intp), lengths)
+    c_rows = _rowIndex(np.array([cur_files[p]['start'] for p in paired], dtype=np.intp), lengths)
+    survey_row = np.repeat(np.arange(len(paired)), lengths)
+    case_row = np.array([case_of[(base_files[p]['spar'], base_files[p]['load'], base_files[p]['magnitude'])]
+                         for p in paired], dtype=np.intp)[survey_row]
+    quantity_row = np.array([QUANTITIES.index(base_files[p]['quantity']) for p in paired], dtype=np.intp)[survey_row]
+
+    b_eta = np.asarray(baseline.columns['eta'][b_rows])
+    c_eta = np.asarray(current.columns['eta'][c_rows])
+    old = np.asarray(baseline.columns['values'][:,b_rows])
+    new = np.asarray(current.columns['values'][:,c_rows])
+
+    # every value at once: shape (NUM_VALUES, rows)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        tol = atol[quantity_row].T + rtol[quantity_row].T*np.abs(old)
+        error = np.abs(new - old)
+        ratio = np.where(error == 0.0, 0.0, error/tol)
+    both_nan = np.isnan(old) & np.isnan(new)
+    ratio[both_nan] = 0.0
+    ratio[np.isnan(ratio)] = np.inf     # a value appeared or disappeared
+
+    # a survey whose eta-coordinates moved fails as a whole, not row by row
+    moved = np.bincount(survey_row, weights=(b_eta != c_eta), minlength=len(paired)) > 0
+    ratio[:,moved[survey_row]] = 0.0
+    reshaped = sorted(reshaped + [paired[s] for s in np.nonzero(moved)[0]])
+
+    # the worst value of each row, then the worst row of each case
+    column_row = ratio.argmax(axis=0)
+    ratio_row = ratio[column_row, np.arange(ratio.shape[1])]
+    failures = np.bincount(case_row, weights=(ratio > 1.0).sum(axis=0), minlength=len(cases)).astype(int)
+    order = np.lexsort((-ratio_row, case_row))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = case_row[order][1:] != case_row[order][:-1]
+    worst = dict(zip(case_row[order[first]], order[first]))
+
+    report_cases = []
+    for (k, key) in enumerate(cases):
+        case = dict(zip(('spar', 'load', 'magnitude'), key))
+        case.update(failures=int(failures[k]), ratio=None, survey=None, eta=None, column=None,
+                    value=None, baseline=None, tolerance=None)
+        r = worst.get(k)
+        if r is not None:
+            j = column_row[r]
+            case.update(ratio=float(ratio_row[r]), survey=paired[survey_row[r]], eta=float(b_eta[r]),
+                        column=rdb.VALUE_NAMES[QUANTITIES[quantity_row[r]]][j], value=float(new[j,r]),
+                        baseline=float(old[j,r]), tolerance=float(tol[j,r]))
+        bad = [p for p in missing + reshaped
+               if (base_files[p]['spar'], base_files[p]['load'], base_files[p]['magnitude']) == key]
+        if bad:
+            case['failures'] += sum(rdb.NUM_VALUES*nrows(base_files[p]) for p in bad)
+            case.update(ratio=np.inf, survey=bad[0], eta=None, column=None, value=None, baseline=None,
+                        tolerance=None)
+        case['passed'] = case['failures'] == 0
+        report_cases.append(case)
+
+    return {'passed': all(c['passed'] for c in report_cases), 'cases': report_cases, 'missing': missing,
+            'reshaped': reshaped, 'extra': extra, 'values': int(ratio.size)}
+
+
+def checkTree(root, baseline, work=None, tolerances=None):
+    """
+    Check the displacement and force surveys of a case tree against a
+    baseline.
+
+    Parameters
+    ----------
+    root : <string>
+        The top of the case tree.
+    baseline : <string>
+        The baseline results database directory (see saveBaseline).
+    work : <string>
+        (optional) The working results database directory of the tree (by
+        default, <root>/.regression_db). It is brought up to date first.
+    tolerances : <dictionary>
+        (optional) See toleranceArrays.
+
+    Returns
+    -------
+    report : <dictionary>
+        See compare.
+    """
+
+    if not os.path.exists(os.path.join(baseline, rdb.MANIFEST_FILENAME)):
+        raise IOError("no baseline results database in " + baseline)
+    current = rdb.ResultsDatabase(os.path.join(root, WORK_DIRNAME) if work is None else work)
+    current.ingest(root)
+    return compare(current, rdb.ResultsDatabase(baseline), tolerances)
+
+
+def formatReport(report):
+    """
+    Return a report as a plain-text table: one line per case, with its worst
+    offending station, then the survey files that are missing, reshaped or
+    not in the baseline.
+    """
+
+    lines = ["%-6s %-47s %8s %10s  %-20s %6s %6s %13s %13s" % ('', 'case', 'failures', 'error/tol', 'survey',
+                                                             'eta', 'column', 'value', 'baseline')]
+    for c in report['cases']:
+        name = '/'.join((c['spar'], c['load'], cg.magnitudeLabel(c['magnitude'])))
+        line = "%-6s %-47s %8d" % ('ok' if c['passed'] else 'FAILED', name, c['failures'])
+        if c['ratio']:
+            survey = os.path.basename(c['survey'])
+            if c['eta'] is None:
+                line += " %10s  %-20s" % ('-', survey)
+            else:
+                line += " %10.3g  %-20s %6.3f %6s %13.6e %13.6e" % (c['ratio'], survey, c['eta'], c['column'],
+                                                                    c['value'], c['baseline'])
+        lines.append(line.rstrip())
+    for (key, what) in (('missing', "missing from the tree"),
+                        ('reshaped', "whose rows or eta-coordinates changed"),
+                        ('extra', "not in the baseline (not checked)")):
+        if report[key]:
+            lines.append('')
+            lines.append("survey files %s (%d):" % (what, len(report[key])))
+            lines.extend('  ' + p for p in report[key])
+    failed = sum(not c['passed'] for c in report['cases'])
+    lines.append('')
+    lines.append("%s: %d of %d cases failed, %d values compared" % ('PASSED' if report['passed'] else 'FAILED',
+                                                                    failed, len(report['cases']), report['values']))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,145 @@
+"""
+Functions in the resample module move spanwise results onto other grids, e.g.
+DYMORE force and moment results at Gauss points onto the 24 spar stations.
+
+Results are interpolated linearly between samples. Beyond the first and last
+samples they are extrapolated linearly from the first and last intervals (the
+same rule as the old extrap1d helper in the plot scripts), so a Gauss-point
+result is carried out to the root and tip of the spar.
+
+Everything is done in one vectorized call, for one survey or for a stack of
+many cases x columns at once.
+
+Example
+-------
+>>> from DYMORE import mdtReader as mdt
+>>> from DYMORE import resample as rs
+>>> AB = mdt.readSurvey('monoplane_spar/flapwise_tipload/1e03/FIGURES/svy_force_spar.mdt')
+>>> stn = rs.resampleSurvey(AB, rs.X1_STATIONS, scale=91.9)
+>>> M2 = stn[:,5]   # flapwise bending moment at each spar station
+"""
+
+import numpy as np
+
+
+# x1 coordinates of all 24 spar stations
+X1_STATIONS = np.array([0.0, 0.2, 2.3, 4.4, 6.5, 9.0, 12.2, 13.9, 15.5, 17.1, 19.8, 22.5, 25.2, 33.4, 41.5, 49.6, 57.8, 64.3, 65.9, 70.8, 74.0, 82.2, 87.0, 91.9])
+
+
+def intervals(x, xq):
+    """
+    Find the interval of x that each query point is interpolated (or
+    extrapolated) on, and the fraction of the way along it.
+
+    Parameters
+    ----------
+    x : <np.array>
+        The sample coordinates, shape (n,), increasing (repeated values are
+        allowed, e.g. where two segments meet).
+    xq : <np.array>
+        The query coordinates, shape (m,).
+
+    Returns
+    -------
+    i : <np.array of ints>
+        Shape (m,). Query point k lies on the interval x[i[k]] ... x[i[k]+1].
+    t : <np.array>
+        Shape (m,). The fraction of the way along the interval; t < 0 below the
+        first sample and t > 1 beyond the last one.
+    """
+
+    n = len(x)
+    if n < 2:
+        raise ValueError("at least 2 samples are needed to interpolate")
+    i = np.clip(np.searchsorted(x, xq, side='right') - 1, 0, n - 2)
+    # the last interval may be empty, if the last samples are repeated
+    i = np.where(x[i+1] > x[i], i, np.maximum(i - 1, 0))
+    dx = x[i+1] - x[i]
+    t = np.divide(xq - x[i], dx, out=np.zeros(len(xq)), where=dx != 0)
+    return (i, t)
+
+
+def interpolate(x, y, xq):
+    """
+    Interpolate (and extrapolate) linearly, for many cases and columns at once.
+
+    Parameters
+    ----------
+    x : <np.array>
+        The sample coordinates, shape (n,) if every case shares them, or
+        (ncases, n).
+    y : <np.array>
+        The sampled values. If x has shape (n,): shape (n,), (n, ncols) or
+        (ncases, n, ncols). If x has shape (ncases, n): shape (ncases, n) or
+        (ncases, n, ncols).
+    xq : <np.array>
+        The query coordinates, shape (m,).
+
+    Returns
+    -------
+    yq : <np.array>
+        The same shape as y, with the n samples replaced by the m query points.
+    """
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    xq = np.atleast_1d(np.asarray(xq, dtype=float))
+
+    if x.ndim == 1:
+        # shared coordinates: the samples run along the first axis of y, or
+        # the second one for a stack of surveys
+        axis = 1 if y.ndim == 3 else 0
+        (i, t) = intervals(x, xq)
+        t = t.reshape((-1,) + (1,)*(y.ndim - axis - 1))
+        y0 = np.take(y, i, axis=axis)
+        y1 = np.take(y, i + 1, axis=axis)
+        return y0 + t*(y1 - y0)
+
+    # one set of coordinates per case: only the interval search is done case
+    # by case, the interpolation itself is done for the whole stack
+    ncases = x.shape[0]
+    it = [intervals(x[c], xq) for c in range(ncases)]
+    i = np.array([a for (a, b) in it])
+    t = np.array([b for (a, b) in it]).reshape((ncases, len(xq)) + (1,)*(y.ndim - 2))
+    rows = np.arange(ncases)[:,None]
+    y0 = y[rows, i]
+    y1 = y[rows, i + 1]
+    return y0 + t*(y1 - y0)
+
+
+def resampleSurvey(data, xq, scale=1.0, offset=0.0):
+    """
+    Resample a DYMORE survey (or a stack of surveys) onto a grid of x1
+    coordinates.
+
+    Parameters
+    ----------
+    data : <np.array>
+        Shape (n, ncols) for one survey, as read by mdtReader.readSurvey, or
+        (ncases, n, ncols) for a stack of surveys. Column 0 holds eta.
+    xq : <np.array>
+        The x1 coordinates to resample onto, shape (m,), e.g. X1_STATIONS.
+    scale, offset : <float>
+        Convert eta to x1 = offset + scale*eta, e.g. scale=91.9 for the
+        monoplane spar, or offset=C and scale=D-C for biplane segment CD.
+        These may also be arrays of shape (ncases,).
+
+    Returns
+    -------
+    stn : <np.array>
+        Shape (m, ncols) or (ncases, m, ncols). Column 0 holds xq, the other
+        columns the resampled results.
+    """
+
+    data = np.asarray(data, dtype=float)
+    xq = np.atleast_1d(np.asarray(xq, dtype=float))
+    if data.ndim == 2:
+        x = offset + scale*data[:,0]
+    else:
+        x = np.asarray(offset, dtype=float)[...,None] + np.asarray(scale, dtype=float)[...,None]*data[:,:,0]
+        if np.all(x == x[0]):
+            # the cases share a mesh, so they share the interval search too
+            x = x[0]
+    stn = interpolate(x, data, xq)
+    stn[...,0] = xq
+    return stn
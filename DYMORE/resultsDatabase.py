@@ -0,0 +1,326 @@
+"""
+The resultsDatabase module collects the DYMORE survey results (FIGURES/*.mdt)
+of a whole case tree into one local columnar store, so results can be compared
+across spar types, load types and load magnitudes without reopening text files.
+
+The case tree is laid out the way caseGenerator builds it:
+    <spar type>/<load type>/<magnitude label>/FIGURES/svy_<quantity>_<segment>.mdt
+e.g. full-height_biplane_spar/torsional_tipload/1e05/FIGURES/svy_disp_EF.mdt.
+
+Every row of every survey is one row of the store, with the columns
+    spar, load, quantity, segment  (categories, stored as small integer codes)
+    magnitude, eta                 (floats)
+    c1 ... c6                      (the survey columns after eta)
+The value columns are also known by the names in VALUE_NAMES (e.g. 'u3' or
+'M2'), which tell the quantity apart.
+
+Each column is a .npy file, memory-mapped when the store is opened. The rows of
+one survey file are contiguous and sorted by eta; the manifest lists each file's
+keys and row range, which is the index that queries search.
+
+Ingestion is incremental: a survey file is only read again if its size or
+modification time changed since the last ingestion, and files that disappeared
+are dropped. A new set of columns is written next to the old one, and the
+manifest is switched over last, so an interrupted ingestion leaves the old
+store intact.
+
+Example
+-------
+>>> from DYMORE import resultsDatabase as rdb
+>>> db = rdb.ResultsDatabase('results_db')
+>>> db.ingest('.')
+{'added': 240, 'updated': 0, 'unchanged': 0, 'removed': 0}
+>>> tip = db.at('r1', eta=1.0, load='torsional_tipload', segment=['spar', 'EF'])
+>>> tip['spar'], tip['magnitude'], tip['value']   # tip twist vs load magnitude
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+
+from . import caseGenerator as cg
+from . import mdtReader as mdt
+from . import resample as rs
+
+
+MANIFEST_FILENAME = 'manifest.json'
+
+# the categorical columns (stored as integer codes into a vocabulary)
+KEY_COLUMNS = ('spar', 'load', 'quantity', 'segment')
+
+# the number of survey columns after eta
+NUM_VALUES = 6
+
+# the names of the survey columns after eta, for each quantity (see beamSolver)
+VALUE_NAMES = {
+    'disp': ('u1', 'u2', 'u3', 'r1', 'r2', 'r3'),
+    'force': ('F1', 'F2', 'F3', 'M1', 'M2', 'M3'),
+    'strain': ('e11', '2e12', '2e13', 'k1', 'k2', 'k3'),
+    }
+
+
+def surveyKeys(relpath):
+    """
+    Return the keys of a survey file from its path relative to the case tree,
+    e.g. 'monoplane_spar/flapwise_tipload/1e03/FIGURES/svy_disp_spar.mdt' ->
+    ('monoplane_spar', 'flapwise_tipload', 1000.0, 'disp', 'spar').
+
+    Returns None if the path is not laid out like a case tree.
+    """
+
+    parts = relpath.replace('\\', '/').split('/')
+    if len(parts) < 5 or parts[-2] != 'FIGURES':
+        return None
+    (spar, load, label) = parts[-5:-2]
+    try:
+        magnitude = cg.magnitudeFromLabel(label)
+    except ValueError:
+        return None
+    stem = parts[-1][:-len('.mdt')]
+    if stem.startswith('svy_'):
+        stem = stem[len('svy_'):]
+    (quantity, _, segment) = stem.partition('_')
+    return (spar, load, magnitude, quantity, segment)
+
+
+def findSurveys(root):
+    """
+    Return the paths (relative to root) of all the survey files in a case tree.
+    """
+
+    found = []
+    for (dirpath, dirnames, filenames) in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        if os.path.basename(dirpath) != 'FIGURES':
+            continue
+        for name in sorted(filenames):
+            if name.endswith('.mdt'):
+                relpath = os.path.relpath(os.path.join(dirpath, name), root).replace(os.sep, '/')
+                if surveyKeys(relpath) is not None:
+                    found.append(relpath)
+    return found
+
+
+def valueColumn(name):
+    """
+    Return the (quantity, column index) of a value column name, e.g.
+    'M2' -> ('force', 4); the generic names 'c1' ... 'c6' have no quantity.
+    """
+
+    for (quantity, names) in VALUE_NAMES.items():
+        if name in names:
+            return (quantity, names.index(name))
+    if name.startswith('c') and name[1:].isdigit() and 1 <= int(name[1:]) <= NUM_VALUES:
+        return (None, int(name[1:]) - 1)
+    raise KeyError("unknown value column %r" % name)
+
+
+def _matches(value, wanted):
+    if wanted is None:
+        return True
+    if isinstance(wanted, (list, tuple, set)):
+        return value in wanted
+    return value == wanted
+
+
+class ResultsDatabase(object):
+    """
+    A columnar store of survey results, kept in the directory path.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._columns = None
+        manifest = os.path.join(path, MANIFEST_FILENAME)
+        if os.path.exists(manifest):
+            with open(manifest, 'r') as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {'generation': None, 'vocab': dict((k, []) for k in KEY_COLUMNS), 'files': {}}
+
+    def __len__(self):
+        return sum(f['stop'] - f['start'] for f in self.manifest['files'].values())
+
+    def _generationDir(self, generation):
+        return os.path.join(self.path, 'columns-%d' % generation)
+
+    @property
+    def columns(self):
+        """
+        The columns of the store, memory-mapped read-only (loaded on first use).
+        """
+
+        if self._columns is None:
+            generation = self.manifest['generation']
+            if generation is None:
+                self._columns = {'magnitude': np.zeros(0), 'eta': np.zeros(0), 'values': np.zeros((NUM_VALUES, 0))}
+                for key in KEY_COLUMNS:
+                    self._columns[key] = np.zeros(0, dtype=np.int16)
+            else:
+                gen_dir = self._generationDir(generation)
+                self._columns = dict((name[:-len('.npy')], np.load(os.path.join(gen_dir, name), mmap_mode='r'))
+                                     for name in os.listdir(gen_dir) if name.endswith('.npy'))
+        return self._columns
+
+    def ingest(self, root):
+        """
+        Bring the store up to date with the survey files of a case tree.
+
+        Parameters
+        ----------
+        root : <string>
+            The top of the case tree.
+
+        Returns
+        -------
+        counts : <dictionary>
+            The number of survey files 'added', 'updated', 'unchanged' and
+            'removed'.
+        """
+
+        old_files = self.manifest['files']
+        vocab = dict((k, list(v)) for (k, v) in self.manifest['vocab'].items())
+        counts = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0}
+
+        def code(key, value):
+            if value not in vocab[key]:
+                vocab[key].append(value)
+            return vocab[key].index(value)
+
+        relpaths = findSurveys(root)
+        counts['removed'] = len(set(old_files) - set(relpaths))
+        pieces = []
+        files = {}
+        start = 0
+        for relpath in relpaths:
+            st = os.stat(os.path.join(root, relpath))
+            old = old_files.get(relpath)
+            if old is not None and old['mtime_ns'] == st.st_mtime_ns and old['size'] == st.st_size:
+                counts['unchanged'] += 1
+                rows = slice(old['start'], old['stop'])
+                piece = dict((k, self.columns[k][rows]) for k in ('magnitude', 'eta') + KEY_COLUMNS)
+                piece['values'] = self.columns['values'][:,rows]
+            else:
+                counts['updated' if old is not None else 'added'] += 1
+                data = np.asarray(mdt.readSurvey(os.path.join(root, relpath)))
+                data = data[np.argsort(data[:,0], kind='stable')]
+                n = len(data)
+                (spar, load, magnitude, quantity, segment) = surveyKeys(relpath)
+                piece = {'magnitude': np.full(n, magnitude), 'eta': data[:,0]}
+                for (k, v) in zip(KEY_COLUMNS, (spar, load, quantity, segment)):
+                    piece[k] = np.full(n, code(k, v), dtype=np.int16)
+                values = np.full((NUM_VALUES, n), np.nan)
+                values[:data.shape[1]-1] = data[:,1:NUM_VALUES+1].T
+                piece['values'] = values
+            n = len(piece['eta'])
+            entry = dict(zip(('spar', 'load', 'magnitude', 'quantity', 'segment'), surveyKeys(relpath)))
+            entry.update(mtime_ns=st.st_mtime_ns, size=st.st_size, start=start, stop=start + n)
+            files[relpath] = entry
+            pieces.append(piece)
+            start += n
+
+        if counts['added'] == counts['updated'] == counts['removed'] == 0:
+            return counts
+
+        # write the new generation of columns, then switch the manifest over
+        generation = (self.manifest['generation'] or 0) + 1
+        gen_dir = self._generationDir(generation)
+        if os.path.exists(gen_dir):
+            shutil.rmtree(gen_dir)
+        os.makedirs(gen_dir)
+        for name in ('magnitude', 'eta') + KEY_COLUMNS:
+            column = np.concatenate([p[name] for p in pieces]) if pieces else self.columns[name][:0]
+            np.save(os.path.join(gen_dir, name + '.npy'), column)
+        values = np.concatenate([p['values'] for p in pieces], axis=1) if pieces else np.zeros((NUM_VALUES, 0))
+        np.save(os.path.join(gen_dir, 'values.npy'), values)
+
+        old_generation = self.manifest['generation']
+        self.manifest = {'generation': generation, 'vocab': vocab, 'files': files}
+        tmp = os.path.join(self.path, MANIFEST_FILENAME + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp, os.path.join(self.path, MANIFEST_FILENAME))
+        self._columns = None
+        if old_generation is not None:
+            shutil.rmtree(self._generationDir(old_generation), ignore_errors=True)
+        return counts
+
+    def surveys(self, spar=None, load=None, magnitude=None, quantity=None, segment=None):
+        """
+        Return the manifest entries of the survey files that match the filters
+        (None matches everything; a list matches any of its items), sorted by
+        spar, load, segment and magnitude.
+        """
+
+        found = [f for f in self.manifest['files'].values()
+                 if _matches(f['spar'], spar) and _matches(f['load'], load) and _matches(f['magnitude'], magnitude)
+                 and _matches(f['quantity'], quantity) and _matches(f['segment'], segment)]
+        return sorted(found, key=lambda f: (f['spar'], f['load'], f['quantity'], f['segment'], f['magnitude']))
+
+    def select(self, columns, **filters):
+        """
+        Return every row of the matching survey files.
+
+        Parameters
+        ----------
+        columns : <list of strings>
+            The value columns to return, e.g. ['u3', 'r1']. Naming a column of
+            one quantity (like 'u3') selects that quantity.
+        filters :
+            spar, load, magnitude, quantity and segment, as for surveys().
+
+        Returns
+        -------
+        rows : <dictionary>
+            'spar', 'load', 'quantity', 'segment' (arrays of strings),
+            'magnitude', 'eta' and each of the columns -> array of shape (nrows,).
+        """
+
+        indices = [valueColumn(name) for name in columns]
+        quantities = set(q for (q, j) in indices if q is not None)
+        if len(quantities) > 1:
+            raise ValueError("columns %s belong to different quantities" % (columns,))
+        if quantities and filters.get('quantity') is None:
+            filters['quantity'] = quantities.pop()
+        found = self.surveys(**filters)
+        rows = np.concatenate([np.arange(f['start'], f['stop']) for f in found]) if found else np.zeros(0, dtype=int)
+
+        cols = self.columns
+        out = {'magnitude': np.asarray(cols['magnitude'][rows]), 'eta': np.asarray(cols['eta'][rows])}
+        for key in KEY_COLUMNS:
+            out[key] = np.array(self.manifest['vocab'][key] or [''], dtype=object)[cols[key][rows]]
+        for (name, (quantity, j)) in zip(columns, indices):
+            out[name] = np.asarray(cols['values'][j,rows])
+        return out
+
+    def at(self, column, eta=1.0, **filters):
+        """
+        Return one value column at one eta-coordinate, for each matching survey
+        file, e.g. the tip twist of every case: at('r1', eta=1.0). Results are
+        interpolated linearly between rows, and extrapolated beyond the first
+        and last rows (force and strain surveys are at Gauss points).
+
+        Returns
+        -------
+        found : <dictionary>
+            'spar', 'load', 'segment' (lists of strings), 'magnitude' and
+            'value' (arrays), one entry per survey file.
+        """
+
+        (quantity, j) = valueColumn(column)
+        if quantity is not None and filters.get('quantity') is None:
+            filters['quantity'] = quantity
+        found = self.surveys(**filters)
+        cols = self.columns
+        values = np.empty(len(found))
+        for (k, f) in enumerate(found):
+            rows = slice(f['start'], f['stop'])
+            if f['stop'] - f['start'] == 1:
+                values[k] = cols['values'][j,rows][0]
+            else:
+                values[k] = rs.interpolate(cols['eta'][rows], cols['values'][j,rows], [eta])[0]
+        return {'spar': [f['spar'] for f in found], 'load': [f['load'] for f in found],
+                'segment': [f['segment'] for f in found],
+                'magnitude': np.array([f['magnitude'] for f in found]), 'value': values}
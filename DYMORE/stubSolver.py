@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+A stand-in for Dymore.exe (and VABS) that runs on any platform, for testing the
+job scheduler and the rest of the pipeline without the real solver.
+
+Run from a case directory, it finds every active @SURVEY_NAME in the DYMORE
+input files there and writes a survey file (FIGURES/<survey name>.mdt) for each,
+filled with made-up but deterministic numbers. Given a VABS input file
+(*.dat) instead, it writes a VABS-style output file (<input>.K).
+
+This file has no dependencies outside the standard library, so it can be used
+as an executable on its own.
+
+Usage
+-----
+> python stubSolver.py biplane_spar.dym
+> python stubSolver.py spar_station_04.dat
+
+Environment variables
+---------------------
+STUB_SOLVER_SLEEP : seconds to sleep before writing outputs (default 0)
+STUB_SOLVER_FAIL  : if set, exit with this return code without writing outputs
+"""
+
+from __future__ import print_function
+import glob
+import os
+import re
+import sys
+import time
+
+
+SURVEY_PAT = re.compile(r'^[ \t]*@SURVEY_NAME\s*\{\s*(\S+?)\s*\}', re.M)
+FIGURES_PAT = re.compile(r'^[ \t]*@FIGURES_PATH\s*\{(.*?)\}', re.M)
+
+# number of rows and columns written to each survey file
+# (eta, then 3 components and 3 rotations/moments)
+NUM_ROWS = 37
+NUM_COLS = 7
+
+
+def surveyNames(case_dir):
+    """
+    Return the names of all active surveys in the DYMORE input files in a
+    case directory.
+    """
+
+    names = []
+    for path in sorted(glob.glob(os.path.join(case_dir, '*.dym')) + glob.glob(os.path.join(case_dir, '*.dat'))):
+        with open(path, 'r') as f:
+            names.extend(SURVEY_PAT.findall(f.read()))
+    return names
+
+
+def writeSurvey(path, seed):
+    """
+    Write a made-up survey file with NUM_ROWS rows and NUM_COLS columns.
+    """
+
+    with open(path, 'w') as f:
+        for i in range(NUM_ROWS):
+            eta = i / float(NUM_ROWS - 1)
+            row = [eta] + [(seed % 97 + 1) * (j + 1) * eta**2 * 1.0e-3 for j in range(NUM_COLS - 1)]
+            f.write(' '.join('%14.6e' % v for v in row) + '\n')
+
+
+def runDeck(deck_path):
+    case_dir = os.path.dirname(os.path.abspath(deck_path))
+    with open(deck_path, 'r') as f:
+        m = FIGURES_PAT.search(f.read())
+    figures = m.group(1).replace('\\', '/').strip() if m else './FIGURES/'
+    figures_dir = os.path.normpath(os.path.join(case_dir, figures))
+    if not os.path.isdir(figures_dir):
+        os.makedirs(figures_dir)
+    names = surveyNames(case_dir)
+    for (n, name) in enumerate(names):
+        writeSurvey(os.path.join(figures_dir, name + '.mdt'), n + len(case_dir))
+    print("stubSolver: wrote %d survey files to %s" % (len(names), figures_dir))
+
+
+def runVABS(input_path):
+    with open(input_path + '.K', 'w') as f:
+        f.write(' The Mass Center of the Cross Section\n\n')
+        f.write('  Xm2 =   0.0000000000E+00\n  Xm3 =   0.0000000000E+00\n\n')
+        f.write(' Mass Per Unit Span                     =   1.0000000000E+02\n')
+        for axis in (1, 2, 3):
+            f.write(' Mass Moments of Intertia about x%d axis =   1.0000000000E+01\n' % axis)
+        f.write('\n Timoshenko Stiffness Matrix (1-extension; 2,3-shear, 4-twist; 5,6-bending)\n')
+        f.write(' -----------------------------------------------------------\n\n')
+        for i in range(6):
+            f.write(''.join('%20.10E' % (1.0e8 if i == j else 0.0) for j in range(6)) + '\n')
+    print("stubSolver: wrote " + input_path + '.K')
+
+
+def main(argv):
+    if len(argv) != 2:
+        print(__doc__)
+        return 2
+    time.sleep(float(os.environ.get('STUB_SOLVER_SLEEP', '0')))
+    if os.environ.get('STUB_SOLVER_FAIL'):
+        return int(os.environ['STUB_SOLVER_FAIL'])
+    if argv[1].endswith('.dym'):
+        runDeck(argv[1])
+    else:
+        runVABS(argv[1])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,227 @@
+"""
+The timeHistory module reads the survey files (FIGURES/*.mdt) of dynamic DYMORE
+analyses, which hold one block of rows (one row per survey point, eta first)
+for every archived time step, one block after another. Such a file grows with
+the length of the simulation, so it is never read whole: it is read in chunks
+of a fixed number of rows, and the reductions over time are kept up to date
+as each chunk is read, in one pass.
+
+The reductions, for every survey point and column, are the largest and
+smallest values (the envelopes) and when they happened, the mean, the RMS, and
+the peak (the largest magnitude) and when it happened. The memory used depends
+on the chunk size and the number of survey points, not on the number of time
+steps.
+
+A survey file of a static analysis is a single block, and is read the same
+way.
+
+Example
+-------
+>>> from DYMORE import DYMOREdeck as dd
+>>> from DYMORE import timeHistory as th
+>>> (start, interval) = th.archiveInterval(dd.readDeck('case/biplane_spar.dym'))
+>>> env = th.envelopes('case/FIGURES/svy_force_EF.mdt', start=start, interval=interval)
+>>> env['max'][:,4], env['time_of_peak'][:,4]   # flapwise bending moment (M2)
+"""
+
+from itertools import islice
+
+import numpy as np
+
+
+# the number of rows read at a time
+CHUNK_ROWS = 65536
+
+
+def archiveInterval(deck):
+    """
+    Return the time of the first archived step and the time between archived
+    steps of a deck: the start of @SIMULATION_TIME_RANGE, and @TIME_STEP_SIZE
+    x @ARCHIVAL_FREQUENCY of its (first) @STEP_CONTROL_PARAMETERS.
+
+    Parameters
+    ----------
+    deck : <DeckFile>
+        The deck, e.g. from DYMOREdeck.readDeck.
+
+    Returns
+    -------
+    start, interval : <float>
+    """
+
+    step = deck.findDefinition('STEP_CONTROL_PARAMETER_NAME', deck.find('STEP_CONTROL_PARAMETER_NAME').text)
+    start = deck.find('SIMULATION_TIME_RANGE').array[0]
+    return (float(start), float(step.find('TIME_STEP_SIZE').array[0]*step.find('ARCHIVAL_FREQUENCY').array[0]))
+
+
+def readBlocks(mdtpath, npoints=None, chunk_rows=CHUNK_ROWS):
+    """
+    Read a time-history survey file a chunk at a time.
+
+    Parameters
+    ----------
+    mdtpath : <string>
+        The path of the .mdt file.
+    npoints : <int>
+        (optional) The number of rows (survey points) in each time step. By
+        default, a time step ends where eta does not increase (it drops back,
+        or, with one survey point, stays the same), since eta increases from
+        one survey point to the next.
+    chunk_rows : <int>
+        The number of rows to read at a time.
+
+    Yields
+    ------
+    first : <int>
+        The index of the first time step in blocks.
+    blocks : <np.array>
+        Shape (nsteps, npoints, ncols): the complete time steps read so far
+        that have not been yielded yet.
+    """
+
+    carry = None
+    eta = None
+    first = 0
+    with open(mdtpath, 'r') as f:
+        while True:
+            lines = list(islice(f, chunk_rows))
+            if not lines:
+                break
+            if not any(line.strip() for line in lines):
+                continue
+            rows = np.loadtxt(lines, dtype=float, ndmin=2)
+            if carry is not None and len(carry):
+                rows = np.vstack([carry, rows])
+            if npoints is None:
+                drops = np.nonzero(np.diff(rows[:,0]) <= 0.0)[0]
+                if len(drops) == 0:
+                    carry = rows
+                    continue
+                npoints = int(drops[0]) + 1
+            nsteps = len(rows) // npoints
+            carry = rows[nsteps*npoints:]
+            if nsteps:
+                blocks = rows[:nsteps*npoints].reshape(nsteps, npoints, -1)
+                if eta is None:
+                    eta = blocks[0,:,0].copy()
+                if not np.array_equal(blocks[:,:,0], np.broadcast_to(eta, blocks.shape[:2])):
+                    raise ValueError("the survey points of %s change between time steps" % mdtpath)
+                yield (first, blocks)
+                first += nsteps
+
+    if carry is not None and len(carry):
+        if npoints is not None:
+            raise ValueError("the last time step of %s is incomplete (%d of %d rows)" % (mdtpath, len(carry), npoints))
+        # a single time step (e.g. a static analysis)
+        yield (first, carry[None,:,:])
+
+
+class Envelope(object):
+    """
+    Running reductions over time of a survey, updated one chunk of time steps
+    at a time.
+
+    Attributes
+    ----------
+    eta : <np.array>
+        The eta-coordinates of the survey points, shape (npoints,).
+    nsteps : <int>
+        The number of time steps so far.
+    The reductions themselves are returned by result.
+    """
+
+    def __init__(self):
+        self.eta = None
+        self.nsteps = 0
+
+    def update(self, blocks, times):
+        """
+        Add time steps.
+
+        Parameters
+        ----------
+        blocks : <np.array>
+            Shape (nsteps, npoints, ncols), eta in column 0.
+        times : <np.array>
+            The time of each step, shape (nsteps,).
+        """
+
+        values = blocks[:,:,1:]
+        times = np.asarray(times, dtype=float)
+        cols = np.arange(values.shape[1])[:,None], np.arange(values.shape[2])[None,:]
+        i_max = values.argmax(axis=0)
+        i_min = values.argmin(axis=0)
+        i_peak = np.abs(values).argmax(axis=0)
+        chunk = {'max': values[(i_max,) + cols], 'min': values[(i_min,) + cols],
+                 'peak': np.abs(values[(i_peak,) + cols])}
+        when = {'max': times[i_max], 'min': times[i_min], 'peak': times[i_peak]}
+        if self.eta is None:
+            self.eta = blocks[0,:,0].copy()
+            self._extreme = chunk
+            self._when = when
+            self._sum = values.sum(axis=0)
+            self._sumsq = np.einsum('ijk,ijk->jk', values, values)
+        else:
+            # strictly better only, so the first time a value is reached is kept
+            for (key, better) in (('max', np.greater), ('min', np.less), ('peak', np.greater)):
+                replace = better(chunk[key], self._extreme[key])
+                self._extreme[key] = np.where(replace, chunk[key], self._extreme[key])
+                self._when[key] = np.where(replace, when[key], self._when[key])
+            self._sum += values.sum(axis=0)
+            self._sumsq += np.einsum('ijk,ijk->jk', values, values)
+        self.nsteps += len(blocks)
+
+    def result(self):
+        """
+        Return the reductions.
+
+        Returns
+        -------
+        env : <dictionary of np.arrays>
+            'eta' (npoints,); 'max', 'min', 'mean', 'rms', 'peak' (the largest
+            |value|), 'time_of_max', 'time_of_min' and 'time_of_peak', each
+            (npoints, ncols-1), one column for each survey column after eta;
+            and 'nsteps'.
+        """
+
+        if self.eta is None:
+            raise ValueError("no time steps were read")
+        return {'eta': self.eta, 'nsteps': self.nsteps,
+                'max': self._extreme['max'], 'min': self._extreme['min'],
+                'mean': self._sum/self.nsteps, 'rms': np.sqrt(self._sumsq/self.nsteps),
+                'peak': self._extreme['peak'], 'time_of_max': self._when['max'],
+                'time_of_min': self._when['min'], 'time_of_peak': self._when['peak']}
+
+
+def envelopes(mdtpath, start=0.0, interval=1.0, times=None, npoints=None, chunk_rows=CHUNK_ROWS):
+    """
+    Read a time-history survey file in one pass, and reduce it over time.
+
+    Parameters
+    ----------
+    mdtpath : <string>
+        The path of the .mdt file.
+    start, interval : <float>
+        The time of the first time step, and the time between steps (see
+        archiveInterval).
+    times : <np.array>
+        (optional) The time of every step, instead of start and interval.
+    npoints, chunk_rows :
+        See readBlocks.
+
+    Returns
+    -------
+    env : <dictionary of np.arrays>
+        See Envelope.result.
+    """
+
+    env = Envelope()
+    for (first, blocks) in readBlocks(mdtpath, npoints, chunk_rows):
+        if times is None:
+            t = start + interval*np.arange(first, first + len(blocks))
+        else:
+            t = np.asarray(times, dtype=float)[first:first + len(blocks)]
+            if len(t) != len(blocks):
+                raise ValueError("%s has more time steps than times" % mdtpath)
+        env.update(blocks, t)
+    return env.result()
@@ -0,0 +1,114 @@
+"""
+Compare the stock meshes (one element between each pair of spar stations)
+with the curvature- and stiffness-adaptive meshes from adaptiveMesh: element
+count, solve time (assemble + factor + solve), and the error in the tip
+displacements and rotations against a reference mesh with every stock element
+split into --refine elements.
+
+The adaptive meshes of one deck are also written into a copy of its case
+directory, and the deck must read back with the new element count.
+
+Usage: from the spardesign directory, type:
+> python -m benchmarks.bench_adaptive_mesh --turn 15 --stiffness-change 0.75
+
+"""
+
+from __future__ import print_function
+import argparse
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from DYMORE import DYMOREdeck as dd
+from DYMORE import adaptiveMesh as am
+from DYMORE import beamAssembly as ba
+from benchmarks.bench_vabs_parse import bestOf
+
+
+DECKS = ['monoplane_spar/%s/1e03/monoplane_spar.dym',
+         'full-height_biplane_spar/%s/1e03/biplane_spar.dym',
+         'half-height_biplane_spar/%s/1e03/biplane_spar.dym']
+
+
+def remesh(graph, meshes):
+    """
+    Return a copy of a beam graph with new element ends for each beam
+    (beam name -> eta-coordinates).
+    """
+
+    beams = []
+    for beam in graph.beams:
+        (ctrl, weights, degree, knots) = beam.curve
+        beams.append(ba.CurvedBeam(ctrl, weights, degree, knots, meshes[beam.name],
+                                   beam.order, beam.prop_eta, beam.prop_S, beam.name))
+    new = ba.BeamGraph(beams, graph.ends)
+    for (vertex, node) in graph.vertices.items():
+        new.fixed[new.vertices[vertex]] = graph.fixed[node]
+    return new
+
+
+def tipResponse(graph, tip, load):
+    P = np.zeros((1, graph.nnodes, 6))
+    P[0,graph.vertices[tip]] = load
+    return ba.SparseStaticSolver(graph).solve(P)[0,graph.vertices[tip]]
+
+
+def checkWrite(pattern):
+    # write the adaptive meshes into a copy of a case, then read it again in
+    # this process (through the deck cache)
+    path = pattern % 'flapwise_tipload'
+    tmp = tempfile.mkdtemp(prefix='bench_adaptive_')
+    try:
+        case = os.path.join(tmp, 'case')
+        shutil.copytree(os.path.dirname(path), case)
+        copy = os.path.join(case, os.path.basename(path))
+        before = ba.readBeamGraph(dd.readDeck(copy)).nelem
+        meshes = am.adaptDeck(copy, write=True)
+        after = ba.readBeamGraph(dd.readDeck(copy)).nelem
+    finally:
+        shutil.rmtree(tmp)
+    expected = sum(len(eta) - 1 for eta in meshes.values())
+    assert after == expected, "read %d elements after writing %d" % (after, expected)
+    return (before, after)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--turn', type=float, default=np.degrees(am.MAX_TURN), help="largest turn per element [deg]")
+    parser.add_argument('--stiffness-change', type=float, default=am.MAX_STIFFNESS_CHANGE)
+    parser.add_argument('--refine', type=int, default=16)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print("%-26s %-18s %8s %8s %10s %10s" % ('spar', 'load', 'mesh', 'elements', 'time [s]', 'tip error'))
+    for pattern in DECKS:
+        for load in ('flapwise_tipload', 'torsional_tipload'):
+            deck = dd.readDeck(pattern % load)
+            graph = ba.readBeamGraph(deck)
+            loads = ba.readDeadLoads(deck, graph)
+            tip = [v for (v, node) in graph.vertices.items() if loads[node].any()][0]
+
+            fine = {}
+            adaptive = {}
+            for beam in graph.beams:
+                e = beam.elem_eta
+                fine[beam.name] = np.append((e[:-1,None] + np.diff(e)[:,None]*np.linspace(0.0, 1.0, args.refine + 1)[:-1]).ravel(), 1.0)
+                adaptive[beam.name] = am.adaptiveEtas(beam.curve, beam.prop_eta, beam.prop_S,
+                                                      np.radians(args.turn), args.stiffness_change)
+            reference = tipResponse(remesh(graph, fine), tip, loads[graph.vertices[tip]])
+            scale = np.abs(reference).max()
+
+            spar = pattern.split('/')[0]
+            for (name, g) in (('stock', graph), ('adaptive', remesh(graph, adaptive))):
+                t = bestOf(lambda gr: tipResponse(gr, tip, loads[graph.vertices[tip]]), g, args.repeat)
+                error = np.abs(tipResponse(g, tip, loads[graph.vertices[tip]]) - reference).max()/scale
+                print("%-26s %-18s %8s %8d %10.5f %10.1e" % (spar, load, name, g.nelem, t, error))
+
+    (before, after) = checkWrite(DECKS[1])
+    print("written and read back:     %d -> %d elements" % (before, after))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Time the sparse multi-beam solver on the biplane spar, re-meshed with more and
+more elements (the beams, joints and properties stay the same), to show that
+assembly, factorization and solve times grow close to linearly with the number
+of elements.
+
+Usage: from the spardesign directory, type:
+> python -m benchmarks.bench_beam_assembly --max-elements 100000
+
+"""
+
+from __future__ import print_function
+import argparse
+import time
+
+import numpy as np
+
+from DYMORE import DYMOREdeck as dd
+from DYMORE import beamAssembly as ba
+
+
+def remesh(graph, nelem):
+    """
+    Return a copy of a beam graph with about nelem elements in all, shared
+    between the beams in proportion to their lengths.
+    """
+
+    total = sum(beam.length for beam in graph.beams)
+    beams = []
+    for beam in graph.beams:
+        n = max(1, int(round(nelem*beam.length/total)))
+        (ctrl, weights, degree, knots) = beam.curve
+        beams.append(ba.CurvedBeam(ctrl, weights, degree, knots, np.linspace(0.0, 1.0, n + 1),
+                                   beam.order, beam.prop_eta, beam.prop_S, beam.name, M=beam.prop_M))
+    fine = ba.BeamGraph(beams, graph.ends)
+    for (vertex, node) in graph.vertices.items():
+        fine.fixed[fine.vertices[vertex]] = graph.fixed[node]
+    return fine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--max-elements', type=int, default=100000)
+    parser.add_argument('--deck', default='full-height_biplane_spar/flapwise_tipload/1e03/biplane_spar.dym')
+    args = parser.parse_args()
+
+    deck = dd.readDeck(args.deck)
+    graph = ba.readBeamGraph(deck)
+    loads = np.array([ba.readDeadLoads(deck, graph)])
+    tip = [v for (v, node) in graph.vertices.items() if loads[0,node].any()][0]
+
+    print("%9s %9s %10s %10s %10s %10s %12s" % ('elements', 'dof', 'assemble', 'factor', 'solve', 'total', 'tip u3'))
+    nelem = 100
+    while nelem <= args.max_elements:
+        fine = remesh(graph, nelem)
+        P = np.zeros((1, fine.nnodes, 6))
+        P[0,fine.vertices[tip]] = loads[0,graph.vertices[tip]]
+
+        t0 = time.time()
+        K = fine.assemble()
+        t1 = time.time()
+        solver = ba.SparseStaticSolver(fine, K=K)
+        t2 = time.time()
+        U = solver.solve(P)
+        t3 = time.time()
+        print("%9d %9d %10.4f %10.4f %10.4f %10.4f %12.6e" % (fine.nelem, len(solver.free),
+              t1 - t0, t2 - t1, t3 - t2, t3 - t0, U[0,fine.vertices[tip],2]))
+        nelem *= 10
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Solve the monoplane spar under many tip loads with the built-in static beam
+solver: once with a new assembly and factorization for every load case, and once
+with one factorization and a single multi-right-hand-side solve.
+
+Usage: from the spardesign directory, type:
+> python -m benchmarks.bench_beam_solver --cases 64
+
+"""
+
+from __future__ import print_function
+import argparse
+import time
+
+import numpy as np
+
+from DYMORE import DYMOREdeck as dd
+from DYMORE import beamSolver as bs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--cases', type=int, default=64, help="number of load cases")
+    parser.add_argument('--deck', default='monoplane_spar/flapwise_tipload/1e03/monoplane_spar.dym')
+    args = parser.parse_args()
+
+    deck = dd.readDeck(args.deck)
+    beam = bs.readBeam(deck)
+    rng = np.random.RandomState(0)
+    loads = np.zeros((args.cases, beam.nnodes, 6))
+    loads[:,-1,:] = rng.uniform(-1.0e5, 1.0e5, (args.cases, 6))
+
+    t0 = time.time()
+    U_each = np.array([bs.StaticSolver(beam, beam.fixed).solve(P)[0] for P in loads])
+    t_each = time.time() - t0
+
+    t0 = time.time()
+    U_all = bs.StaticSolver(beam, beam.fixed).solve(loads)
+    t_all = time.time() - t0
+
+    assert np.allclose(U_each, U_all, rtol=1.0e-10, atol=1.0e-14)
+    print("beam: %s, %d elements of order %d, %d dof" % (beam.name, beam.nelem, beam.order, beam.ndof))
+    print("load cases:                        %d" % args.cases)
+    print("factor per case:                   %8.4f s" % t_each)
+    print("factor once, multi-RHS solve:      %8.4f s" % t_all)
+    print("speedup:                           %8.1fx" % (t_each/t_all))
+
+
+if __name__ == '__main__':
+    main()
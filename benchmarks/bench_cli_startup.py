@@ -0,0 +1,77 @@
+"""
+Measure the startup time of the spardesign command (python -m DYMORE.cli) for
+each subcommand's --help, and for generating a small case tree, against the
+time to start Python and do nothing. Also list which of NumPy, SciPy and
+matplotlib each command imported (from python -X importtime).
+
+Usage: from the spardesign directory, type:
+> python -m benchmarks.bench_cli_startup --repeat 10
+
+"""
+
+from __future__ import print_function
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+HEAVY = ('numpy', 'scipy', 'matplotlib')
+
+# the startup budget for commands that do not plot [s]
+BUDGET = 0.100
+
+
+def timeCommand(argv, repeat, setup=None):
+    # best wall-clock time of a command, in a new process each time
+    best = float('inf')
+    for n in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        subprocess.check_call(argv, stdout=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def heavyImports(argv, setup=None):
+    if setup is not None:
+        setup()
+    p = subprocess.run(argv[:1] + ['-X', 'importtime'] + argv[1:], stdout=subprocess.DEVNULL,
+                       stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    names = set(line.rsplit('|', 1)[-1].strip() for line in p.stderr.splitlines())
+    return [m for m in HEAVY if m in names]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    tmp = tempfile.mkdtemp()
+    sweep = os.path.join(tmp, 'sweep')
+    clean = lambda: shutil.rmtree(sweep, ignore_errors=True)
+    cli = [sys.executable, '-m', 'DYMORE.cli']
+    commands = [('python (nothing)', [sys.executable, '-c', 'pass'], None),
+                ('--help', cli + ['--help'], None)]
+    for sub in ('convert', 'mkblock', 'generate', 'run', 'ingest', 'plot'):
+        commands.append((sub + ' --help', cli + [sub, '--help'], None))
+    commands.append(('generate (3 cases)', cli + ['generate', sweep, '--templates', root, '--loads',
+                                                  'flapwise_tipload', '--magnitudes', '1e3'], clean))
+
+    try:
+        print("%-22s %10s %8s  %s" % ('command', 'time [ms]', 'budget', 'heavy imports'))
+        for (name, argv, setup) in commands:
+            t = timeCommand(argv, args.repeat, setup)
+            heavy = heavyImports(argv, setup)
+            print("%-22s %10.1f %8s  %s" % (name, 1.0e3*t, 'ok' if t < BUDGET else 'OVER', ', '.join(heavy) or '-'))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Parse every DYMORE deck (*.dym) in the case tree, with all of its
+@INCLUDE_COMMAND files, and check that each file round-trips unchanged.
+
+Usage: from the spardesign directory, type:
+> python -m benchmarks.bench_deck_parse
+
+"""
+
+from __future__ import print_function
+import glob
+import time
+
+from DYMORE import DYMOREdeck as dd
+
+
+def main():
+    dym_paths = sorted(glob.glob('*/*/*/*.dym'))
+
+    t0 = time.time()
+    decks = [dd.readDeck(p) for p in dym_paths]
+    files = [f for deck in decks for f in deck.iterFiles()]
+    t_cold = time.time() - t0
+
+    t0 = time.time()
+    decks = [dd.readDeck(p) for p in dym_paths]
+    files = [f for deck in decks for f in deck.iterFiles()]
+    t_warm = time.time() - t0
+
+    nbytes = 0
+    for f in files:
+        with open(f.path, 'r', newline='') as fh:
+            original = fh.read()
+        assert f.toString() == original, "round trip changed " + f.path
+        nbytes += len(original)
+
+    print("decks:                 %d" % len(decks))
+    print("files (with includes): %d  (%.1f MB)" % (len(files), nbytes/1.0e6))
+    print("parse, cold cache:     %8.4f s" % t_cold)
+    print("parse, warm cache:     %8.4f s" % t_warm)
+    print("all files round-trip unchanged")
+
+
+if __name__ == '__main__':
+    main()
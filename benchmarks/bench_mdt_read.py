@@ -0,0 +1,70 @@
+"""
+Read a set of synthetic DYMORE survey files (the five biplane segments) with
+np.loadtxt, and with mdtReader: once to parse them and write the binary
+sidecars, then again from the sidecars.
+
+Usage: from the spardesign directory, type:
+> python -m benchmarks.bench_mdt_read --rows 10000 --repeat 5
+
+"""
+
+from __future__ import print_function
+import argparse
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from DYMORE import mdtReader as mdt
+from benchmarks.bench_vabs_parse import bestOf
+
+
+def writeSyntheticSurvey(path, nrows, rng):
+    """
+    Write a .mdt file with nrows rows of eta and 6 result columns.
+    """
+
+    data = np.empty((nrows, 7))
+    data[:,0] = np.linspace(0.0, 1.0, nrows)
+    data[:,1:] = rng.standard_normal((nrows, 6))*10.0**rng.randint(-8, 6, 6)
+    np.savetxt(path, data, fmt='%14.6e')
+    return data
+
+
+def readCold(figures_dir):
+    mdt.clearSidecars(figures_dir)
+    return mdt.readSegments(figures_dir, 'svy_force')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=10000, help="rows in each survey file")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    try:
+        rng = np.random.RandomState(0)
+        paths = [os.path.join(tmp, 'svy_force_%s.mdt' % s) for s in mdt.BIPLANE_SEGMENTS]
+        expected = [writeSyntheticSurvey(p, args.rows, rng) for p in paths]
+
+        t_loadtxt = bestOf(lambda ps: [np.loadtxt(p) for p in ps], paths, args.repeat)
+        t_cold = bestOf(readCold, tmp, args.repeat)
+        t_warm = bestOf(lambda d: mdt.readSegments(d, 'svy_force'), tmp, args.repeat)
+
+        for (path, data, exp) in zip(paths, mdt.readSegments(tmp, 'svy_force'), expected):
+            assert np.array_equal(data, np.loadtxt(path))
+            assert np.allclose(data, exp, rtol=1.0e-6)
+    finally:
+        shutil.rmtree(tmp)
+
+    print("survey files:               5 x %d rows x 7 columns" % args.rows)
+    print("np.loadtxt:                 %8.4f s" % t_loadtxt)
+    print("first read (parse + save):  %8.4f s" % t_cold)
+    print("later reads (sidecar mmap): %8.4f s" % t_warm)
+    print("speedup over np.loadtxt:    %8.0fx" % (t_loadtxt/t_warm))
+
+
+if __name__ == '__main__':
+    main()
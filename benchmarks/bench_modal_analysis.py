@@ -0,0 +1,63 @@
+"""
+Time the sparse shift-invert modal analysis (modalAnalysis.SparseModalSolver)
+on the biplane spar, re-meshed with more and more elements (the beams, joints
+and properties stay the same, see bench_beam_assembly), and show that the
+lowest natural frequencies converge as the mesh is refined.
+
+The eigensolve (factoring K and the Lanczos iterations) is timed apart from
+the assembly of the stiffness and mass matrices, which the static solver
+needs as well.
+
+Usage: from the spardesign directory, type:
+> python -m benchmarks.bench_modal_analysis --max-elements 30000 --order 1
+
+"""
+
+from __future__ import print_function
+import argparse
+import time
+
+from DYMORE import DYMOREdeck as dd
+from DYMORE import beamAssembly as ba
+from DYMORE import modalAnalysis as ma
+from benchmarks.bench_beam_assembly import remesh
+
+
+SIZES = [1000, 3000, 10000, 30000, 100000]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--max-elements', type=int, default=30000)
+    parser.add_argument('--order', type=int, default=None, help="the order of the elements (default: the deck's)")
+    parser.add_argument('--modes', type=int, default=10)
+    parser.add_argument('--deck', default='full-height_biplane_spar/flapwise_tipload/1e03/biplane_spar.dym')
+    args = parser.parse_args()
+
+    graph = ba.readBeamGraph(dd.readDeck(args.deck))
+    if args.order is not None:
+        for beam in graph.beams:
+            beam.order = args.order
+
+    print("%9s %9s %10s %10s %10s %10s %10s %10s" % ('elements', 'dof', 'assemble', 'setup', 'eigensolve',
+                                                   'f1 [Hz]', 'f%d [Hz]' % args.modes, 'f1 change'))
+    last = None
+    for nelem in [n for n in SIZES if n <= args.max_elements]:
+        fine = remesh(graph, nelem)
+
+        t0 = time.perf_counter()
+        (K, M) = (fine.assemble(), fine.assembleMass())
+        t1 = time.perf_counter()
+        solver = ma.SparseModalSolver(fine, K=K, M=M)
+        t2 = time.perf_counter()
+        (eigenvalues, U) = solver.solve(args.modes)
+        t3 = time.perf_counter()
+        f = ma.frequencies(eigenvalues)
+        change = '' if last is None else '%10.2e' % (f[0]/last - 1.0)
+        print("%9d %9d %10.4f %10.4f %10.4f %10.6f %10.6f %10s" % (fine.nelem, len(solver.free), t1 - t0,
+              t2 - t1, t3 - t2, f[0], f[-1], change))
+        last = f[0]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Evaluate a NURBS curve at many parameters, and map many x1-coordinates to
+eta-coordinates, with a point-by-point port of the nurbs-1.3.6 toolbox
+(findspan.m, basisfun.m, nrbeval.m and x1_to_eta.m, one parameter at a time)
+and with the batched functions in the nurbs module (one call for every
+parameter). For dense meshes, also compare the batched bisection (x1ToEta)
+with the lookup table + Newton inverse (invertCoordinate).
+
+Usage: from the spardesign directory, type:
+> python -m benchmarks.bench_nurbs --points 10000 --ctrl 40
+
+"""
+
+from __future__ import print_function
+import argparse
+
+import numpy as np
+
+from DYMORE import nurbs
+from benchmarks.bench_vabs_parse import bestOf
+
+
+def findspan(n, p, u, U):
+    # findspan.m, for one parameter (n is the number of control points - 1)
+    if u == U[n+1]:
+        return n
+    return int(np.nonzero(u >= U)[0][-1])
+
+
+def basisfun(i, u, p, U):
+    # basisfun.m, for one parameter
+    N = [1.0] + [0.0]*p
+    left = [0.0]*(p + 1)
+    right = [0.0]*(p + 1)
+    for j in range(1, p + 1):
+        left[j] = u - U[i+1-j]
+        right[j] = U[i+j] - u
+        saved = 0.0
+        for r in range(j):
+            temp = N[r]/(right[r+1] + left[j-r])
+            N[r] = saved + right[r+1]*temp
+            saved = left[j-r]*temp
+        N[j] = saved
+    return N
+
+
+def nrbeval(ctrl, weights, degree, knots, u):
+    # nrbeval.m, one parameter at a time: weight the control points, sum the
+    # nonzero basis functions, and divide out the weight
+    cw = np.hstack([ctrl*weights[:,None], weights[:,None]])
+    out = np.empty((len(u), ctrl.shape[1]))
+    for (m, um) in enumerate(u):
+        s = findspan(len(ctrl) - 1, degree, um, knots)
+        N = basisfun(s, um, degree, knots)
+        p = np.zeros(cw.shape[1])
+        for a in range(degree + 1):
+            p += N[a]*cw[s-degree+a]
+        out[m] = p[:-1]/p[-1]
+    return out
+
+
+def x1_to_eta(curve, x1, tol=1.0e-6):
+    # x1_to_eta.m, for one x1-coordinate
+    eta = 0.5
+    p = nrbeval(*curve, [eta])[0]
+    increment = 0.25
+    while abs(p[0] - x1) > tol:
+        eta += -increment if p[0] > x1 else increment
+        p = nrbeval(*curve, [eta])[0]
+        increment /= 2.0
+    return eta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--points', type=int, default=10000, help="parameters to evaluate")
+    parser.add_argument('--ctrl', type=int, default=40, help="control points of the test curve")
+    parser.add_argument('--degree', type=int, default=3)
+    parser.add_argument('--stations', type=int, default=200, help="x1-coordinates to map to eta")
+    parser.add_argument('--queries', type=int, default=20000, help="x1-coordinates for the batched inverses")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    # a wavy rational curve along x1, with interior knots
+    rng = np.random.RandomState(0)
+    n = args.ctrl
+    ctrl = np.zeros((n, 3))
+    ctrl[:,0] = np.linspace(0.0, 91.9, n)
+    ctrl[:,2] = rng.uniform(-5.0, 5.0, n)
+    weights = rng.uniform(0.5, 2.0, n)
+    knots = np.concatenate([np.zeros(args.degree), np.linspace(0.0, 1.0, n - args.degree + 1), np.ones(args.degree)])
+    curve = (ctrl, weights, args.degree, knots)
+    u = np.linspace(0.0, 1.0, args.points)
+
+    t_old = bestOf(lambda v: nrbeval(ctrl, weights, args.degree, knots, v), u, args.repeat)
+    t_new = bestOf(lambda v: nurbs.curveDerivatives(ctrl, weights, args.degree, knots, v, 0)[0], u, args.repeat)
+    error = np.abs(nrbeval(ctrl, weights, args.degree, knots, u) - nurbs.curveDerivatives(ctrl, weights, args.degree, knots, u, 0)[0]).max()
+
+    x1 = np.linspace(0.0, 91.9, args.stations)
+    s_old = bestOf(lambda v: [x1_to_eta(curve, x) for x in v], x1, args.repeat)
+    s_new = bestOf(lambda v: nurbs.x1ToEta(ctrl, weights, args.degree, knots, v), x1, args.repeat)
+    eta_error = np.abs(np.array([x1_to_eta(curve, x) for x in x1]) - nurbs.x1ToEta(ctrl, weights, args.degree, knots, x1)).max()
+
+    xq = np.sort(rng.uniform(0.0, 91.9, args.queries))
+    table = nurbs.inverseTable(*curve)
+    b_old = bestOf(lambda v: nurbs.x1ToEta(ctrl, weights, args.degree, knots, v), xq, args.repeat)
+    b_new = bestOf(lambda v: nurbs.invertCoordinate(ctrl, weights, args.degree, knots, v, table=table), xq, args.repeat)
+    residual = np.abs(nurbs.curveDerivatives(ctrl, weights, args.degree, knots, nurbs.invertCoordinate(*curve, xq), 0)[0][:,0] - xq).max()
+
+    print("curve:                   %d control points, degree %d" % (n, args.degree))
+    print("evaluate %6d points" % args.points)
+    print("  per-point toolbox:     %8.4f s" % t_old)
+    print("  curveDerivatives:      %8.4f s" % t_new)
+    print("  speedup:               %8.0fx" % (t_old/t_new))
+    print("  max difference:        %8.1e" % error)
+    print("map %6d x1 to eta" % args.stations)
+    print("  per-point x1_to_eta:   %8.4f s" % s_old)
+    print("  x1ToEta:               %8.4f s" % s_new)
+    print("  speedup:               %8.0fx" % (s_old/s_new))
+    print("  max difference:        %8.1e" % eta_error)
+    print("map %6d x1 to eta" % args.queries)
+    print("  x1ToEta (bisection):   %8.4f s" % b_old)
+    print("  invertCoordinate:      %8.4f s" % b_new)
+    print("  speedup:               %8.1fx" % (b_old/b_new))
+    print("  max |x1(eta) - x1|:    %8.1e" % residual)
+
+
+if __name__ == '__main__':
+    main()
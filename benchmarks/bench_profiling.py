@@ -0,0 +1,66 @@
+"""
+Measure what the profiling hooks cost: a loop of writeDymoreMK calls (the
+smallest instrumented function that is called once per station) before
+profiling was ever turned on, after it was turned off again, and while it is
+on; and a loop of empty profiling.span() blocks while profiling is off.
+
+Usage: from the spardesign directory, type:
+> python -m benchmarks.bench_profiling --calls 20000
+
+"""
+
+from __future__ import print_function
+import argparse
+import io
+
+from DYMORE import DYMOREutilities as du
+from DYMORE import profiling
+from benchmarks import fixtures
+from benchmarks.bench_vabs_parse import bestOf
+
+
+def writeAll(props):
+    (eta, cm_x2, cm_x3, mpus, i1, i2, i3, K) = props
+    f = io.StringIO()
+    for n in range(len(eta)):
+        du.writeDymoreMK(f, 'ETA_COORDINATE', eta[n], cm_x2[n], cm_x3[n], mpus[n], i1[n], i2[n], i3[n], K[n])
+
+
+def emptySpans(calls):
+    for n in range(calls):
+        with profiling.span('empty'):
+            pass
+
+
+def emptyLoop(calls):
+    for n in range(calls):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--calls', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    props = fixtures.syntheticProperties(args.calls)
+    original = du.writeDymoreMK
+    t_never = bestOf(writeAll, props, args.repeat)
+    with profiling.profile() as profiler:
+        t_on = bestOf(writeAll, props, args.repeat)
+    assert du.writeDymoreMK is original
+    t_off = bestOf(writeAll, props, args.repeat)
+    t_loop = bestOf(emptyLoop, args.calls, args.repeat)
+    t_span = bestOf(emptySpans, args.calls, args.repeat)
+
+    print("writeDymoreMK x %d" % args.calls)
+    print("  never profiled:        %8.4f s" % t_never)
+    print("  profiling turned off:  %8.4f s  (%+.1f%%)" % (t_off, 100.0*(t_off/t_never - 1.0)))
+    print("  profiling on:          %8.4f s  (%+.2f us per call, %d spans)" % (t_on, 1.0e6*(t_on - t_never)/args.calls,
+                                                                             len(profiler.events)))
+    print("empty profiling.span() x %d, profiling off" % args.calls)
+    print("  cost per span:         %8.3f us" % (1.0e6*(t_span - t_loop)/args.calls))
+
+
+if __name__ == '__main__':
+    main()
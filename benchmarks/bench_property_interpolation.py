@@ -0,0 +1,65 @@
+"""
+Interpolate the cross-sectional properties of the spar beams to a dense mesh
+with propertyInterpolation (the Cholesky factors of the stiffness matrices,
+linear or PCHIP) and term by term (beamSolver.interpolateProperties): the time
+for --points eta-coordinates, the smallest eigenvalue of any interpolated
+stiffness matrix, and the leave-one-out (held-out station) errors.
+
+Usage: from the spardesign directory, type:
+> python -m benchmarks.bench_property_interpolation --points 10000
+
+"""
+
+from __future__ import print_function
+import argparse
+
+import numpy as np
+
+from DYMORE import DYMOREdeck as dd
+from DYMORE import beamSolver as bs
+from DYMORE import propertyInterpolation as pi
+from benchmarks.bench_vabs_parse import bestOf
+
+
+PROPERTIES = [('monoplane_spar/flapwise_tipload/1e03/monoplane_spar.dym', 'propSpar'),
+              ('full-height_biplane_spar/flapwise_tipload/1e03/biplane_spar.dym', 'propCD'),
+              ('full-height_biplane_spar/flapwise_tipload/1e03/biplane_spar.dym', 'propEF')]
+
+
+def termwiseErrors(eta, K):
+    # leave-one-out errors of term-by-term linear interpolation
+    err = []
+    for j in range(1, len(eta) - 1):
+        keep = np.arange(len(eta)) != j
+        S = bs.interpolateProperties(eta[keep], K[keep], eta[j:j+1])[0]
+        err.append(np.linalg.norm(S - K[j])/np.linalg.norm(K[j]))
+    return np.array(err)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--points', type=int, default=10000, help="eta-coordinates to interpolate to")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    eta = np.linspace(0.0, 1.0, args.points)
+    print("%-10s %-8s %10s %12s %12s %12s %12s" % ('property', 'method', 'time [s]', 'min eig', 'max K err', 'max m err', 'max I err'))
+    for (deck, name) in PROPERTIES:
+        node = bs._definition(dd.readDeck(deck), 'BEAM_PROPERTY_NAME', name)
+        (coord, cm_x2, cm_x3, mpus, i1, i2, i3, K) = dd.readBeamProperties(node)
+
+        t = bestOf(lambda e: bs.interpolateProperties(coord, K, e), eta, args.repeat)
+        eig = np.linalg.eigvalsh(bs.interpolateProperties(coord, K, eta)).min()
+        print("%-10s %-8s %10.5f %12.4e %12.4f %12s %12s" % (name, 'termwise', t, eig, termwiseErrors(coord, K).max(), '-', '-'))
+
+        for kind in pi.KINDS:
+            props = pi.PropertyInterpolator(coord, cm_x2, cm_x3, mpus, i1, i2, i3, K, kind=kind)
+            t = bestOf(props, eta, args.repeat)
+            eig = np.linalg.eigvalsh(props(eta)[6]).min()
+            err = props.heldOutErrors()
+            print("%-10s %-8s %10.5f %12.4e %12.4f %12.4f %12.4f" % (name, kind, t, eig, err['stiffness'].max(),
+                                                                      err['mass'].max(), err['inertia'].max()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Write a props file from N synthetic VABS output files with the station-by-station
+loop (writeMKmatrices: read, parse, write, next station) and with the
+prefetching pipeline (streamBeamPropertyDefinition), with the files dropped
+from the page cache before each run, so every read goes to the disk.
+
+The page cache is dropped with posix_fadvise(POSIX_FADV_DONTNEED), which needs
+no special permissions but only works on Linux (and not on every file system;
+on a RAM disk such as tmpfs the reads are always warm). Use --dir to put the
+files on the disk to be measured, e.g. a network home directory.
+
+Usage: from the spardesign directory, type:
+> python -m benchmarks.bench_props_pipeline --stations 2000 --workers 8 --dir ~/bench_vabs
+
+"""
+
+from __future__ import print_function
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from DYMORE import DYMOREutilities as du
+from benchmarks import fixtures
+
+
+def dropCache(paths):
+    """
+    Ask the kernel to drop files from the page cache. Returns False if it
+    cannot be asked.
+    """
+
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    return True
+
+
+def stationLoop(paths, coord, out_path):
+    # the current path: one station at a time, as in makeSingleMKblock
+    with open(out_path, 'w') as f:
+        f.write(du.propertyHeader('propSynthetic', 'ETA_COORDINATE'))
+        for (path, eta) in zip(paths, coord):
+            du.writeMKmatrices(f, path, {'eta': eta})
+        f.write(du.propertyFooter())
+
+
+def pipeline(paths, coord, out_path, workers, prefetch):
+    with open(out_path, 'w') as f:
+        du.streamBeamPropertyDefinition(f, 'propSynthetic', 'ETA_COORDINATE', paths, coord,
+                                        workers=workers, prefetch=prefetch)
+
+
+def coldBestOf(func, paths, repeat):
+    best = float('inf')
+    for r in range(repeat):
+        dropCache(paths)
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--stations', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--prefetch', type=int, default=None, help="stations read ahead (default: 4*workers)")
+    parser.add_argument('--dir', default=None, help="where to write the VABS files (default: a temporary directory)")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='bench_props_', dir=args.dir)
+    try:
+        paths = fixtures.writeMKfiles(os.path.join(tmp, 'vabs'), args.stations)
+        coord = [n/(args.stations - 1.0) for n in range(args.stations)]
+        (old_path, new_path) = (os.path.join(tmp, 'loop_props.dat'), os.path.join(tmp, 'pipeline_props.dat'))
+        cold = dropCache(paths)
+
+        t_loop = coldBestOf(lambda: stationLoop(paths, coord, old_path), paths, args.repeat)
+        t_pipe = coldBestOf(lambda: pipeline(paths, coord, new_path, args.workers, args.prefetch), paths, args.repeat)
+        with open(old_path) as f_old, open(new_path) as f_new:
+            assert f_old.read() == f_new.read(), "the pipeline wrote a different props file"
+    finally:
+        shutil.rmtree(tmp)
+
+    print("stations:               %d  (%s file cache)" % (args.stations, 'cold' if cold else 'warm'))
+    print("station-by-station:     %8.4f s" % t_loop)
+    print("pipeline (%2d threads):  %8.4f s" % (args.workers, t_pipe))
+    print("speedup:                %8.2fx" % (t_loop/t_pipe))
+    print("props files are identical")
+
+
+if __name__ == '__main__':
+    main()
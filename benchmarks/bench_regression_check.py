@@ -0,0 +1,92 @@
+"""
+Time the golden-result regression check (regressionCheck.checkTree) of a
+synthetic case tree with every case of the case matrix (3 spar types x 2 load
+types x 4 magnitudes = 24 cases, 176 survey files): after every survey was
+written again (as after the beam properties were regenerated and every case
+was run again), when nothing changed, and the vectorized comparison alone.
+
+One value of one survey is changed by more than its tolerance before the check,
+and the check must find it, as the worst station of its case, and pass every
+other case.
+
+Usage: from the spardesign directory, type:
+> python -m benchmarks.bench_regression_check --rows 37
+
+"""
+
+from __future__ import print_function
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from DYMORE import caseGenerator as cg
+from DYMORE import regressionCheck as rc
+from DYMORE import resultsDatabase as rdb
+from benchmarks import fixtures
+
+
+def writeTree(root, rows):
+    labels = [cg.magnitudeLabel(m) for m in cg.CASE_MATRIX['magnitudes']]
+    return fixtures.writeCaseTree(root, rows, loads=cg.CASE_MATRIX['loads'], magnitude_labels=labels)
+
+
+def perturb(path, row, factor):
+    # change the largest value of a row; returns its column
+    data = np.loadtxt(path, ndmin=2)
+    column = 1 + np.abs(data[row,1:]).argmax()
+    data[row,column] *= factor
+    with open(path, 'w') as f:
+        f.write(('%14.6e'*data.shape[1] + '\n')*len(data) % tuple(data.ravel().tolist()))
+    return column
+
+
+def timed(func):
+    t0 = time.perf_counter()
+    result = func()
+    return (result, time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=37, help="rows in each survey")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='bench_regression_')
+    try:
+        (root, baseline) = (os.path.join(tmp, 'tree'), os.path.join(tmp, 'baseline'))
+        paths = writeTree(root, args.rows)
+        rc.saveBaseline(root, baseline)
+
+        # run every case again, and change one value of one survey by 1e-4
+        writeTree(root, args.rows)
+        target = [p for p in paths if p.endswith('svy_force_EF.mdt')][-1]
+        column = rdb.VALUE_NAMES['force'][perturb(target, args.rows//2, 1.0 + 1.0e-4) - 1]
+
+        (report, t_cold) = timed(lambda: rc.checkTree(root, baseline))
+        (again, t_warm) = timed(lambda: rc.checkTree(root, baseline))
+        current = rdb.ResultsDatabase(os.path.join(root, rc.WORK_DIRNAME))
+        reference = rdb.ResultsDatabase(baseline)
+        (_, t_compare) = timed(lambda: rc.compare(current, reference))
+    finally:
+        shutil.rmtree(tmp)
+
+    failed = [c for c in report['cases'] if not c['passed']]
+    assert len(failed) == 1 and failed[0]['failures'] == 1, "the check did not find exactly the changed value"
+    assert failed[0]['column'] == column and target.replace(os.sep, '/').endswith(failed[0]['survey'])
+    assert again['cases'] == report['cases']
+
+    print("cases:                     %d  (%d survey files, %d rows each, %d values)"
+          % (len(report['cases']), len(paths), args.rows, report['values']))
+    print("check, every survey new:   %8.4f s" % t_cold)
+    print("check, nothing changed:    %8.4f s" % t_warm)
+    print("comparison alone:          %8.4f s" % t_compare)
+    print("found the changed value:   %s, %s at eta = %.3f (error/tol = %.1f)"
+          % (failed[0]['survey'], column, failed[0]['eta'], failed[0]['ratio']))
+
+
+if __name__ == '__main__':
+    main()
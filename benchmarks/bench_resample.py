@@ -0,0 +1,78 @@
+"""
+Resample a sweep of synthetic force surveys onto the 24 spar stations, with the
+old per-point extrap1d closure (one interp1d call per station and column) and
+with resample.resampleSurvey (one call for the whole sweep).
+
+Usage: from the spardesign directory, type:
+> python -m benchmarks.bench_resample --cases 200 --rows 120
+
+"""
+
+from __future__ import print_function
+import argparse
+
+import numpy as np
+from scipy.interpolate import interp1d
+
+from DYMORE import resample as rs
+from benchmarks.bench_vabs_parse import bestOf
+
+
+def extrap1d(interpolator):
+    # the helper the plot scripts used to carry (with np.array in place of
+    # scipy.array, which SciPy no longer has)
+    xs = interpolator.x
+    ys = interpolator.y
+
+    def pointwise(x):
+        if x < xs[0]:
+            return ys[0]+(x-xs[0])*(ys[1]-ys[0])/(xs[1]-xs[0])
+        elif x > xs[-1]:
+            return ys[-1]+(x-xs[-1])*(ys[-1]-ys[-2])/(xs[-1]-xs[-2])
+        else:
+            return interpolator(x)
+
+    def ufunclike(xs):
+        return np.array(list(map(pointwise, np.array(xs))))
+
+    return ufunclike
+
+
+def resamplePointwise(surveys, scale):
+    out = np.empty((len(surveys), len(rs.X1_STATIONS), surveys.shape[2]))
+    for (c, data) in enumerate(surveys):
+        x = data[:,0]*scale
+        out[c,:,0] = rs.X1_STATIONS
+        for j in range(1, data.shape[1]):
+            out[c,:,j] = extrap1d(interp1d(x, data[:,j]))(rs.X1_STATIONS)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--cases', type=int, default=200)
+    parser.add_argument('--rows', type=int, default=120, help="Gauss points in each survey")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(0)
+    surveys = np.empty((args.cases, args.rows, 7))
+    # Gauss points do not reach the ends of the spar, so the first and last
+    # stations are extrapolated
+    surveys[:,:,0] = np.linspace(0.005, 0.995, args.rows)
+    surveys[:,:,1:] = rng.standard_normal((args.cases, args.rows, 6))
+    B = 91.9
+
+    t_old = bestOf(lambda s: resamplePointwise(s, B), surveys, args.repeat)
+    t_new = bestOf(lambda s: rs.resampleSurvey(s, rs.X1_STATIONS, scale=B), surveys, args.repeat)
+    error = np.abs(resamplePointwise(surveys, B) - rs.resampleSurvey(surveys, rs.X1_STATIONS, scale=B)).max()
+
+    print("surveys:                 %d cases x %d rows x 7 columns" % (args.cases, args.rows))
+    print("extrap1d + interp1d:     %8.4f s" % t_old)
+    print("resampleSurvey:          %8.4f s" % t_new)
+    print("speedup:                 %8.0fx" % (t_old/t_new))
+    print("max difference:          %8.1e" % error)
+
+
+if __name__ == '__main__':
+    main()
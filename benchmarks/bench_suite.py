@@ -0,0 +1,209 @@
+"""
+Time every step of the analysis chain on synthetic inputs of 10^2 to 10^5
+stations (see fixtures), and save the times as JSON, so a regression can be
+found by comparing two commits on the same machine.
+
+Steps (N = stations, cross-sections or survey rows):
+  pullMKmatrices               read N VABS output files one at a time
+  readMKfiles                  read N VABS output files in one batch
+  writeDymoreMK                write N cross-sections one at a time
+  writeBeamPropertyDefinition  write N cross-sections in one call
+  readBeamProperties           parse a props deck of N cross-sections
+  readSurveys (cold)           read a case tree of N-row surveys, parsing the text
+  readSurveys (warm)           ... again, from the binary sidecars
+  resampleSurvey               resample every survey onto the 24 spar stations and onto N points
+  renderFigures                draw the Fig. 18 family for the case tree
+
+Usage: from the spardesign directory, type:
+> python -m benchmarks.bench_suite --sizes 100 1000 10000 100000 --output bench_results.json
+> git checkout other-branch
+> python -m benchmarks.bench_suite --output other.json --compare bench_results.json
+
+"""
+
+from __future__ import print_function
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+from DYMORE import DYMOREdeck as dd
+from DYMORE import DYMOREutilities as du
+from DYMORE import figureRenderer as fr
+from DYMORE import mdtReader as mdt
+from DYMORE import resample as rs
+from benchmarks import fixtures
+
+
+# change this when a step changes what it measures, so old results are not
+# compared with new ones
+SUITE_VERSION = 1
+
+SIZES = [100, 1000, 10000, 100000]
+
+STEPS = ['pullMKmatrices', 'readMKfiles', 'writeDymoreMK', 'writeBeamPropertyDefinition',
+         'readBeamProperties', 'readSurveys (cold)', 'readSurveys (warm)', 'resampleSurvey',
+         'renderFigures']
+
+# the steps that need one VABS output file per station
+FILE_STEPS = ('pullMKmatrices', 'readMKfiles')
+
+
+def bestOf(func, repeat, setup=None):
+    """
+    Return the best wall-clock time (in seconds) of several calls to func(),
+    calling setup() (untimed) before each one.
+    """
+
+    best = np.inf
+    for r in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def machineInfo():
+    """
+    Describe the machine and the code the results were measured on.
+    """
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=here,
+                                         stderr=subprocess.DEVNULL, universal_newlines=True).strip()
+        dirty = bool(subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=here,
+                                             stderr=subprocess.DEVNULL, universal_newlines=True).strip())
+    except (OSError, subprocess.CalledProcessError):
+        (commit, dirty) = (None, None)
+    return {'commit': commit, 'dirty': dirty, 'node': platform.node(), 'platform': platform.platform(),
+            'processor': platform.processor(), 'cpu_count': os.cpu_count(),
+            'python': platform.python_version(), 'numpy': np.__version__}
+
+
+def timeSteps(N, workdir, repeat, max_files):
+    """
+    Write the fixtures for N stations into workdir, and time each step.
+
+    Returns
+    -------
+    times : <dictionary>
+        step -> best time [s], or None for a step that was skipped.
+    """
+
+    times = dict((step, None) for step in STEPS)
+
+    if N <= max_files:
+        vabs_dir = os.path.join(workdir, 'vabs')
+        paths = fixtures.writeMKfiles(vabs_dir, N)
+        times['pullMKmatrices'] = bestOf(lambda: [du.pullMKmatrices(du.readFile(p)) for p in paths], repeat)
+        times['readMKfiles'] = bestOf(lambda: du.readMKfiles(vabs_dir), repeat)
+
+    (eta, cm_x2, cm_x3, mpus, i1, i2, i3, K) = fixtures.syntheticProperties(N)
+
+    def writeOneByOne():
+        f = io.StringIO()
+        for n in range(N):
+            du.writeDymoreMK(f, 'ETA_COORDINATE', eta[n], cm_x2[n], cm_x3[n], mpus[n], i1[n], i2[n], i3[n], K[n])
+    times['writeDymoreMK'] = bestOf(writeOneByOne, repeat)
+    times['writeBeamPropertyDefinition'] = bestOf(
+        lambda: du.writeBeamPropertyDefinition(io.StringIO(), 'propSynthetic', 'ETA_COORDINATE',
+                                               eta, cm_x2, cm_x3, mpus, i1, i2, i3, K), repeat)
+
+    props_path = os.path.join(workdir, 'synthetic_props.dat')
+    fixtures.writePropsDeck(props_path, N)
+    with open(props_path, 'r', newline='') as f:
+        text = f.read()
+    times['readBeamProperties'] = bestOf(
+        lambda: dd.readBeamProperties(dd.parseDeck(text, props_path).find('BEAM_PROPERTY_NAME')), repeat)
+
+    root = os.path.join(workdir, 'tree')
+    surveys = fixtures.writeCaseTree(root, N)
+    figures_dirs = sorted(set(os.path.dirname(p) for p in surveys))
+    clear = lambda: [mdt.clearSidecars(d) for d in figures_dirs]
+    times['readSurveys (cold)'] = bestOf(lambda: mdt.readSurveys(surveys), repeat, setup=clear)
+    data = mdt.readSurveys(surveys)
+    times['readSurveys (warm)'] = bestOf(lambda: mdt.readSurveys(surveys), repeat)
+
+    xq = np.linspace(0.0, rs.X1_STATIONS[-1], N)
+    times['resampleSurvey'] = bestOf(
+        lambda: [(rs.resampleSurvey(d, rs.X1_STATIONS, scale=91.9), rs.resampleSurvey(d, xq, scale=91.9))
+                 for d in data], repeat)
+
+    out_dir = os.path.join(workdir, 'figures')
+    groups = fr.caseGroups(root)
+    times['renderFigures'] = bestOf(
+        lambda: fr.renderFigures(groups, out_dir, families=['fig_18'], workers=1, force=True), repeat)
+    return times
+
+
+def compare(results, baseline, threshold):
+    """
+    Print the ratio of each time to the baseline's, and mark the ones that are
+    slower by more than the threshold (e.g. 1.10 = 10% slower).
+    """
+
+    if baseline.get('suite_version') != results['suite_version']:
+        print("***WARNING*** the baseline was measured by another version of the suite")
+    if baseline['machine'].get('node') != results['machine']['node']:
+        print("***WARNING*** the baseline was measured on another machine (%s)" % baseline['machine'].get('node'))
+    print("\ncompared with %s (commit %s)" % (baseline.get('date'), baseline['machine'].get('commit')))
+    print("%-30s %8s %10s %10s %8s" % ('step', 'N', 'old [s]', 'new [s]', 'new/old'))
+    slower = 0
+    for step in STEPS:
+        for (size, new) in sorted(results['times'].get(step, {}).items(), key=lambda item: int(item[0])):
+            old = baseline['times'].get(step, {}).get(size)
+            if old is None or new is None:
+                continue
+            ratio = new/old
+            flag = '  SLOWER' if ratio > threshold else ''
+            slower += bool(flag)
+            print("%-30s %8s %10.4f %10.4f %8.2f%s" % (step, size, old, new, ratio, flag))
+    print("%d of the times are more than %.0f%% slower" % (slower, 100.0*(threshold - 1.0)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help="numbers of stations")
+    parser.add_argument('--max-files', type=int, default=10000,
+                        help="skip the VABS file steps above this many stations (one file each)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='bench_results.json', help="the JSON file to write")
+    parser.add_argument('--compare', default=None, help="a JSON file from an earlier run")
+    parser.add_argument('--threshold', type=float, default=1.10, help="the new/old ratio that counts as slower")
+    args = parser.parse_args()
+
+    results = {'suite_version': SUITE_VERSION, 'date': datetime.datetime.now().isoformat(timespec='seconds'),
+               'machine': machineInfo(), 'repeat': args.repeat, 'times': dict((step, {}) for step in STEPS)}
+    print("%-30s %8s %10s" % ('step', 'N', 'time [s]'))
+    for N in args.sizes:
+        workdir = tempfile.mkdtemp(prefix='bench_suite_')
+        try:
+            times = timeSteps(N, workdir, args.repeat, args.max_files)
+        finally:
+            shutil.rmtree(workdir)
+        for step in STEPS:
+            results['times'][step][str(N)] = times[step]
+            print("%-30s %8d %10s" % (step, N, 'skipped' if times[step] is None else '%.4f' % times[step]))
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print("results written to " + args.output)
+
+    if args.compare is not None:
+        with open(args.compare, 'r') as f:
+            compare(results, json.load(f), args.threshold)
+
+
+if __name__ == '__main__':
+    main()
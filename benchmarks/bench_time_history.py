@@ -0,0 +1,73 @@
+"""
+Reduce a synthetic time-history survey file over time (max/min envelopes,
+mean, RMS and the time of the peak), by loading it whole with np.loadtxt and
+with the chunked one-pass reader (timeHistory.envelopes), for two simulation
+lengths: the time and the peak memory (from tracemalloc) of each.
+
+Usage: from the spardesign directory, type:
+> python -m benchmarks.bench_time_history --points 37 --steps 2000 20000
+
+"""
+
+from __future__ import print_function
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from DYMORE import timeHistory as th
+from benchmarks import fixtures
+
+
+def loadWhole(path, npoints):
+    data = np.loadtxt(path, ndmin=2)
+    values = data.reshape(-1, npoints, data.shape[1])[:,:,1:]
+    t = np.arange(len(values), dtype=float)
+    i_peak = np.abs(values).argmax(axis=0)
+    return {'max': values.max(axis=0), 'min': values.min(axis=0), 'rms': np.sqrt((values**2).mean(axis=0)),
+            'time_of_peak': t[i_peak]}
+
+
+def measure(func):
+    # timed without tracemalloc, which slows down every allocation
+    t0 = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - t0
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return (result, seconds, peak)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--points', type=int, default=37, help="survey points per time step")
+    parser.add_argument('--steps', type=int, nargs='+', default=[2000, 20000], help="archived time steps")
+    parser.add_argument('--chunk-rows', type=int, default=th.CHUNK_ROWS)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    try:
+        print("%8s %10s %-18s %10s %14s" % ('steps', 'file [MB]', 'reader', 'time [s]', 'peak mem [MB]'))
+        for nsteps in args.steps:
+            path = os.path.join(tmp, 'svy_force_EF.mdt')
+            fixtures.writeTimeHistory(path, args.points, nsteps)
+            size = os.path.getsize(path)/1.0e6
+            (old, t_old, m_old) = measure(lambda: loadWhole(path, args.points))
+            (new, t_new, m_new) = measure(lambda: th.envelopes(path, chunk_rows=args.chunk_rows))
+            for key in ('max', 'min', 'time_of_peak'):
+                assert np.array_equal(old[key], new[key]), key
+            assert np.allclose(old['rms'], new['rms'], rtol=1.0e-12)
+            print("%8d %10.1f %-18s %10.3f %14.1f" % (nsteps, size, 'np.loadtxt', t_old, m_old/1.0e6))
+            print("%8d %10.1f %-18s %10.3f %14.1f" % (nsteps, size, 'chunked envelopes', t_new, m_new/1.0e6))
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Benchmark the batch VABS parser (DYMOREutilities.readMKfiles) against the
+per-file path (DYMOREutilities.readFile + DYMOREutilities.pullMKmatrices).
+
+Usage: from the spardesign directory, type:
+> python -m benchmarks.bench_vabs_parse --stations 500
+
+"""
+
+from __future__ import print_function
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from DYMORE import DYMOREutilities as du
+
+
+def formatRows(A, fmt='%20.10E'):
+    """
+    Format the rows of a matrix the way VABS does.
+    """
+
+    return ''.join(''.join(fmt % a for a in row) + '\n' for row in A)
+
+
+def writeSyntheticMKfile(filestr, rng):
+    """
+    Write a synthetic VABS output file (*.dat.K) with random properties.
+
+    The layout follows the VABS output files used for the spar stations, so the
+    parsers have to skip over the same number of lines they would in a real
+    file.
+
+    Parameters
+    ----------
+    filestr : <string>
+        The filename of the file to write to.
+    rng : <np.random.RandomState>
+        The random number generator used to make up the properties.
+
+    Returns
+    -------
+    <none>
+    """
+
+    A = rng.standard_normal((6,6))
+    K = np.dot(A, A.T) * 1.0e8
+    M = np.diag(rng.uniform(1.0e2, 1.0e3, 6))
+    (cm_x2, cm_x3) = rng.standard_normal(2) * 1.0e-3
+    (mpus, i1, i2, i3) = rng.uniform(1.0e2, 4.0e3, 4)
+
+    with open(filestr, 'w') as f:
+        f.write(' Cross-sectional properties are calculated by VABS\n\n')
+        f.write(' The 6X6 Mass Matrix\n')
+        f.write(' -----------------------------------------------------------\n\n')
+        f.write(formatRows(M))
+        f.write('\n The Mass Center of the Cross Section\n')
+        f.write(' -----------------------------------------------------------\n\n')
+        f.write('  Xm2 = %20.10E\n' % cm_x2)
+        f.write('  Xm3 = %20.10E\n' % cm_x3)
+        f.write('\n The 6X6 Mass Matrix at the Mass Center\n')
+        f.write(' -----------------------------------------------------------\n\n')
+        f.write(formatRows(M))
+        f.write('\n The Mass Properties with respect to Principal Inertial Axes\n')
+        f.write(' -----------------------------------------------------------\n\n')
+        f.write(' Mass Per Unit Span                     = %20.10E\n' % mpus)
+        f.write(' Mass Moments of Intertia about x1 axis = %20.10E\n' % i1)
+        f.write(' Mass Moments of Intertia about x2 axis = %20.10E\n' % i2)
+        f.write(' Mass Moments of Intertia about x3 axis = %20.10E\n' % i3)
+        f.write('\n The Geometric Center of the Cross Section\n')
+        f.write(' -----------------------------------------------------------\n\n')
+        f.write('  Xg2 = %20.10E\n' % 0.0)
+        f.write('  Xg3 = %20.10E\n' % 0.0)
+        f.write('\n Classical Stiffness Matrix (1-extension; 2-twist; 3,4-bending)\n')
+        f.write(' -----------------------------------------------------------\n\n')
+        f.write(formatRows(K[np.ix_([0,3,4,5],[0,3,4,5])]))
+        f.write('\n Classical Flexibility Matrix (1-extension; 2-twist; 3,4-bending)\n')
+        f.write(' -----------------------------------------------------------\n\n')
+        f.write(formatRows(np.linalg.inv(K[np.ix_([0,3,4,5],[0,3,4,5])])))
+        f.write('\n Timoshenko Stiffness Matrix (1-extension; 2,3-shear, 4-twist; 5,6-bending)\n')
+        f.write(' -----------------------------------------------------------\n\n')
+        f.write(formatRows(K))
+        f.write('\n Timoshenko Flexibility Matrix (1-extension; 2,3-shear, 4-twist; 5,6-bending)\n')
+        f.write(' -----------------------------------------------------------\n\n')
+        f.write(formatRows(np.linalg.inv(K)))
+        f.write('\n The Generalized Shear Center of the Cross Section in the User Coordinate System\n')
+        f.write(' -----------------------------------------------------------\n\n')
+        f.write('  Xs2 = %20.10E\n' % 0.0)
+        f.write('  Xs3 = %20.10E\n' % 0.0)
+
+    return
+
+
+def makeSyntheticMKdirectory(dirname, N, seed=0):
+    """
+    Write N synthetic VABS output files into a directory.
+
+    Returns the list of paths, in station order.
+    """
+
+    rng = np.random.RandomState(seed)
+    paths = []
+    for n in range(N):
+        filestr = os.path.join(dirname, 'spar_station_%05d.dat.K' % (n+1))
+        writeSyntheticMKfile(filestr, rng)
+        paths.append(filestr)
+    return paths
+
+
+def perFilePath(paths):
+    """
+    Read all stations one file at a time, the way writeMKmatrices does.
+    """
+
+    return [du.pullMKmatrices(du.readFile(p)) for p in paths]
+
+
+def batchPath(dirname):
+    """
+    Read all stations at once with readMKfiles.
+    """
+
+    return du.readMKfiles(dirname)
+
+
+def bestOf(func, arg, repeat):
+    """
+    Return the best wall-clock time (in seconds) of several calls to func(arg).
+    """
+
+    best = np.inf
+    for r in range(repeat):
+        t0 = time.time()
+        func(arg)
+        best = min(best, time.time() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--stations', type=int, default=500, help='number of synthetic stations')
+    parser.add_argument('--repeat', type=int, default=5, help='number of timing repeats')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='bench_vabs_')
+    try:
+        paths = makeSyntheticMKdirectory(tmpdir, args.stations)
+
+        # check that both paths agree before timing them
+        old = perFilePath(paths)
+        (files, cm_x2, cm_x3, mpus, i1, i2, i3, K) = batchPath(tmpdir)
+        assert np.allclose(K, np.array([o[6] for o in old]), rtol=0.0, atol=0.0)
+        assert np.array_equal(mpus, np.array([o[2] for o in old]))
+
+        t_old = bestOf(perFilePath, paths, args.repeat)
+        t_new = bestOf(batchPath, tmpdir, args.repeat)
+        print("stations:              %d" % args.stations)
+        print("per-file path:         %8.4f s  (%9.0f stations/s)" % (t_old, args.stations/t_old))
+        print("batch readMKfiles:     %8.4f s  (%9.0f stations/s)" % (t_new, args.stations/t_new))
+        print("speedup:               %8.2fx" % (t_old/t_new))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
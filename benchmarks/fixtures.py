@@ -0,0 +1,138 @@
+"""
+Synthetic inputs and outputs of any size for the benchmarks: VABS output files
+(*.dat.K), DYMORE beam property decks (*_props.dat), case trees of DYMORE
+survey files (FIGURES/svy_*.mdt) laid out the way caseGenerator builds them,
+and time-history survey files of dynamic analyses.
+
+The numbers are random but repeatable (each generator takes a seed), and every
+file has the layout of the real one, so the parsers do the same work per
+station or row as they would on real files.
+
+Example
+-------
+>>> from benchmarks import fixtures
+>>> paths = fixtures.writeMKfiles('vabs', 1000)
+>>> fixtures.writePropsDeck('big_props.dat', 10000)
+>>> root = fixtures.writeCaseTree('tree', 100000)
+>>> fixtures.writeTimeHistory('svy_force_EF.mdt', 37, 100000)
+"""
+
+import os
+
+import numpy as np
+
+from DYMORE import DYMOREutilities as du
+from DYMORE import figureRenderer as fr
+from DYMORE import mdtReader as mdt
+from benchmarks.bench_vabs_parse import makeSyntheticMKdirectory
+
+# the case the synthetic surveys are written for
+LOAD = 'flapwise_tipload'
+MAGNITUDE_LABEL = '1e03'
+QUANTITIES = ('disp', 'force')
+
+
+def writeMKfiles(dirname, N, seed=0):
+    """
+    Write N synthetic VABS output files (spar_station_00001.dat.K, ...) into a
+    directory, and return their paths in station order.
+    """
+
+    if not os.path.isdir(dirname):
+        os.makedirs(dirname)
+    return makeSyntheticMKdirectory(dirname, N, seed)
+
+
+def syntheticProperties(N, seed=0):
+    """
+    Make up the properties of N cross-sections along a beam.
+
+    Returns
+    -------
+    eta, cm_x2, cm_x3, mpus, i1, i2, i3 : <np.array>
+        Shape (N,); eta runs from 0 to 1.
+    K : <np.array>
+        Shape (N,6,6), symmetric positive-definite.
+    """
+
+    rng = np.random.RandomState(seed)
+    A = rng.standard_normal((N,6,6))
+    K = (np.matmul(A, np.swapaxes(A, 1, 2)) + 6.0*np.eye(6))*1.0e8
+    (cm_x2, cm_x3) = rng.standard_normal((2,N))*1.0e-3
+    (mpus, i1, i2, i3) = rng.uniform(1.0e2, 4.0e3, (4,N))
+    return (np.linspace(0.0, 1.0, N), cm_x2, cm_x3, mpus, i1, i2, i3, K)
+
+
+def writePropsDeck(path, N, seed=0, propName='propSynthetic'):
+    """
+    Write a @BEAM_PROPERTY_DEFINITION with N cross-sections (see
+    syntheticProperties) to a file.
+    """
+
+    with open(path, 'w') as f:
+        du.writeBeamPropertyDefinition(f, propName, 'ETA_COORDINATE', *syntheticProperties(N, seed),
+                                       comments='%d synthetic cross-sections' % N)
+
+
+def writeSurvey(path, nrows, rng):
+    """
+    Write a .mdt file with nrows rows: eta, then 6 result columns.
+    """
+
+    data = np.empty((nrows, 7))
+    data[:,0] = np.linspace(0.0, 1.0, nrows)
+    data[:,1:] = rng.standard_normal((nrows, 6))*10.0**rng.randint(-8, 6, 6)
+    with open(path, 'w') as f:
+        f.write(('%14.6e'*7 + '\n')*nrows % tuple(data.ravel().tolist()))
+    return data
+
+
+def writeCaseTree(root, nrows, seed=0, loads=(LOAD,), magnitude_labels=(MAGNITUDE_LABEL,)):
+    """
+    Write a case tree with one case for each spar type in figureRenderer.SPARS,
+    load type and magnitude label (by default, only flapwise_tipload/1e03),
+    with a displacement and a force survey of nrows rows for the monoplane
+    spar and for each biplane segment.
+
+    Returns
+    -------
+    paths : <list of strings>
+        The survey files.
+    """
+
+    rng = np.random.RandomState(seed)
+    paths = []
+    for spar in fr.SPARS:
+        for load in loads:
+            for label in magnitude_labels:
+                figures_dir = os.path.join(root, spar, load, label, 'FIGURES')
+                if not os.path.isdir(figures_dir):
+                    os.makedirs(figures_dir)
+                segments = ('spar',) if spar == 'monoplane_spar' else mdt.BIPLANE_SEGMENTS
+                for quantity in QUANTITIES:
+                    for segment in segments:
+                        path = os.path.join(figures_dir, 'svy_%s_%s.mdt' % (quantity, segment))
+                        writeSurvey(path, nrows, rng)
+                        paths.append(path)
+    return paths
+
+
+def writeTimeHistory(path, npoints, nsteps, seed=0, steps_per_write=1000):
+    """
+    Write a time-history survey file: nsteps blocks of npoints rows (eta, then
+    6 result columns that oscillate in time), written a few blocks at a time,
+    so files larger than memory can be made.
+    """
+
+    rng = np.random.RandomState(seed)
+    eta = np.linspace(0.0, 1.0, npoints)
+    amplitude = rng.uniform(0.5, 2.0, 6)*10.0**rng.randint(-4, 6, 6)
+    frequency = rng.uniform(0.1, 2.0, 6)
+    with open(path, 'w') as f:
+        for first in range(0, nsteps, steps_per_write):
+            t = np.arange(first, min(first + steps_per_write, nsteps))*0.01
+            data = np.empty((len(t), npoints, 7))
+            data[:,:,0] = eta
+            data[:,:,1:] = (amplitude*np.sin(2.0*np.pi*frequency*t[:,None,None] + eta[None,:,None])*eta[None,:,None]**2
+                            + 0.01*amplitude*rng.standard_normal((len(t), npoints, 6)))
+            f.write(('%14.6e'*7 + '\n')*(len(t)*npoints) % tuple(data.ravel().tolist()))
@@ -12,6 +12,8 @@ Last updated: February 12, 2014
 import numpy as np
 import matplotlib.pyplot as plt
 import os
+from DYMORE import mdtReader as mdt
+from DYMORE import resample as rs
 # from matplotlib import rc
 
 
@@ -66,37 +68,13 @@ plt.close('all')
 # only plot results at each of the spar stations (every 3rd entry, since we used 3rd-order beam elements)
 skip_every = 1
 # x1 coordinates of all 24 spar stations
-x1_stn = np.array([0.0, 0.2, 2.3, 4.4, 6.5, 9.0, 12.2, 13.9, 15.5, 17.1, 19.8, 22.5, 25.2, 33.4, 41.5, 49.6, 57.8, 64.3, 65.9, 70.8, 74.0, 82.2, 87.0, 91.9])
-
-
-### linear extrapolation and interpolation ###
-from scipy.interpolate import interp1d
-from scipy import array
-
-
-def extrap1d(interpolator):
-    # copied from http://stackoverflow.com/questions/2745329/how-to-make-scipy-interpolate-give-a-an-extrapolated-result-beyond-the-input-ran
-    xs = interpolator.x
-    ys = interpolator.y
-
-    def pointwise(x):
-        if x < xs[0]:
-            return ys[0]+(x-xs[0])*(ys[1]-ys[0])/(xs[1]-xs[0])
-        elif x > xs[-1]:
-            return ys[-1]+(x-xs[-1])*(ys[-1]-ys[-2])/(xs[-1]-xs[-2])
-        else:
-            return interpolator(x)
-
-    def ufunclike(xs):
-        return array(map(pointwise, array(xs)))
-
-    return ufunclike
+x1_stn = rs.X1_STATIONS
 
 
 def plot_monospar_edgewise_deflection(skip_num):
     ### monoplane spar ###
     os.chdir(monoplane_dir)
-    AB = np.loadtxt('svy_disp_spar.mdt')
+    AB = mdt.readSurvey('svy_disp_spar.mdt')
     B = 91.9
     AB[:,0] = AB[:,0]*B
     plt.plot(AB[::skip_num,0], AB[::skip_num,2], 'rs--', markerfacecolor=gmfc, markersize=gms, linewidth=glw, markeredgewidth=gmew, markeredgecolor=mec_ms, label='monoplane spar', zorder=2)
@@ -107,11 +85,8 @@ def plot_monospar_edgewise_deflection(skip_num):
 
 
 def load_bispar_displacement():
-    CD = np.loadtxt('svy_disp_CD.mdt')
-    DE = np.loadtxt('svy_disp_DE.mdt')
-    EF = np.loadtxt('svy_disp_EF.mdt')
-    GH = np.loadtxt('svy_disp_GH.mdt')
-    HE = np.loadtxt('svy_disp_HE.mdt')
+    # read all five segments at once, from their binary sidecars if possible
+    (CD,DE,EF,GH,HE) = mdt.readSegments('.', 'svy_disp')
 
     return (CD,DE,EF,GH,HE)
 
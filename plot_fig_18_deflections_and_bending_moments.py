@@ -23,6 +23,8 @@ Last updated: July 25, 2013
 import numpy as np
 import matplotlib.pyplot as plt
 import os
+from DYMORE import mdtReader as mdt
+from DYMORE import resample as rs
 from matplotlib import rc
 
 
@@ -77,37 +79,13 @@ plt.close('all')
 # only plot results at each of the spar stations (every 3rd entry, since we used 3rd-order beam elements)
 skip_every = 3
 # x1 coordinates of all 24 spar stations
-x1_stn = np.array([0.0, 0.2, 2.3, 4.4, 6.5, 9.0, 12.2, 13.9, 15.5, 17.1, 19.8, 22.5, 25.2, 33.4, 41.5, 49.6, 57.8, 64.3, 65.9, 70.8, 74.0, 82.2, 87.0, 91.9])
-
-
-### linear extrapolation and interpolation ###
-from scipy.interpolate import interp1d
-from scipy import array
-
-
-def extrap1d(interpolator):
-    # copied from http://stackoverflow.com/questions/2745329/how-to-make-scipy-interpolate-give-a-an-extrapolated-result-beyond-the-input-ran
-    xs = interpolator.x
-    ys = interpolator.y
-
-    def pointwise(x):
-        if x < xs[0]:
-            return ys[0]+(x-xs[0])*(ys[1]-ys[0])/(xs[1]-xs[0])
-        elif x > xs[-1]:
-            return ys[-1]+(x-xs[-1])*(ys[-1]-ys[-2])/(xs[-1]-xs[-2])
-        else:
-            return interpolator(x)
-
-    def ufunclike(xs):
-        return array(map(pointwise, array(xs)))
-
-    return ufunclike
+x1_stn = rs.X1_STATIONS
 
 
 def plot_monospar_deflection(skip_num):
     ### monoplane spar ###
     os.chdir(monoplane_dir)
-    AB = np.loadtxt('svy_disp_spar.mdt')
+    AB = mdt.readSurvey('svy_disp_spar.mdt')
     B = 91.9
     AB[:,0] = AB[:,0]*B
     plt.plot(AB[::skip_num,0], AB[::skip_num,3], 'rs--', markerfacecolor=gmfc, markersize=gms, linewidth=glw, markeredgewidth=gmew, markeredgecolor=mec_ms, label='monoplane spar', zorder=2)
@@ -129,7 +107,7 @@ x1 <np.array>: x1-coordinates of all 24 spar stations
     ### monoplane spar ###
     os.chdir(monoplane_dir)
     # read in all forces and moments calculated by DYMORE
-    AB = np.loadtxt('svy_force_spar.mdt')
+    AB = mdt.readSurvey('svy_force_spar.mdt')
     # the spar length, 91.9 meters
     B = 91.9
     # multiply column 0 (eta-coordinates) by the spar length, B
@@ -140,10 +118,9 @@ x1 <np.array>: x1-coordinates of all 24 spar stations
     # plot the axial (along x1) force resultant (column 1) along the y-axis
     y = AB[:,1]
     # get force results at all the spar stations, using interpolation
-    # (instead of using the default results at Gaussian integration points)
-    f_i = interp1d(x,y)
-    f_x = extrap1d(f_i)
-    y1 = f_x(x1)  # use extrapolations function returned by 'extrap1d'
+    # (instead of using the default results at Gaussian integration points),
+    # and linear extrapolation beyond the first and last Gauss points
+    y1 = rs.interpolate(x, y, x1)
 
     # plot the results to the screen
     plt.plot(x1, y1/1000.0, 'rs--', markerfacecolor=gmfc, markersize=gms, linewidth=glw, markeredgewidth=gmew, markeredgecolor=mec_ms,  label='monoplane spar', zorder=2)
@@ -164,7 +141,7 @@ x1 <np.array>: x1-coordinates of all 24 spar stations
     ### monoplane spar ###
     os.chdir(monoplane_dir)
     # read in all forces and moments calculated by DYMORE
-    AB = np.loadtxt('svy_force_spar.mdt')
+    AB = mdt.readSurvey('svy_force_spar.mdt')
     # the spar length, 91.9 meters
     B = 91.9
     # multiply column 0 (eta-coordinates) by the spar length, B
@@ -175,10 +152,9 @@ x1 <np.array>: x1-coordinates of all 24 spar stations
     # plot the flapwise (about x2) bending moment (column 5) along the y-axis
     y = AB[:,5]
     # get bending moment results at all the spar stations, using interpolation
-    # (instead of using the default results at Gaussian integration points)
-    f_i = interp1d(x,y)
-    f_x = extrap1d(f_i)
-    y1 = f_x(x1)  # use extrapolations function returned by 'extrap1d'
+    # (instead of using the default results at Gaussian integration points),
+    # and linear extrapolation beyond the first and last Gauss points
+    y1 = rs.interpolate(x, y, x1)
 
     # plot the results to the screen
     plt.plot(x1, y1/1000.0, 'rs--', markerfacecolor=gmfc, markersize=gms, linewidth=glw, markeredgewidth=gmew, markeredgecolor=mec_ms,  label='monoplane spar', zorder=2)
@@ -187,21 +163,15 @@ x1 <np.array>: x1-coordinates of all 24 spar stations
     return
 
 def load_bispar_displacement():
-    CD = np.loadtxt('svy_disp_CD.mdt')
-    DE = np.loadtxt('svy_disp_DE.mdt')
-    EF = np.loadtxt('svy_disp_EF.mdt')
-    GH = np.loadtxt('svy_disp_GH.mdt')
-    HE = np.loadtxt('svy_disp_HE.mdt')
+    # read all five segments at once, from their binary sidecars if possible
+    (CD,DE,EF,GH,HE) = mdt.readSegments('.', 'svy_disp')
 
     return (CD,DE,EF,GH,HE)
 
 
 def load_bispar_force():
-    CD = np.loadtxt('svy_force_CD.mdt')
-    DE = np.loadtxt('svy_force_DE.mdt')
-    EF = np.loadtxt('svy_force_EF.mdt')
-    GH = np.loadtxt('svy_force_GH.mdt')
-    HE = np.loadtxt('svy_force_HE.mdt')
+    # read all five segments at once, from their binary sidecars if possible
+    (CD,DE,EF,GH,HE) = mdt.readSegments('.', 'svy_force')
 
     return (CD,DE,EF,GH,HE)
 